@@ -1,38 +1,36 @@
 # Entry point
-import os, sys, logging, time
-import customtkinter as ctk
-import yaml
+#   python app.py                 – GUI
+#   python app.py --headless ...  – same as cli.py (no Tk/PIL/cv2 import)
+from core.startup_profile import PROFILE as prof
+import sys, logging
 from version import __version__
-from ui.main_window import MainWindow
-
-def load_yaml(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+from core.log_setup import start_logging
 
 def setup_logging(cfg):
-    folder = cfg["logging"]["folder"]
-    os.makedirs(folder, exist_ok=True)
-    ts = time.strftime("%Y%m%d-%H%M%S")
-    logfile = os.path.join(folder, f"app_{ts}.log")
-
-    level = getattr(logging, cfg["logging"].get("level", "INFO").upper(), logging.INFO)
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=[logging.FileHandler(logfile, encoding="utf-8"), logging.StreamHandler(sys.stdout)],
-    )
+    # callers only enqueue; a background listener batches, rotates and prunes
+    listener = start_logging(cfg["logging"], console=cfg["logging"].get("console", True))
+    logfile = listener.writer.path
     logging.info("==== App start ====")
     logging.info("Log file: %s", logfile)
     return logfile
 
 def main():
-    app_cfg = load_yaml(os.path.join("config", "app.yaml"))
-    ctk.set_appearance_mode(app_cfg["app"]["theme"]["appearance"])
-    ctk.set_default_color_theme(app_cfg["app"]["theme"]["color_theme"])
-    logfile = setup_logging(app_cfg)
+    if "--headless" in sys.argv[1:]:
+        import cli
+        return cli.main([a for a in sys.argv[1:] if a != "--headless"])
+    with prof.step("config"):
+        from core.config import load_config
+        cfg = load_config()
+    logfile = setup_logging(cfg.app)
+    from core.metrics import METRICS
+    METRICS.configure(cfg.app.get("metrics"), folder=cfg.app["logging"].get("folder", "logs"))
+    ctk = prof.load("customtkinter")
+    ctk.set_appearance_mode(cfg.app["app"]["theme"]["appearance"])
+    ctk.set_default_color_theme(cfg.app["app"]["theme"]["color_theme"])
+    MainWindow = prof.load("ui.main_window").MainWindow
 
-    root = MainWindow(app_cfg=app_cfg, logfile=logfile, version=__version__)
+    root = MainWindow(app_cfg=cfg.app, logfile=logfile, version=__version__, config=cfg)
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# ADU relay engine on the simulated device: action latency, burst coalescing, pulse accuracy
+#   python -m bench.bench_adu [--n 500] [--latency-ms 4]
+import argparse, json, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.adu_client import ADUClient, SimBackend
+
+ACTIONS = ["USB_ON", "USB_OFF", "LIGHT_ON", "LIGHT_OFF"]
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 3) if xs else 0.0
+
+def run(n, latency_s):
+    out = {}
+    for coalesce_ms in (0, 5):
+        dev = SimBackend(latency_s)
+        c = ADUClient({"coalesce_ms": coalesce_ms, "relays": {"USB": 0, "LIGHT": 1}}, backend=dev)
+        try:
+            # one at a time, alternating so every action is a real change
+            lat = []
+            for i in range(n // 5):
+                t0 = time.perf_counter()
+                assert c.action(ACTIONS[i % 2])
+                lat.append((time.perf_counter() - t0) * 1000)
+            tx0 = dev.transactions
+            # burst: n toggles submitted back to back (a user hammering buttons, a script)
+            t0 = time.perf_counter()
+            futs = [c.submit(ACTIONS[i % 4]) for i in range(n)]
+            assert all(f.result(30) for f in futs)
+            burst_s = time.perf_counter() - t0
+            # pulses: requested vs observed on-time
+            errs = []
+            for ms in (20, 50, 100):
+                t0 = time.perf_counter()
+                assert c.pulse("LIGHT", ms).result(2)
+                errs.append((time.perf_counter() - t0) * 1000 - ms)
+            out[f"coalesce_{coalesce_ms}ms"] = {
+                "action_p50_ms": pct(lat, 0.5), "action_p99_ms": pct(lat, 0.99),
+                "burst_actions_per_s": round(n / burst_s), "burst_transactions": dev.transactions - tx0,
+                "pulse_over_ms": [round(e, 2) for e in errs], "stats": c.stats()}
+        finally:
+            c.close()
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=500)
+    ap.add_argument("--latency-ms", type=float, default=4.0)
+    a = ap.parse_args()
+    res = run(a.n, a.latency_ms / 1000)
+    for k, r in res.items():
+        print(f"{k}: action p50 {r['action_p50_ms']} ms, burst {r['burst_actions_per_s']} actions/s "
+              f"in {r['burst_transactions']} device transactions, pulse overshoot {r['pulse_over_ms']} ms")
+    print(json.dumps(res))
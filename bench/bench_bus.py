@@ -0,0 +1,65 @@
+# EventBus publish cost and publish→handler latency per target and mode
+#   python -m bench.bench_bus [--rate 2000] [--seconds 2] [--burst 200000]
+import argparse, json, os, sys, time, threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.event_bus import EventBus
+from bench.fake_tk import FakeTk
+
+def paced(bus, topic, rate, seconds):
+    t0, n = time.perf_counter(), 0
+    while True:
+        el = time.perf_counter() - t0
+        if el >= seconds: break
+        due = int(el * rate)
+        while n < due:
+            bus.publish(topic, n); n += 1
+        time.sleep(0.0005)
+    return n
+
+def run(rate, seconds, burst):
+    out = {}
+    for target in ("worker", "ui"):
+        for mode in ("fifo", "latest", "batch"):
+            bus = EventBus()
+            topic = f"bench:{mode}"
+            bus.configure(topic, mode=mode)
+            seen = [0]
+            if mode == "batch": h = lambda ps: seen.__setitem__(0, seen[0] + len(ps))
+            else: h = lambda p: seen.__setitem__(0, seen[0] + 1)
+            bus.subscribe(topic, h, target=target)
+            if target == "ui":
+                loop = FakeTk()
+                bus.attach_tk(loop, interval_ms=16, budget_ms=8)
+                th = threading.Thread(target=paced, args=(bus, topic, rate, seconds), daemon=True)
+                th.start(); loop.run(seconds + 0.1); th.join()
+            else:
+                paced(bus, topic, rate, seconds)
+                time.sleep(0.1)
+            m = bus.metrics()[f"{target}:{topic}"]
+            out[f"{target}_{mode}"] = {"published": m["published"], "handled": seen[0],
+                                       "lat_p50_ms": m["lat_p50_ms"], "lat_p99_ms": m["lat_p99_ms"]}
+    # raw publish cost with one worker subscriber, single vs publish_many
+    bus = EventBus()
+    bus.configure("bench:batch", mode="batch", maxlen=burst)
+    bus.subscribe("bench:batch", lambda ps: None)
+    t0 = time.perf_counter()
+    for i in range(burst): bus.publish("bench:batch", i)
+    out["publish_us"] = round((time.perf_counter() - t0) / burst * 1e6, 3)
+    items = list(range(256))
+    t0 = time.perf_counter()
+    for _ in range(burst // 256): bus.publish_many("bench:batch", items)
+    out["publish_many_us_per_item"] = round((time.perf_counter() - t0) / (burst // 256 * 256) * 1e6, 3)
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rate", type=float, default=2000)
+    ap.add_argument("--seconds", type=float, default=2.0)
+    ap.add_argument("--burst", type=int, default=200000)
+    a = ap.parse_args()
+    res = run(a.rate, a.seconds, a.burst)
+    for k, v in res.items():
+        if isinstance(v, dict):
+            print(f"{k:14s} p50 {v['lat_p50_ms']:7.3f} ms  p99 {v['lat_p99_ms']:7.3f} ms  handled {v['handled']}/{v['published']}")
+    print(f"publish {res['publish_us']} µs, publish_many {res['publish_many_us_per_item']} µs/item")
+    print(json.dumps(res))
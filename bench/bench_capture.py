@@ -0,0 +1,107 @@
+# Capture→display latency and recording throughput with the synthetic camera
+#   python -m bench.bench_capture [--size 1280x720] [--fps 30] [--display-fps 15] [--seconds 3] [--frames 300]
+import argparse, json, os, sys, shutil, tempfile, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import cv2
+from PIL import Image
+from core.camera_worker import CameraWorker
+from core.recorder import Recorder
+from core.synthetic_source import SyntheticCapture
+from bench.fake_tk import FakeTk
+
+VIEW_SIZE = (640, 480)     # ui.panels.camera_panel.VIEW_SIZE
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2) if xs else 0.0
+
+class DisplayTick:
+    """CamTile._display_tick/_show minus the Tk photo paste: newest mailbox
+    frame (or shared-ring slot, process mode) → resize → BGR2RGB → PIL image,
+    into reused buffers."""
+
+    def __init__(self, loop, worker, display_fps):
+        self.loop, self.w = loop, worker
+        self.shm = worker.consumer("display") if worker.mode == "process" else None
+        self.interval = max(1, int(1000 / display_fps))
+        self.seq, self.lat, self.shown = 0, [], 0
+        w, h = VIEW_SIZE
+        self.small = np.empty((h, w, 3), np.uint8)
+        self.rgb = np.empty((h, w, 3), np.uint8)
+        loop.after(self.interval, self.tick)
+
+    def tick(self):
+        item = self.shm.latest() if self.shm is not None else self.w.mailbox.get(self.seq)
+        if item is not None:
+            self.seq, ts, frame = item
+            cv2.resize(frame, VIEW_SIZE, dst=self.small, interpolation=cv2.INTER_AREA)
+            item = frame = None
+            cv2.cvtColor(self.small, cv2.COLOR_BGR2RGB, dst=self.rgb)
+            if self.shm is not None and not self.shm.still_valid(self.seq):
+                return self.loop.after(self.interval, self.tick)
+            Image.frombuffer("RGB", VIEW_SIZE, self.rgb, "raw", "RGB", 0, 1)
+            self.lat.append((time.monotonic() - ts) * 1000)
+            self.shown += 1
+        self.loop.after(self.interval, self.tick)
+
+def display_latency(mode, size, fps, display_fps, seconds):
+    w, h = size
+    worker = CameraWorker("synthetic", w, h, fps, mode=mode)
+    worker.start()
+    assert worker.cap is not None, "capture did not start"
+    loop = FakeTk()
+    disp = DisplayTick(loop, worker, display_fps)
+    t0 = time.monotonic()
+    try:
+        loop.run(seconds)
+    finally:
+        elapsed = time.monotonic() - t0
+        disp.shm = None
+        worker.stop()
+    return {"mode": mode, "capture_fps": round(worker.capture_rate.rate, 1),
+            "display_fps": round(disp.shown / elapsed, 1), "mailbox_dropped": worker.mailbox.dropped,
+            "lat_p50_ms": pct(disp.lat, 0.5), "lat_p99_ms": pct(disp.lat, 0.99)}
+
+def recording(size, fps, frames, codec):
+    folder = tempfile.mkdtemp(prefix="bench-rec-")
+    rec = Recorder("bench", {"folder": folder, "codec": codec, "on_full": "block",
+                             "queue_size": 64, "block_timeout_ms": 10000})
+    src = SyntheticCapture(size[0], size[1], fps=0)
+    buf = [src.read()[1].copy() for _ in range(8)]    # pre-rendered so generation isn't timed
+    try:
+        rec.start(size, fps)
+        t0 = time.perf_counter()
+        for i in range(frames):
+            rec.push(buf[i % len(buf)], i / fps)
+        push_s = time.perf_counter() - t0
+        rec.close()
+        rec._thread.join(timeout=120)
+        dt = time.perf_counter() - t0
+        st = rec.stats()
+        size_mb = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder)) / 1e6
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {"codec": codec, "frames": frames, "encoded": st["encoded"], "dropped": st["dropped"],
+            "frames_per_s": round(st["encoded"] / dt, 1), "realtime_x": round(st["encoded"] / dt / fps, 2),
+            "push_us": round(push_s / frames * 1e6, 1), "file_mb": round(size_mb, 2)}
+
+def run(size, fps, display_fps, seconds, frames, codecs=("MJPG", "mp4v")):
+    return {"display": [display_latency(m, size, fps, display_fps, seconds) for m in ("thread", "process")],
+            "recording": [recording(size, fps, frames, c) for c in codecs]}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", default="1280x720")
+    ap.add_argument("--fps", type=float, default=30)
+    ap.add_argument("--display-fps", type=float, default=15)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--frames", type=int, default=300)
+    a = ap.parse_args()
+    res = run(tuple(int(x) for x in a.size.split("x")), a.fps, a.display_fps, a.seconds, a.frames)
+    for d in res["display"]:
+        print(f"{d['mode']:7s} capture {d['capture_fps']} fps, display {d['display_fps']} fps, "
+              f"capture→display p50 {d['lat_p50_ms']} / p99 {d['lat_p99_ms']} ms")
+    for r in res["recording"]:
+        print(f"record {r['codec']}: {r['frames_per_s']} frames/s ({r['realtime_x']}x realtime), {r['dropped']} dropped")
+    print(json.dumps(res))
@@ -0,0 +1,41 @@
+# Command round-trip latency and pipelined throughput against a pty fake
+#   python -m bench.bench_commands [--n 2000]
+import argparse, json, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import yaml
+from core.serial_manager import SerialManager
+from bench.fake_arduino import FakeArduino
+
+class NullBus:
+    def publish(self, topic, payload): pass
+    def publish_many(self, topic, payloads): pass
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 3) if xs else 0.0
+
+def run(n):
+    with open("config/commands.yaml", "r", encoding="utf-8") as f:
+        responses = yaml.safe_load(f).get("responses")
+    fake = FakeArduino()
+    sm = SerialManager(NullBus(), eol="\n", responses=responses)
+    assert sm.open(fake.port)
+    try:
+        rtts = [sm.request("PING").result(2).rtt_ms for _ in range(n)]
+        t0 = time.perf_counter()
+        futs = sm.request_many(["PING"] * n)
+        for f in futs: f.result(10)
+        dt = time.perf_counter() - t0
+    finally:
+        sm.close(); fake.close()
+    return {"n": n, "rtt_p50_ms": pct(rtts, 0.5), "rtt_p99_ms": pct(rtts, 0.99),
+            "sequential_cmd_per_s": round(n / (sum(rtts) / 1000), 1),
+            "pipelined_cmd_per_s": round(n / dt, 1)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    r = run(ap.parse_args().n)
+    print(f"RTT p50 {r['rtt_p50_ms']} ms  p99 {r['rtt_p99_ms']} ms  "
+          f"sequential {r['sequential_cmd_per_s']:.0f}/s  pipelined {r['pipelined_cmd_per_s']:.0f}/s")
+    print(json.dumps(r))
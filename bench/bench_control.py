@@ -0,0 +1,81 @@
+# Control server round trips: dispatch overhead (ping), full serial path (send PING
+# to a pty fake), pipelined commands/s, and bus-event streaming to a subscriber
+#   python -m bench.bench_control [--n 5000] [--unix]
+import argparse, json, os, sys, tempfile, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.event_bus import EventBus
+from core.serial_manager import SerialManager
+from core.serial_hub import SerialHub
+from core.control_server import ControlServer, ControlClient
+from bench.fake_arduino import FakeArduino
+
+RESPONSES = {"default": {"timeout_ms": 1000}, "PING": {"match": "PONG"}}
+
+class BenchEngine:
+    """Just what ControlServer touches."""
+    def __init__(self, port):
+        self.bus = EventBus()
+        self.cfg = {"cameras": {}}
+        self.serial = SerialManager(self.bus, baud=1_000_000, responses=RESPONSES)
+        self.hub = SerialHub(self.bus)
+        assert self.serial.open(port)
+    def camera(self, name): return None
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 3)
+
+def timed(client, n, op, **kw):
+    rtt = []
+    for _ in range(n):
+        t = time.perf_counter()
+        client.call(op, **kw)
+        rtt.append((time.perf_counter() - t) * 1000)
+    return {"p50_ms": pct(rtt, 0.5), "p99_ms": pct(rtt, 0.99), "per_s": round(n / (sum(rtt) / 1000))}
+
+def pipelined(client, n, depth, op, **kw):
+    t = time.perf_counter()
+    done = 0
+    while done < n:
+        k = min(depth, n - done)
+        client.send_many([(op, kw)] * k)
+        for _ in range(k): client.recv()
+        done += k
+    return round(n / (time.perf_counter() - t))
+
+def run(n, unix):
+    fake = FakeArduino()
+    eng = BenchEngine(fake.port)
+    sock = os.path.join(tempfile.mkdtemp(), "udc.sock") if unix else None
+    srv = ControlServer(eng, port=0, unix_socket=sock)
+    addr = srv.start()
+    c = ControlClient(addr)
+    for _ in range(200): c.call("ping")     # warm-up
+    out = {"transport": "unix" if unix else "tcp",
+           "ping": timed(c, n, "ping"),
+           "send_PING": timed(c, n // 5, "send", cmd="PING"),
+           "pipelined_ping_per_s": pipelined(c, n, 64, "ping"),
+           "pipelined_send_per_s": pipelined(c, n // 5, 16, "send", cmd="PING")}
+    c.call("subscribe", topics=["log:line"])
+    lines = 200_000
+    t = time.perf_counter()
+    for i in range(0, lines, 100):
+        eng.bus.publish_many("log:line", [f"M:pos={j} speed=45" for j in range(i, i + 100)])
+    # events queued before this request are written before its reply
+    dropped = c.call("stats")["events_dropped"]
+    got = sum(len(m["data"]) for m in c.events if m["event"] == "log:line")
+    out["stream_lines_per_s"] = round(got / (time.perf_counter() - t))
+    out["stream_dropped"] = dropped
+    c.close(); srv.stop(); eng.serial.close(); fake.close()
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=5000)
+    ap.add_argument("--unix", action="store_true")
+    a = ap.parse_args()
+    r = run(a.n, a.unix)
+    print(f"ping  p50 {r['ping']['p50_ms']} ms  p99 {r['ping']['p99_ms']} ms  ({r['pipelined_ping_per_s']}/s pipelined)")
+    print(f"send  p50 {r['send_PING']['p50_ms']} ms  p99 {r['send_PING']['p99_ms']} ms  ({r['pipelined_send_per_s']}/s pipelined)")
+    print(f"stream {r['stream_lines_per_s']} lines/s ({r['stream_dropped']} dropped for a slow reader)")
+    print(json.dumps(r))
@@ -0,0 +1,84 @@
+# Serial hub scaling: N pty fake devices streaming lines while PING round trips
+# are timed on every device, one hub reader thread vs one SerialManager thread each
+#   python -m bench.bench_hub [--devices 1 2 4 8] [--rate 5000] [--seconds 3]
+import argparse, json, os, sys, threading, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.serial_hub import SerialHub
+from core.serial_manager import SerialManager
+from bench.fake_arduino import FakeArduino
+
+RESPONSES = {"default": {"timeout_ms": 1000}, "PING": {"match": "PONG"}}
+
+class CountingBus:
+    def __init__(self):
+        self.lines = {}
+    def publish(self, topic, payload): pass
+    def publish_many(self, topic, payloads):
+        self.lines[topic] = self.lines.get(topic, 0) + len(payloads)
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 3) if xs else None
+
+def run(n, rate, seconds, mode):
+    fakes = [FakeArduino() for _ in range(n)]
+    bus = CountingBus()
+    if mode == "hub":
+        hub = SerialHub(bus, {f"dev{i}": {"port": f.port} for i, f in enumerate(fakes)},
+                        baud=1_000_000, responses=RESPONSES, mirror_log=False)
+        assert all(hub.connect_all().values())
+        request = lambda i: hub.request(f"dev{i}", "PING")
+        topic = lambda i: f"serial:dev{i}:line"
+    else:
+        sms = [SerialManager(bus, baud=1_000_000, responses=RESPONSES) for _ in fakes]
+        for sm, f in zip(sms, fakes): assert sm.open(f.port)
+        request = lambda i: sms[i].request("PING")
+        topic = lambda i: "log:line"
+    stop = threading.Event()
+    chunk = b"M:pos=123 speed=45\n" * max(1, rate // 100)     # 100 chunks/s per device
+    def stream(f):
+        nxt = time.monotonic()
+        while not stop.is_set():
+            f.write(chunk)
+            nxt += 0.01
+            stop.wait(max(0.0, nxt - time.monotonic()))
+    streams = [threading.Thread(target=stream, args=(f,), daemon=True) for f in fakes]
+    for t in streams: t.start()
+    rtts = {i: [] for i in range(n)}
+    t_end = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        futs = [(i, request(i)) for i in range(n)]
+        for i, fu in futs:
+            try: rtts[i].append(fu.result(timeout=2).rtt_ms)
+            except Exception: pass
+        time.sleep(0.02)
+    stop.set()
+    for t in streams: t.join()
+    time.sleep(0.2)
+    if mode == "hub":
+        hub.close()
+    else:
+        for sm in sms: sm.close()
+    for f in fakes: f.close()
+    all_rtt = [x for v in rtts.values() for x in v]
+    per_dev = [bus.lines.get(topic(i), 0) / seconds for i in range(n)] if mode == "hub" \
+        else [bus.lines.get("log:line", 0) / seconds / n] * n
+    return {"mode": mode, "devices": n, "threads": 1 if mode == "hub" else n,
+            "lines_per_s_per_device": round(min(per_dev)), "sent_per_s_per_device": len(chunk) // 19 * 100,
+            "rtt_p50_ms": pct(all_rtt, 0.5), "rtt_p99_ms": pct(all_rtt, 0.99), "requests": len(all_rtt)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--devices", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--rate", type=int, default=5000, help="lines/s streamed by each device")
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--compare", action="store_true", help="also run one SerialManager per device")
+    a = ap.parse_args()
+    out = []
+    for n in a.devices:
+        for mode in (("hub", "threads") if a.compare else ("hub",)):
+            r = run(n, a.rate, a.seconds, mode)
+            out.append(r)
+            print(f"{mode:7s} {n:2d} dev: {r['lines_per_s_per_device']:6d}/{r['sent_per_s_per_device']} lines/s/dev  "
+                  f"rtt p50 {r['rtt_p50_ms']} ms  p99 {r['rtt_p99_ms']} ms")
+    print(json.dumps(out))
@@ -0,0 +1,40 @@
+# Per-call logging cost under a sustained flood: plain handlers vs the queue listener
+#   python -m bench.bench_logging [--n 200000]
+import argparse, json, logging, os, sys, tempfile, time, io
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.log_setup import start_logging
+
+def flood(n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        logging.info("[SERIAL] %s", f"M:pos={i} speed=45")
+    return (time.perf_counter() - t0) / n * 1e6
+
+def run(n):
+    root = logging.getLogger()
+    out = {}
+    # baseline: what app.setup_logging used to install
+    d = tempfile.mkdtemp()
+    sink = io.StringIO()
+    root.handlers[:] = [logging.FileHandler(os.path.join(d, "plain.log"), encoding="utf-8"), logging.StreamHandler(sink)]
+    for h in root.handlers: h.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    root.setLevel(logging.INFO)
+    out["plain_us_per_call"] = round(flood(n), 2)
+    for h in root.handlers: h.close()
+
+    for fmt in ("text", "jsonl"):
+        d = tempfile.mkdtemp()
+        lst = start_logging({"folder": d, "rotate_mb": 5, "keep_files": 3, "format": fmt}, console=False)
+        out[f"queue_{fmt}_us_per_call"] = round(flood(n), 2)
+        t0 = time.perf_counter(); lst.stop()
+        out[f"queue_{fmt}_drain_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        out[f"queue_{fmt}_files"] = len(os.listdir(d))
+        out[f"queue_{fmt}_dropped"] = lst.handler.dropped
+    root.handlers[:] = []
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200000)
+    r = run(ap.parse_args().n)
+    print(json.dumps(r))
@@ -0,0 +1,83 @@
+# Serial lines/s into the LogPanel: fake Arduino → Engine serial → bus (ui target) → LogPanel store
+#   python -m bench.bench_logpanel [--rates 1000,10000,50000,0] [--seconds 3]
+import argparse, json, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import load_config
+from core.engine import Engine
+from core.line_store import LineStore
+from ui.panels.log_panel import LogPanel
+from bench.fake_arduino import FakeArduino
+from bench.fake_tk import FakeTk
+
+class _Stub:
+    def configure(self, **kw): pass
+
+class HeadlessLogPanel(LogPanel):
+    """LogPanel's real append_many/_flush/store path on a FakeTk loop; the text
+    widget is replaced by a counter (no display here). Skips CTkFrame.__init__."""
+
+    def __init__(self, loop, cfg=None):
+        cfg = cfg or {}
+        self._loop = loop
+        self.store = LineStore(max_lines=cfg.get("max_lines", 1_000_000))
+        self.widget_lines = int(cfg.get("widget_lines", 5000))
+        self.flush_ms = int(cfg.get("flush_ms", 100))
+        self.flush_lines = int(cfg.get("flush_lines", 20000))
+        self.tag = self.info = _Stub()
+        self.also_log_to_file = False
+        self._pending, self._filter = [], None
+        self.max_pending, self.dropped = 10 * self.flush_lines, 0
+        self._ts_sec, self._ts = 0, ""
+        self._tags_seen = 0
+        self.shown = 0
+        self.after(self.flush_ms, self._flush)
+
+    def after(self, ms, fn, *args):
+        return self._loop.after(ms, fn, *args)
+
+    def _show(self, lines, replace=False):
+        self.shown += len(lines[-self.widget_lines:])
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2) if xs else 0.0
+
+def run(rates, seconds, line="M:pos={n} speed=45"):
+    cfg = load_config()
+    rows = []
+    for rate in rates:
+        loop = FakeTk()
+        eng = Engine(cfg.app, cfg.commands)
+        panel = HeadlessLogPanel(loop, cfg.app.get("monitor"))
+        eng.bus.subscribe("log:line", panel.append_many, target="ui")
+        eng.bus.attach_tk(loop, interval_ms=16, budget_ms=8)
+        fake = FakeArduino(respond=False)
+        try:
+            assert eng.connect(fake.port)
+            fake.stream(rate, line)
+            t0 = time.perf_counter()
+            loop.run(seconds)
+            fake.stop_stream()
+            loop.run(0.5)          # drain
+            dt = time.perf_counter() - t0 - 0.5
+            m = eng.bus.metrics().get("ui:log:line", {})
+            rows.append({"target_rate": rate, "streamed": fake.streamed, "stored": len(panel.store),
+                         "lines_per_s": round(len(panel.store) / dt),
+                         "lost": max(0, fake.streamed - len(panel.store)),
+                         "bus_dropped": m.get("dropped", 0),
+                         "bus_lat_p99_ms": m.get("lat_p99_ms", 0.0),
+                         "tick_late_p99_ms": pct(loop.late, 0.99)})
+        finally:
+            eng.close(); fake.close()
+    return rows
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rates", default="1000,10000,50000,0", help="lines/s; 0 = as fast as possible")
+    ap.add_argument("--seconds", type=float, default=3.0)
+    a = ap.parse_args()
+    rows = run([int(x) for x in a.rates.split(",")], a.seconds)
+    for r in rows:
+        print(f"rate {r['target_rate'] or 'max':>6}: {r['lines_per_s']:>8} lines/s stored, lost {r['lost']}, "
+              f"bus p99 {r['bus_lat_p99_ms']} ms, tick late p99 {r['tick_late_p99_ms']} ms")
+    print(json.dumps(rows))
@@ -0,0 +1,78 @@
+# Macro engine on a pty Arduino and fake ADU: step lateness, drift vs a sleep loop, pause/cancel
+#   python -m bench.bench_macro [--cycles 200] [--wait-ms 20]
+import argparse, json, os, sys, tempfile, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import load_config
+from core.engine import Engine
+from bench.fake_arduino import FakeArduino, replies_from_commands
+from bench.fake_adu import FakeADU
+
+def _macros(cycles, wait_s, folder):
+    timed = [{"send": "M_ON"}, {"wait": wait_s}, {"send": "M_OFF"}, {"adu": "LIGHT_ON"},
+             {"wait": wait_s}, {"adu": "LIGHT_OFF"}, {"wait": wait_s}]
+    reply = [{"send": "C_ON", "expect": "^OK C_ON"},
+             {"if": {"match": "OK"}, "then": [{"adu": "USB_ON"}], "else": [{"log": "no reply {i}"}]},
+             {"wait": wait_s}]
+    return {"settings": {"path": folder},
+            "macros": {"timed": {"steps": [{"repeat": cycles, "steps": timed}]},
+                       "reply": {"steps": [{"repeat": max(1, cycles // 4), "steps": reply}]},
+                       "long": {"steps": [{"repeat": "forever", "steps": [{"send": "M_ON"}, {"wait": wait_s}]}]}}}
+
+def sleep_loop(eng, cycles, wait_s):
+    """What a script does today: write, time.sleep(wait), write ... Returns drift in ms."""
+    t0 = time.monotonic()
+    for _ in range(cycles):
+        eng.serial.write_line("M_ON"); time.sleep(wait_s)
+        eng.serial.write_line("M_OFF"); eng.adu.action("LIGHT_ON"); time.sleep(wait_s)
+        eng.adu.action("LIGHT_OFF"); time.sleep(wait_s)
+    return round((time.monotonic() - t0 - 3 * wait_s * cycles) * 1000, 2)
+
+def host_sleep_ms(n=300, s=0.002):
+    """Plain time.sleep overshoot on this machine: the floor under any lateness figure."""
+    xs = []
+    for _ in range(n):
+        t = time.perf_counter(); time.sleep(s)
+        xs.append((time.perf_counter() - t - s) * 1000)
+    xs.sort()
+    return {"p50": round(xs[n // 2], 3), "p99": round(xs[int(n * 0.99)], 3), "max": round(xs[-1], 3)}
+
+def run(cycles=200, wait_s=0.02, adu_latency_s=0.004):
+    cfg = load_config()
+    fake = FakeArduino(replies=replies_from_commands(cfg.commands))
+    eng = Engine(cfg.app, cfg.commands)
+    eng.adu.close()
+    eng.adu = FakeADU.from_commands(cfg.commands, latency_s=adu_latency_s)
+    macros = _macros(cycles, wait_s, tempfile.mkdtemp(prefix="bench-macro-"))
+    try:
+        assert eng.connect(fake.port)
+        rep = eng.macro("timed", macros).run()
+        planned = rep["planned_s"]
+        timed = {k: rep[k] for k in ("ok", "cycles", "steps", "late_p50_ms", "late_p99_ms", "late_max_ms",
+                                     "late_over_1ms", "resyncs")}
+        timed["drift_ms"] = round((rep["wall_s"] - planned) * 1000, 2)
+        reply = eng.macro("reply", macros).run()
+        # pause for 200 ms mid-run, then cancel: the plan clock must skip the pause
+        r = eng.macro("long", macros)
+        r.start(); time.sleep(0.1)
+        r.pause(); time.sleep(0.2); r.resume(); time.sleep(0.1)
+        t = time.perf_counter(); r.cancel(); r.wait(2)
+        control = {"state": r.report["state"], "paused_s": r.report["paused_s"],
+                   "cancel_ms": round((time.perf_counter() - t) * 1000, 2), "late_max_ms": r.report["late_max_ms"]}
+        sleep_drift = sleep_loop(eng, cycles, wait_s)
+    finally:
+        eng.close(); fake.close()
+    return {"timed": timed, "sleep_loop_drift_ms": sleep_drift, "host_sleep_over_ms": host_sleep_ms(),
+            "reply": {k: reply[k] for k in ("ok", "cycles", "steps", "failed", "late_p99_ms", "wall_s")},
+            "control": control}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cycles", type=int, default=200)
+    ap.add_argument("--wait-ms", type=float, default=20.0)
+    a = ap.parse_args()
+    res = run(a.cycles, a.wait_ms / 1000)
+    t = res["timed"]
+    print(f"{t['cycles']} cycles: late p50 {t['late_p50_ms']} / p99 {t['late_p99_ms']} / max {t['late_max_ms']} ms, "
+          f"drift {t['drift_ms']} ms (sleep loop {res['sleep_loop_drift_ms']} ms); "
+          f"cancel in {res['control']['cancel_ms']} ms")
+    print(json.dumps(res))
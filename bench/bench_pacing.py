@@ -0,0 +1,92 @@
+# Camera pacing on the synthetic source: achieved fps, jitter, decode savings, load adaptation
+#   python -m bench.bench_pacing [--seconds 3] [--size 1280x720] [--jpeg 80]
+import argparse, json, os, sys, threading, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.camera_worker import CameraWorker
+from core.pacing import Pacer
+from core.synthetic_source import open_capture
+
+def legacy(size, fps, sensor_fps, seconds, jpeg_quality=0):
+    """The pre-pacing loop: cap.read() then sleep(1/fps) on top, every frame decoded."""
+    cap = open_capture("synthetic", size[0], size[1], sensor_fps)
+    cap.jpeg_quality = jpeg_quality
+    delay = max(1.0 / fps, 0.02)
+    p, n, t_end = Pacer(fps), 0, time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        ok, frame = cap.read()
+        if ok:
+            n += 1
+            now = time.monotonic()
+            if p.last is not None: p.intervals.append(now - p.last)
+            p.last = now
+        time.sleep(delay)
+    cap.release()
+    st = p.stats()
+    return {"fps": round(n / seconds, 1), "jitter_ms": st["jitter_ms"], "p99_dev_ms": st["p99_dev_ms"],
+            "decoded": n}
+
+def paced(size, fps, sensor_fps, seconds, reader_hz=0, jpeg_quality=0):
+    """CameraWorker with a mailbox reader polling at reader_hz (0 = nobody watching)."""
+    w = CameraWorker("synthetic", size[0], size[1], fps, sensor_fps=sensor_fps)
+    w.start()
+    w.cap.jpeg_quality = jpeg_quality     # decode cost lands in retrieve(), as with MJPG
+    stop = threading.Event()
+    got = [0]
+    def reader():
+        seq = 0
+        while not stop.wait(1.0 / reader_hz):
+            item = w.mailbox.get(seq)
+            if item: seq = item[0]; got[0] += 1
+    if reader_hz: threading.Thread(target=reader, daemon=True).start()
+    time.sleep(seconds)
+    stop.set()
+    st = w.stats()
+    slots = w.pacer.slots
+    w.stop()
+    return {"fps": round(slots / seconds, 1), "jitter_ms": st["jitter_ms"], "p99_dev_ms": st["p99_dev_ms"],
+            "decoded": st["decoded"], "decode_skipped": st["decode_skipped"], "reader_frames": got[0],
+            "decode_saved_pct": round(100 * st["decode_skipped"] / max(1, slots), 1)}
+
+def adaptation(size, fps, seconds):
+    """Consumer lag forced high for `seconds`, then cleared: rungs walked down and back."""
+    lag = {"v": 1.0}
+    w = CameraWorker("synthetic", size[0], size[1], fps, lag=lambda: lag["v"],
+                     pacing={"recover_s": 1, "min_fps": 5})
+    w.start()
+    levels = []
+    t_end = time.monotonic() + seconds * 2 + 6
+    t_clear = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        if time.monotonic() >= t_clear: lag["v"] = 0.0
+        levels.append(w.adapter.level)
+        time.sleep(0.25)
+    st = w.stats()
+    w.stop()
+    return {"max_level": max(levels), "final_level": st["level"], "adaptations": st["adaptations"],
+            "ladder": [f for f, _ in w.adapter.ladder]}
+
+def run(size=(1280, 720), seconds=3.0, cases=((20, 20), (20, 30), (15, 60)), jpeg_quality=80):
+    out = {}
+    for fps, sensor in cases:
+        out[f"{fps}of{sensor}"] = {"legacy": legacy(size, fps, sensor, seconds, jpeg_quality),
+                                  "paced": paced(size, fps, sensor, seconds, fps, jpeg_quality),
+                                  "paced_idle": paced(size, fps, sensor, seconds, 0, jpeg_quality)}
+    out["adaptation"] = adaptation(size, 20, seconds)
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--size", default="1280x720")
+    ap.add_argument("--jpeg", type=int, default=80, help="synthetic decode cost (0 = raw frames)")
+    a = ap.parse_args()
+    res = run(tuple(int(x) for x in a.size.split("x")), a.seconds, jpeg_quality=a.jpeg)
+    for k, r in res.items():
+        if k == "adaptation": continue
+        print(f"target {k.replace('of', ' fps of sensor ')} fps: legacy {r['legacy']['fps']} fps "
+              f"(jitter {r['legacy']['jitter_ms']} ms), paced {r['paced']['fps']} fps "
+              f"(jitter {r['paced']['jitter_ms']} ms), idle decode saved {r['paced_idle']['decode_saved_pct']}%")
+    ad = res["adaptation"]
+    print(f"adaptation: ladder {ad['ladder']}, reached level {ad['max_level']}, back to {ad['final_level']} "
+          f"after {ad['adaptations']} changes")
+    print(json.dumps(res))
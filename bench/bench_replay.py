@@ -0,0 +1,44 @@
+# Session record → replay round trip: write rate, seek time, max-speed replay rate
+#   python -m bench.bench_replay [--events 500000]
+import argparse, json, os, sys, tempfile, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.event_bus import EventBus
+from core.session import SessionRecorder, SessionReader, Replayer
+
+def run(n):
+    d = tempfile.mkdtemp()
+    bus = EventBus()
+    rec = SessionRecorder(bus, folder=d, name="bench")
+    t0 = time.perf_counter()
+    for i in range(0, n, 100):
+        bus.publish_many("log:line", [f"M:pos={j} speed=45" for j in range(i, i + 100)])
+        if i % 10000 == 0: bus.publish("conn:state", {"connected": True, "port": "COM7"})
+    pub_s = time.perf_counter() - t0
+    rec.stop()
+    write_s = time.perf_counter() - t0
+    size = os.path.getsize(rec.path + ".udcs")
+
+    rd = SessionReader(rec.path)
+    dur = rd.duration()
+    t0 = time.perf_counter()
+    first = next(rd.records(start=dur / 2))
+    seek_ms = (time.perf_counter() - t0) * 1000
+    rd.close()
+
+    out = EventBus()
+    got = [0]
+    out.configure("log:line", mode="batch", maxlen=1 << 20)
+    out.subscribe("log:line", lambda b: got.__setitem__(0, got[0] + len(b)))
+    rp = Replayer(out, rec.path, speed=None)
+    t0 = time.perf_counter()
+    rp.run()
+    replay_s = time.perf_counter() - t0
+    return {"events": rec.records, "bytes_per_event": round(size / rec.records, 1),
+            "publish_us_per_event": round(pub_s / n * 1e6, 2), "record_events_per_s": round(rec.records / write_s),
+            "seek_ms": round(seek_ms, 3), "seek_landed_at": round(first[0], 4),
+            "replay_events_per_s": round(rp.published / replay_s)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=500000)
+    print(json.dumps(run(ap.parse_args().events)))
@@ -0,0 +1,40 @@
+# Scan time vs port count against pty fake devices
+#   python -m bench.bench_scan [--counts 1,2,4,8,16] [--latency 0.05]
+import argparse, json, os, sys, tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.device_scanner import DeviceScanner
+from bench.fake_arduino import FakeArduino
+
+class NullBus:
+    def publish(self, topic, payload): pass
+
+def run(counts, latency, timeout_ms):
+    cfg = {"baudrate": 115200, "ping": "PING", "pong": "PONG", "eol": "\n",
+           "scan_timeout_ms": timeout_ms, "scan_settle_ms": 0, "scan_workers": 32,
+           "port_cache": os.path.join(tempfile.mkdtemp(), "last_port.json")}
+    rows = []
+    for n in counts:
+        # the only responder sits last, the worst case for a sequential scan
+        fakes = [FakeArduino(respond=False) for _ in range(n - 1)] + [FakeArduino(latency_s=latency)]
+        try:
+            if os.path.exists(cfg["port_cache"]): os.remove(cfg["port_cache"])
+            sc = DeviceScanner(NullBus(), cfg)
+            cold = sc.scan([f.port for f in fakes])
+            warm = sc.scan([f.port for f in fakes])
+            assert cold["best"] == fakes[-1].port and warm["via"] == "cache"
+            rows.append({"ports": n, "cold_ms": cold["elapsed_ms"], "cached_ms": warm["elapsed_ms"],
+                         "probe_ms": cold["timings"][fakes[-1].port]["ms"]})
+        finally:
+            for f in fakes: f.close()
+    return rows
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--counts", default="1,2,4,8,16")
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--timeout-ms", type=int, default=800)
+    a = ap.parse_args()
+    rows = run([int(x) for x in a.counts.split(",")], a.latency, a.timeout_ms)
+    for r in rows:
+        print(f"{r['ports']:3d} ports: cold {r['cold_ms']:7.1f} ms  cached {r['cached_ms']:7.1f} ms  (responder probe {r['probe_ms']:.1f} ms)")
+    print(json.dumps(rows))
@@ -0,0 +1,50 @@
+# Serial read/framing throughput through a pty pair
+#   python -m bench.bench_serial [--seconds 3] [--line "M:pos=123 speed=45"] [--crlf]
+import argparse, json, os, sys, threading, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.serial_manager import SerialManager
+from bench.fake_arduino import FakeArduino
+
+class CountingBus:
+    def __init__(self):
+        self.lines = 0
+        self.batches = 0
+    def publish(self, topic, payload): pass
+    def publish_many(self, topic, payloads):
+        self.lines += len(payloads)
+        self.batches += 1
+
+def run(seconds, line, crlf):
+    fake = FakeArduino(respond=False)
+    payload = ((line + ("\r\n" if crlf else "\n")) * 512).encode()
+    bus = CountingBus()
+    sm = SerialManager(bus, baud=1_000_000, eol="\n")
+    assert sm.open(fake.port)
+    stop = threading.Event()
+    sent = [0]
+    def writer():
+        while not stop.is_set():
+            fake.write(payload)
+            sent[0] += len(payload)
+    t = threading.Thread(target=writer, daemon=True)
+    t.start()
+    time.sleep(seconds)
+    stop.set(); t.join()
+    time.sleep(0.2)   # let the reader drain
+    st = sm.stats()
+    sm.close(); fake.close()
+    st.update(sent_bytes=sent[0], published_lines=bus.lines, batches=bus.batches,
+              lines_per_batch=round(bus.lines / max(1, bus.batches), 1),
+              mbaud_equiv=round(st["bytes_per_s"] * 10 / 1e6, 2))
+    return st
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--line", default="M:pos=123 speed=45")
+    ap.add_argument("--crlf", action="store_true")
+    a = ap.parse_args()
+    st = run(a.seconds, a.line, a.crlf)
+    print(f"{st['bytes_per_s']/1e3:.0f} kB/s  {st['lines_per_s']:.0f} lines/s  "
+          f"(≈{st['mbaud_equiv']} Mbaud, {st['lines_per_batch']} lines/batch)")
+    print(json.dumps(st))
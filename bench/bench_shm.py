@@ -0,0 +1,78 @@
+# Thread vs process capture: synthetic cameras, several consumers per camera,
+# and a UI-like tick loop on the main thread to expose GIL contention
+#   python -m bench.bench_shm [--cams 2] [--size 1280x720] [--fps 60] [--seconds 5]
+import argparse, json, os, sys, threading, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import cv2
+from core.camera_worker import CameraWorker, RateMeter
+from core.vision_check import VisionCheck
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2) if xs else None
+
+class Display(threading.Thread):
+    """Display-like consumer: newest frame, downscale + colour convert at `fps`."""
+    def __init__(self, worker, fps=30):
+        super().__init__(daemon=True)
+        self.w, self.interval, self.seq = worker, 1.0 / fps, 0
+        self.shm = worker.consumer("display") if worker.mode == "process" else None
+        self.rate, self.stop = RateMeter(), threading.Event()
+        self.buf = np.empty((360, 640, 3), np.uint8)
+    def run(self):
+        while not self.stop.wait(self.interval):
+            item = self.shm.latest() if self.shm is not None else self.w.mailbox.get(self.seq)
+            if item is None: continue
+            self.seq = item[0]
+            small = cv2.resize(item[2], (640, 360), interpolation=cv2.INTER_AREA)
+            item = None
+            if self.shm is not None and not self.shm.still_valid(self.seq): continue
+            cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.buf)
+            self.rate.tick()
+
+def run(mode, cams, size, fps, seconds):
+    w, h = size
+    workers = [CameraWorker(f"synthetic:{i}", w, h, fps, mode=mode, shm_slots=8) for i in range(cams)]
+    for wk in workers: wk.start()
+    assert all(wk.cap is not None for wk in workers), "capture did not start"
+    displays = [Display(wk) for wk in workers]
+    visions = [VisionCheck(wk, {"analysis_fps": 15}) for wk in workers]
+    for d in displays: d.start()
+    for v in visions: v.start()
+    time.sleep(0.5)
+    # main thread plays the Tk loop: 16 ms ticks with a little Python work each
+    jitter, t_end = [], time.monotonic() + seconds
+    nxt = time.monotonic()
+    while time.monotonic() < t_end:
+        nxt += 0.016
+        time.sleep(max(0.0, nxt - time.monotonic()))
+        jitter.append((time.monotonic() - nxt) * 1000)
+        sum(i * i for i in range(2000))
+    out = {"mode": mode, "cams": cams, "size": f"{w}x{h}", "target_fps": fps,
+           "capture_fps": [round(wk.capture_rate.rate, 1) for wk in workers],
+           "display_fps": [round(d.rate.rate, 1) for d in displays],
+           "vision_ms": [round(v.analyze_ms, 2) for v in visions],
+           "mailbox_dropped": [wk.mailbox.dropped for wk in workers],
+           "consumers": [wk.consumer_stats() for wk in workers],
+           "ui_tick_late_p50_ms": pct(jitter, 0.5), "ui_tick_late_p99_ms": pct(jitter, 0.99)}
+    for v in visions: v.stop()
+    for d in displays: d.stop.set()
+    for d in displays: d.join()
+    time.sleep(0.2)
+    for wk in workers: wk.stop()
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cams", type=int, default=2)
+    ap.add_argument("--size", default="1280x720")
+    ap.add_argument("--fps", type=float, default=60)
+    ap.add_argument("--seconds", type=float, default=5)
+    a = ap.parse_args()
+    size = tuple(int(x) for x in a.size.split("x"))
+    res = [run(m, a.cams, size, a.fps, a.seconds) for m in ("thread", "process")]
+    for r in res:
+        print(f"{r['mode']:7s} capture {r['capture_fps']} display {r['display_fps']} "
+              f"ui late p50 {r['ui_tick_late_p50_ms']} / p99 {r['ui_tick_late_p99_ms']} ms")
+    print(json.dumps(res))
@@ -0,0 +1,62 @@
+# Startup cost in fresh interpreters: imports, config load (cold/warm cache), Engine construction
+#   python -m bench.bench_startup [--runs 5]
+# Window construction needs a display; a real GUI start writes its phases to logs/startup_profile.jsonl.
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+t = {}; t0 = time.perf_counter()
+def mark(name):
+    global t0
+    now = time.perf_counter(); t[name] = (now - t0) * 1000; t0 = now
+from core.config import load_config; mark("import_config")
+cfg = load_config(cache=sys.argv[1]); mark("load_config")
+from core.engine import Engine; mark("import_engine")
+eng = Engine(cfg.app, cfg.commands); mark("engine")
+eng.close()
+if sys.argv[2] == "gui":
+    t0 = time.perf_counter()
+    import customtkinter; mark("import_customtkinter")
+    import ui.main_window; mark("import_main_window")
+    import cv2, numpy, PIL.ImageTk; mark("import_imaging")
+print(json.dumps(t))
+"""
+
+def once(cache, gui):
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-c", PROBE, cache, "gui" if gui else "headless"],
+                       cwd=ROOT, capture_output=True, text=True, check=True)
+    out = json.loads(p.stdout.strip().splitlines()[-1])
+    out["process_total"] = (time.perf_counter() - t0) * 1000
+    return out
+
+def run(runs):
+    base = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        base.append((time.perf_counter() - t0) * 1000)
+    cache = os.path.join(tempfile.mkdtemp(prefix="bench-startup-"), "config.json")
+    cold = once(cache, gui=False)                    # no cache file yet
+    warm = [once(cache, gui=False) for _ in range(runs)]
+    gui = [once(cache, gui=True) for _ in range(runs)]
+    med = lambda rows, k: round(statistics.median(r[k] for r in rows), 2)
+    return {"interpreter_ms": round(statistics.median(base), 2),
+            "config_cold_ms": round(cold["load_config"], 2),
+            "config_warm_ms": med(warm, "load_config"),
+            "import_engine_ms": med(warm, "import_engine"),
+            "engine_ms": med(warm, "engine"),
+            "headless_total_ms": med(warm, "process_total"),
+            "import_customtkinter_ms": med(gui, "import_customtkinter"),
+            "import_main_window_ms": med(gui, "import_main_window"),
+            "import_imaging_ms": med(gui, "import_imaging"),
+            "gui_imports_total_ms": med(gui, "process_total")}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    res = run(ap.parse_args().runs)
+    for k, v in res.items(): print(f"{k:26s} {v:8.1f}")
+    print(json.dumps(res))
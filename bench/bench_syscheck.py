@@ -0,0 +1,45 @@
+# Full System Check on fakes: pty Arduino, synthetic cameras, fake ADU, auto-confirming operator
+#   python -m bench.bench_syscheck [--adu-latency-ms 4]
+import argparse, copy, json, os, sys, tempfile, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config import load_config
+from core.engine import Engine
+from bench.fake_arduino import FakeArduino, replies_from_commands
+from bench.fake_adu import FakeADU
+
+def run(adu_latency_s=0.004):
+    cfg = load_config()
+    app = copy.deepcopy(cfg.app)
+    for i, cam in enumerate(("cam_a", "cam_b")):
+        app["cameras"][cam].update(index=f"synthetic:{i}", capture="thread")
+    check = copy.deepcopy(cfg.syscheck)
+    check["report"] = {"save": True, "path": tempfile.mkdtemp(prefix="bench-syscheck-")}
+    replies = replies_from_commands(cfg.commands)
+    for st in check.get("steps", []):
+        for item in st.get("sequence", []): replies[item["send"]] = (0.0, [f"OK {item['send']}"])
+    fake = FakeArduino(replies=replies)
+    eng = Engine(app, cfg.commands)
+    eng.adu.close()
+    eng.adu = adu = FakeADU.from_commands(cfg.commands, latency_s=adu_latency_s)
+    prompts = []
+    try:
+        assert eng.connect(fake.port)
+        sc = eng.syscheck(check, confirm=lambda p, timeout=None: prompts.append(p) or True)
+        t0 = time.perf_counter()
+        rep = sc.run()
+        wall = (time.perf_counter() - t0) * 1000
+    finally:
+        eng.close(); fake.close()
+    return {"ok": rep["ok"], "total_ms": rep["total_ms"], "wall_ms": round(wall, 1),
+            "critical_path_ms": rep["critical_path"]["ms"], "critical_path": rep["critical_path"]["steps"],
+            "steps": {s["name"]: {"state": s["state"], "wall_ms": s["wall_ms"]} for s in rep["steps"]},
+            "operator_prompts": len(prompts),
+            "adu_action_ms": [round((e - s) * 1000, 2) for _, s, e in adu.calls]}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--adu-latency-ms", type=float, default=4.0)
+    res = run(ap.parse_args().adu_latency_ms / 1000)
+    print(f"ok={res['ok']} total {res['total_ms']} ms, critical path {res['critical_path_ms']} ms "
+          f"({' → '.join(res['critical_path'])}), {res['operator_prompts']} operator prompts")
+    print(json.dumps(res))
@@ -0,0 +1,43 @@
+# Telemetry parse/ingest throughput vs the plain text path, plus plot downsampling
+#   python -m bench.bench_telemetry [--lines 1000000]
+import argparse, json, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.telemetry import Telemetry, minmax, lttb
+from core.line_store import LineStore
+
+CFG = {"chunk_rows": 65536, "max_rows": 8_000_000,
+       "channels": {"motor": {"prefix": "M:", "fields": ["pos", "speed"]},
+                    "temp": {"pattern": r"^T:(?P<c>-?\d+(?:\.\d+)?)$"}}}
+
+def run(n, batch=256):
+    lines = [f"M:pos={i} speed={i % 97}" if i % 10 else f"T:{20 + i % 7}.5" for i in range(n)]
+    batches = [lines[i:i + batch] for i in range(0, n, batch)]
+
+    store = LineStore(max_lines=n)
+    t0 = time.perf_counter()
+    for b in batches: store.extend(b)
+    text_s = time.perf_counter() - t0
+
+    tel = Telemetry(CFG)
+    t0 = time.perf_counter()
+    for i, b in enumerate(batches): tel.feed(b, ts=i * 0.001 * batch)
+    tel_s = time.perf_counter() - t0
+
+    ch = tel.channels["motor"]
+    t0 = time.perf_counter(); ch.window(); raw_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter(); tw, _ = ch.window(points=1000); env_ms = (time.perf_counter() - t0) * 1000
+    t, v = ch.window()
+    t0 = time.perf_counter(); minmax(t, v[:, 0], 1000); mm_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter(); lttb(t, v[:, 0], 1000); lt_ms = (time.perf_counter() - t0) * 1000
+    return {"lines": n, "text_lines_per_s": round(n / text_s), "telemetry_lines_per_s": round(n / tel_s),
+            "rows": int(tel.parsed), "motor_mb": round(tel.channels["motor"].nbytes / 2**20, 1),
+            "minmax_1000_ms": round(mm_ms, 2), "lttb_1000_ms": round(lt_ms, 2),
+            "window_all_ms": round(raw_ms, 2), "window_all_1000px_ms": round(env_ms, 2), "window_1000px_rows": len(tw)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=1_000_000)
+    r = run(ap.parse_args().lines)
+    print(f"text path {r['text_lines_per_s']:,} lines/s · telemetry {r['telemetry_lines_per_s']:,} lines/s · "
+          f"minmax {r['minmax_1000_ms']} ms · lttb {r['lttb_1000_ms']} ms over {r['rows']:,} rows")
+    print(json.dumps(r))
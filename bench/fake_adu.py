@@ -0,0 +1,37 @@
+# Fake ADU relay box with the ADUClient interface, for hardware-free benchmarks
+import threading, time
+
+class FakeADU:
+    """Drop-in for core.adu_client.ADUClient.
+
+    Each action costs `latency_s` (one USB HID round-trip on the real box) and
+    is serialised like the DLL handle. Actions named <RELAY>_ON / <RELAY>_OFF
+    switch `state[RELAY]`; anything not in `actions` fails. `calls` keeps
+    (action, start, end) for latency checks."""
+
+    def __init__(self, actions=None, latency_s=0.004, fail=()):
+        self.ready = True
+        self.actions = set(actions) if actions is not None else None
+        self.latency = latency_s
+        self.fail = set(fail)
+        self.state = {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_commands(cls, commands_cfg, **kw):
+        return cls([b["action"] for b in commands_cfg.get("adu_buttons") or []], **kw)
+
+    def action(self, name: str):
+        t0 = time.perf_counter()
+        with self._lock:
+            if self.latency: time.sleep(self.latency)
+            ok = (self.actions is None or name in self.actions) and name not in self.fail
+            if ok:
+                relay, _, val = name.rpartition("_")
+                if relay and val in ("ON", "OFF"): self.state[relay] = val == "ON"
+        self.calls.append((name, t0, time.perf_counter()))
+        return ok
+
+    def close(self):
+        self.ready = False
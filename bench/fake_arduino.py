@@ -0,0 +1,107 @@
+# pty-backed fake Arduino for hardware-free benchmarks (POSIX only)
+import os, tty, select, threading, time
+
+def replies_from_commands(commands_cfg, version="FAKE 1.0"):
+    """Reply table for every commands.yaml button: `OK <cmd>` by default,
+    VER → version, HELP → one line per command, RESET → READY after a reboot pause."""
+    cmds = [b["cmd"] for b in (commands_cfg or {}).get("arduino_buttons") or []]
+    table = {c: (0.0, [f"OK {c}"]) for c in cmds}
+    table["VER"] = (0.0, [version])
+    table["HELP"] = (0.0, [f"{c}: {c.lower()}" for c in cmds] or ["no commands"])
+    table["RESET"] = (0.05, ["READY"])
+    return table
+
+class FakeArduino:
+    """Opens a pty pair; `self.port` is the slave path to hand to pyserial.
+    Answers PING with PONG (after `latency_s`) unless `respond=False`, which
+    models a USB-serial adapter with something else on the other end.
+
+    `replies` maps a command to (delay_s, [lines]) (see replies_from_commands);
+    unknown commands get nothing back. stream(rate, line) emits unsolicited
+    telemetry-style lines at `rate` lines/s until stop_stream()."""
+
+    def __init__(self, ping="PING", pong="PONG", eol="\n", respond=True, latency_s=0.0, replies=None):
+        self.ping, self.pong, self.eol = ping, pong, eol.encode()
+        self.respond, self.latency = respond, latency_s
+        self.replies = replies or {}
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.received = []
+        self.streamed = 0
+        self.stop = threading.Event()
+        self._wlock = threading.Lock()
+        self._stream_stop = threading.Event()
+        self._stream = None
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def write(self, data: bytes):
+        with self._wlock:
+            view = memoryview(data)
+            while view:
+                try:
+                    n = os.write(self.master, view)
+                except BlockingIOError:
+                    time.sleep(0.0005); continue
+                view = view[n:]
+
+    def write_lines(self, lines):
+        self.write(b"".join(l.encode() + self.eol for l in lines))
+
+    def handle(self, line: str):
+        if not self.respond: return
+        if line == self.ping:
+            if self.latency: time.sleep(self.latency)
+            self.write(self.pong.encode() + self.eol)
+        elif line in self.replies:
+            delay, lines = self.replies[line]
+            if delay or self.latency: time.sleep(delay + self.latency)
+            self.write_lines(lines)
+
+    def stream(self, rate, line="M:pos={n} speed=45", chunk_s=0.005):
+        """Emit `line` (formatted with n=counter) at `rate` lines/s; rate=0 → as fast as the pty takes it."""
+        self.stop_stream()
+        self._stream_stop.clear()
+        def run():
+            t0, n = time.perf_counter(), 0
+            while not self._stream_stop.is_set() and not self.stop.is_set():
+                due = int((time.perf_counter() - t0) * rate) if rate else n + 256
+                if due <= n:
+                    time.sleep(chunk_s); continue
+                self.write_lines([line.format(n=i) for i in range(n, due)])
+                self.streamed += due - n
+                n = due
+        self._stream = threading.Thread(target=run, daemon=True)
+        self._stream.start()
+
+    def stop_stream(self):
+        if self._stream is not None:
+            self._stream_stop.set()
+            self._stream.join(timeout=1)
+            self._stream = None
+
+    def _loop(self):
+        buf = b""
+        while not self.stop.is_set():
+            r, _, _ = select.select([self.master], [], [], 0.05)
+            if not r: continue
+            try:
+                chunk = os.read(self.master, 4096)
+            except OSError:
+                break
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                s = line.decode(errors="ignore").strip()
+                if s:
+                    self.received.append(s)
+                    self.handle(s)
+
+    def close(self):
+        self.stop_stream()
+        self.stop.set()
+        self.thread.join(timeout=1)
+        for fd in (self.master, self.slave):
+            try: os.close(fd)
+            except OSError: pass
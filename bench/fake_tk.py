@@ -0,0 +1,40 @@
+# Minimal stand-in for the Tk main loop: after() timers run on the calling thread
+import heapq, itertools, time
+
+class FakeTk:
+    """Enough of a Tk widget for EventBus.attach_tk and panels' after() loops,
+    so ui-target paths can be measured without a display. run() services
+    timers until `seconds` pass; `late` collects how late each timer fired (ms)."""
+
+    def __init__(self):
+        self._timers = []
+        self._ids = itertools.count(1)
+        self._cancelled = set()
+        self.late = []
+
+    def after(self, ms, fn, *args):
+        tid = next(self._ids)
+        heapq.heappush(self._timers, (time.perf_counter() + ms / 1000.0, tid, fn, args))
+        return tid
+
+    def after_cancel(self, tid):
+        self._cancelled.add(tid)
+
+    def winfo_viewable(self):
+        return True
+
+    def run(self, seconds):
+        end = time.perf_counter() + seconds
+        while self._timers:
+            due, tid, fn, args = self._timers[0]
+            now = time.perf_counter()
+            if due > end: break
+            if due > now:
+                time.sleep(due - now); continue
+            heapq.heappop(self._timers)
+            if tid in self._cancelled:
+                self._cancelled.discard(tid); continue
+            self.late.append((now - due) * 1000)
+            fn(*args)
+        left = end - time.perf_counter()
+        if left > 0: time.sleep(left)
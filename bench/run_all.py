@@ -0,0 +1,117 @@
+# Run the hardware-free benchmark suite and write one JSON result file
+#   python -m bench.run_all [--quick] [--only scan,bus] [--out FILE] [--compare OLD.json [--threshold 10] [--fail]]
+import argparse, json, os, platform, subprocess, sys, time, traceback
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from version import __version__
+
+# name -> (module, kwargs for a full run, kwargs for --quick)
+SCENARIOS = {
+    "scan":      ("bench.bench_scan", dict(counts=[1, 2, 4, 8, 16], latency=0.05, timeout_ms=800),
+                  dict(counts=[1, 4], latency=0.05, timeout_ms=300)),
+    "serial":    ("bench.bench_serial", dict(seconds=3.0, line="M:pos=123 speed=45", crlf=False),
+                  dict(seconds=1.0, line="M:pos=123 speed=45", crlf=False)),
+    "commands":  ("bench.bench_commands", dict(n=2000), dict(n=300)),
+    "logpanel":  ("bench.bench_logpanel", dict(rates=[1000, 10000, 50000, 0], seconds=3.0),
+                  dict(rates=[10000, 0], seconds=1.0)),
+    "bus":       ("bench.bench_bus", dict(rate=2000, seconds=2.0, burst=200000),
+                  dict(rate=2000, seconds=0.5, burst=50000)),
+    "capture":   ("bench.bench_capture", dict(size=(1280, 720), fps=30, display_fps=15, seconds=3.0, frames=300),
+                  dict(size=(640, 480), fps=30, display_fps=15, seconds=1.0, frames=60)),
+    "pacing":    ("bench.bench_pacing", dict(size=(1280, 720), seconds=3.0),
+                  dict(size=(640, 480), seconds=2.0, cases=((20, 30),))),
+    "macro":     ("bench.bench_macro", dict(cycles=200, wait_s=0.02), dict(cycles=40, wait_s=0.02)),
+    "adu":       ("bench.bench_adu", dict(n=500, latency_s=0.004), dict(n=100, latency_s=0.004)),
+    "startup":   ("bench.bench_startup", dict(runs=5), dict(runs=2)),
+    "syscheck":  ("bench.bench_syscheck", dict(adu_latency_s=0.004), dict(adu_latency_s=0.004)),
+}
+
+HIGHER = ("_per_s", "fps", "realtime_x")           # bigger is better
+LOWER = ("_ms", "_us", "lost", "dropped", "torn")   # smaller is better
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run(names, quick=False):
+    import importlib
+    out = {"meta": {"version": __version__, "git": _git_rev(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count(), "quick": quick},
+           "results": {}, "errors": {}}
+    for name in names:
+        mod, full, fast = SCENARIOS[name]
+        print(f"[{name}] ...", flush=True)
+        t0 = time.perf_counter()
+        try:
+            out["results"][name] = importlib.import_module(mod).run(**(fast if quick else full))
+        except Exception as e:
+            out["errors"][name] = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        print(f"[{name}] {time.perf_counter() - t0:.1f} s", flush=True)
+    return out
+
+def flatten(obj, prefix=""):
+    """{"a": [{"x": 1}]} → {"a.0.x": 1}; numbers only."""
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return {prefix: obj} if isinstance(obj, (int, float)) and not isinstance(obj, bool) else {}
+    flat = {}
+    for k, v in items:
+        flat.update(flatten(v, f"{prefix}.{k}" if prefix else str(k)))
+    return flat
+
+def direction(key):
+    leaf = key.rsplit(".", 1)[-1]
+    if any(s in leaf for s in HIGHER): return 1
+    if leaf.endswith(LOWER): return -1
+    return 0
+
+def compare(old, new, threshold_pct=10.0):
+    """Rows of (key, old, new, change %, verdict) for metrics that moved more than the threshold."""
+    a, b = flatten(old["results"]), flatten(new["results"])
+    rows = []
+    for k in sorted(a.keys() & b.keys()):
+        d = direction(k)
+        if not d or a[k] == b[k]: continue
+        base = abs(a[k]) or 1e-9
+        change = (b[k] - a[k]) / base * 100
+        if abs(change) < threshold_pct: continue
+        rows.append((k, a[k], b[k], round(change, 1), "better" if change * d > 0 else "WORSE"))
+    return rows
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--quick", action="store_true", help="short runs, for a smoke check")
+    ap.add_argument("--only", default="", help=f"comma list of {','.join(SCENARIOS)}")
+    ap.add_argument("--out", default=None, help="result file (default bench/results/<version>_<time>.json)")
+    ap.add_argument("--compare", default=None, help="earlier result file to diff against")
+    ap.add_argument("--threshold", type=float, default=10.0, help="percent change worth reporting")
+    ap.add_argument("--fail", action="store_true", help="exit 1 if any metric got worse")
+    a = ap.parse_args()
+    names = [n for n in a.only.split(",") if n] or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown: ap.error(f"unknown scenarios {sorted(unknown)}")
+    res = run(names, a.quick)
+    path = a.out or os.path.join("bench", "results",
+                                 f"{__version__}_{time.strftime('%Y%m%d-%H%M%S')}{'_quick' if a.quick else ''}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=1)
+    print(f"wrote {path}" + (f" ({len(res['errors'])} scenarios failed)" if res["errors"] else ""))
+    worse = False
+    if a.compare:
+        with open(a.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        rows = compare(old, res, a.threshold)
+        print(f"vs {a.compare} ({old['meta'].get('version')} @ {old['meta'].get('git')}): "
+              f"{len(rows)} metrics moved > {a.threshold:g}%")
+        for k, x, y, ch, verdict in rows:
+            print(f"  {verdict:6s} {k:50s} {x:>12} → {y:<12} ({ch:+.1f}%)")
+        worse = any(r[4] == "WORSE" for r in rows)
+    sys.exit(1 if res["errors"] or (a.fail and worse) else 0)
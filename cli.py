@@ -0,0 +1,205 @@
+# Headless command line: scan, send, monitor, record, syscheck, macro, replay
+#   python cli.py scan
+#   python cli.py send --port COM7 VER HELP
+#   python cli.py send --file tests/motor_soak.txt --gap-ms 50
+#   python cli.py monitor --seconds 3600 --session
+#   python cli.py record cam_a --seconds 30
+#   python cli.py syscheck --yes
+#   python cli.py macro motor_endurance --port COM7
+#   python cli.py serve --port COM7
+#   python cli.py replay sessions/session_20250101-120000 --speed 4
+import argparse, json, os, sys, time, threading, logging
+import yaml
+from core.engine import Engine
+from core.config import load_config
+from core.log_setup import start_logging
+from core.metrics import METRICS
+
+def _print_lines(lines):
+    sys.stdout.write("".join(f"{ln}\n" for ln in lines))
+    sys.stdout.flush()
+
+def _connect(eng, args):
+    if not eng.connect(args.port):
+        print("No device found" if not args.port else f"Could not open {args.port}", file=sys.stderr)
+        return False
+    return True
+
+def cmd_scan(eng, args):
+    print(json.dumps(eng.scan()))
+    return 0
+
+def cmd_send(eng, args):
+    if not _connect(eng, args): return 2
+    def show(cmd, r):
+        if isinstance(r, Exception): print(f"[ERR] {cmd}: {r}")
+        elif r is True: print(f"→ {cmd}")
+        else: print(f"[CMD] {cmd} ok in {r.rtt_ms:.1f} ms\n" + "\n".join(f"  {ln}" for ln in r.lines))
+    failed = 0
+    if args.file:
+        _, failed = eng.send_file(args.file, gap_ms=args.gap_ms, on_result=show)
+    for c in args.commands:
+        try: r = eng.send(c)
+        except Exception as e: r, failed = e, failed + 1
+        show(c, r)
+    return 1 if failed else 0
+
+def cmd_monitor(eng, args):
+    if args.devices:
+        for name, up in eng.connect_devices().items():
+            print(f"[HUB] {name} {'up' if up else 'retrying'}", file=sys.stderr)
+    elif not _connect(eng, args): return 2
+    eng.bus.subscribe("log:line", _print_lines)
+    stop = threading.Event()
+    try: stop.wait(args.seconds)
+    except KeyboardInterrupt: pass
+    return 0
+
+def cmd_record(eng, args):
+    path = eng.record(args.camera, args.seconds)
+    if path is None:
+        print(f"{args.camera}: no frames", file=sys.stderr)
+        return 2
+    print(path)
+    return 0
+
+def cmd_syscheck(eng, args):
+    if args.port and not _connect(eng, args): return 2
+    def confirm(prompt, timeout=None):
+        if args.yes: return True
+        if not sys.stdin.isatty(): return False
+        return input(f"{prompt} [y/N] ").strip().lower().startswith("y")
+    eng.bus.subscribe("syscheck:progress", lambda p: p["step"] and print(
+        f"[CHECK] {p['step']} {p['state']}" + (f" ({p['ms']:.0f} ms)" if "ms" in p else "")))
+    cfg = None
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f: cfg = yaml.safe_load(f)
+    report = eng.syscheck(cfg, confirm=confirm).run()
+    print(json.dumps({"ok": report["ok"], "total_ms": report["total_ms"], "report": report.get("path")}))
+    return 0 if report["ok"] else 1
+
+def cmd_macro(eng, args):
+    cfg = load_config().macros
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f: cfg = yaml.safe_load(f) or {}
+    if args.list or not args.name:
+        for name, m in (cfg.get("macros") or {}).items():
+            print(f"{name:24s} {(m or {}).get('description', '')}")
+        return 0
+    if args.port and not _connect(eng, args): return 2
+    # the engine's own cameras; opened up front so snapshot steps have frames
+    for cam in args.cams.split(",") if args.cams else []:
+        if eng.open_camera(cam) is None: return 2
+    eng.bus.subscribe("macro:progress", lambda p: print(
+        f"[MACRO] {p['macro']} {p['state']} cycle {p['cycle']}, {p['steps']} steps, "
+        f"{p['failed']} failed, late max {p['late_max_ms']:.2f} ms", file=sys.stderr))
+    from core.macro import MacroError
+    try:
+        runner = eng.macro(args.name, cfg)
+    except MacroError as e:
+        print(e, file=sys.stderr)
+        return 2
+    runner.start()
+    try:
+        while runner.wait(0.5) is None: pass
+    except KeyboardInterrupt:
+        runner.cancel()
+        runner.wait()
+    print(json.dumps(runner.report))
+    return 0 if runner.report["ok"] else 1
+
+def cmd_serve(eng, args):
+    if args.port: _connect(eng, args)
+    if args.listen: eng.cfg.setdefault("control", {})["port"] = args.listen
+    srv = eng.start_control()
+    print(f"Control server on {srv.address}", file=sys.stderr)
+    try: threading.Event().wait(args.seconds)
+    except KeyboardInterrupt: pass
+    return 0
+
+def cmd_replay(eng, args):
+    from core.session import Replayer
+    topics = args.topics.split(",") if args.topics else None
+    if args.print: eng.bus.subscribe("log:line", _print_lines)
+    rp = Replayer(eng.bus, args.path, speed=args.speed or None, start=args.start, end=args.end, topics=topics)
+    t0 = time.perf_counter()
+    rp.run()
+    print(json.dumps({"events": rp.published, "wall_s": round(time.perf_counter() - t0, 3),
+                      "late_ms": round(rp.late_ms, 1)}))
+    return 0
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="cli.py", description="Unified Device Control, headless")
+    ap.add_argument("--config", dest="app_config", default=os.path.join("config", "app.yaml"))
+    ap.add_argument("--session", action="store_true", help="record every bus event to sessions/")
+    ap.add_argument("--quiet", action="store_true", help="no log mirror on stdout")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("scan", help="find the board (PING/PONG)").set_defaults(fn=cmd_scan)
+
+    p = sub.add_parser("send", help="send commands or a command file")
+    p.add_argument("commands", nargs="*")
+    p.add_argument("--port")
+    p.add_argument("--file", help="one command per line, '#' comments, '@wait <ms>'")
+    p.add_argument("--gap-ms", type=float, default=0)
+    p.set_defaults(fn=cmd_send)
+
+    p = sub.add_parser("monitor", help="print serial lines")
+    p.add_argument("--port")
+    p.add_argument("--seconds", type=float, default=None)
+    p.add_argument("--devices", action="store_true", help="all serial.devices boards via the hub")
+    p.set_defaults(fn=cmd_monitor)
+
+    p = sub.add_parser("record", help="record a camera to captures/")
+    p.add_argument("camera", help="camera key from app.yaml, e.g. cam_a")
+    p.add_argument("--seconds", type=float, default=10)
+    p.set_defaults(fn=cmd_record)
+
+    p = sub.add_parser("syscheck", help="run config/syscheck.yaml")
+    p.add_argument("--port")
+    p.add_argument("--config", help="alternate syscheck yaml")
+    p.add_argument("--yes", action="store_true", help="answer yes to operator prompts")
+    p.set_defaults(fn=cmd_syscheck)
+
+    p = sub.add_parser("macro", help="run a timed macro from config/macros.yaml")
+    p.add_argument("name", nargs="?")
+    p.add_argument("--port")
+    p.add_argument("--file", help="alternate macros yaml")
+    p.add_argument("--cams", help="comma-separated cameras to open for snapshot steps")
+    p.add_argument("--list", action="store_true", help="list macros and exit")
+    p.set_defaults(fn=cmd_macro)
+
+    p = sub.add_parser("serve", help="run the local control server (see control: in app.yaml)")
+    p.add_argument("--port", help="serial port to open first")
+    p.add_argument("--listen", type=int, help="TCP port (default control.port)")
+    p.add_argument("--seconds", type=float, default=None)
+    p.set_defaults(fn=cmd_serve)
+
+    p = sub.add_parser("replay", help="replay a recorded session through the bus")
+    p.add_argument("path")
+    p.add_argument("--speed", type=float, default=1.0, help="0 = as fast as possible")
+    p.add_argument("--start", type=float, default=0.0)
+    p.add_argument("--end", type=float, default=None)
+    p.add_argument("--topics", help="comma-separated topic filter")
+    p.add_argument("--print", action="store_true", help="print replayed serial lines")
+    p.set_defaults(fn=cmd_replay)
+    return ap
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = load_config(app=args.app_config)
+    app_cfg = config.app
+    start_logging(app_cfg["logging"], console=not args.quiet and app_cfg["logging"].get("console", True))
+    logging.info("==== Headless start: %s ====", args.cmd)
+    METRICS.configure(app_cfg.get("metrics"), folder=app_cfg["logging"].get("folder", "logs"))
+    eng = Engine(app_cfg, commands_cfg=config.commands)
+    if args.session or app_cfg.get("session", {}).get("record"):
+        logging.info("Session: %s", eng.start_session().path)
+    try:
+        return args.fn(eng, args)
+    finally:
+        METRICS.stop()      # final snapshot still sees the engine's sources
+        eng.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,318 @@
-# ADU interface wrapper
+# ADU relay engine: cached handle, relay state cache, one coalescing write queue
+import os, sys, time, heapq, threading, logging, collections
+from concurrent.futures import Future
+from core.metrics import METRICS
+
+RELAYS = 8     # relays on port K of an ADU2xx
+
+class ADUError(RuntimeError):
+    pass
+
+class DllBackend:
+    """Ontrak AduHid DLL (Windows). Commands are the ADU ASCII set: SKn/RKn set or
+    reset relay n, MKddd writes all eight relays at once, PK reads them back."""
+
+    def __init__(self, path=None, serial=None, timeout_ms=200):
+        import ctypes
+        from ctypes import wintypes
+        self.ct, self.wt = ctypes, wintypes
+        self.path = path or os.path.join("utils", "adu_python_dll", "ontrak",
+                                         "AduHid64.dll" if sys.maxsize > 2 ** 32 else "AduHid.dll")
+        self.serial, self.timeout = serial, int(timeout_ms)
+        self.dll = ctypes.WinDLL(os.path.abspath(self.path))
+        self.dll.OpenAduDevice.restype = wintypes.HANDLE
+        self.dll.OpenAduDeviceBySerialNumber.restype = wintypes.HANDLE
+        self.dll.OpenAduDeviceBySerialNumber.argtypes = [ctypes.c_char_p, wintypes.DWORD]
+        self.dll.WriteAduDevice.argtypes = [wintypes.HANDLE, ctypes.c_char_p, wintypes.DWORD,
+                                            ctypes.POINTER(wintypes.DWORD), wintypes.DWORD]
+        self.dll.ReadAduDevice.argtypes = [wintypes.HANDLE, ctypes.c_char_p, wintypes.DWORD,
+                                           ctypes.POINTER(wintypes.DWORD), wintypes.DWORD]
+        self.dll.CloseAduDevice.argtypes = [wintypes.HANDLE]
+        self.handle = None
+
+    def open(self):
+        if self.handle: return
+        h = (self.dll.OpenAduDeviceBySerialNumber(self.serial.encode(), self.timeout) if self.serial
+             else self.dll.OpenAduDevice(self.timeout))
+        if not h or h == self.wt.HANDLE(-1).value:
+            raise ADUError("ADU device not found")
+        self.handle = h
+
+    def close(self):
+        if self.handle:
+            try: self.dll.CloseAduDevice(self.handle)
+            finally: self.handle = None
+
+    def _cmd(self, text):
+        n = self.wt.DWORD(0)
+        if not self.dll.WriteAduDevice(self.handle, text.encode(), len(text), self.ct.byref(n), self.timeout):
+            raise ADUError(f"write {text!r} failed")
+
+    def read_mask(self):
+        self._cmd("PK")
+        buf, n = self.ct.create_string_buffer(8), self.wt.DWORD(0)
+        if not self.dll.ReadAduDevice(self.handle, buf, 7, self.ct.byref(n), self.timeout):
+            raise ADUError("read PK failed")
+        return int(buf.value.decode().strip() or 0)
+
+    def write_mask(self, mask):
+        self._cmd(f"MK{mask}")
+
+    def write_relays(self, changes):
+        for i, on in changes.items():
+            self._cmd(f"{'SK' if on else 'RK'}{i}")
+
+class SimBackend:
+    """In-process ADU: same calls as DllBackend, `latency_s` per USB transaction.
+    unplug()/replug() make the next calls fail like a pulled cable."""
+
+    def __init__(self, latency_s=0.004):
+        self.latency = latency_s
+        self.mask = 0
+        self.transactions = 0
+        self.handle = None
+        self.present = True
+
+    def _tx(self):
+        if not self.present: raise ADUError("ADU device not found")
+        if self.latency: time.sleep(self.latency)
+        self.transactions += 1
+
+    def open(self):
+        if not self.present: raise ADUError("ADU device not found")
+        self.handle = 1
+
+    def close(self):
+        self.handle = None
+
+    def unplug(self):
+        self.present, self.handle = False, None
+
+    def replug(self):
+        self.present = True
+
+    def read_mask(self):
+        self._tx(); self._tx()          # PK + read
+        return self.mask
+
+    def write_mask(self, mask):
+        self._tx()
+        self.mask = int(mask)
+
+    def write_relays(self, changes):
+        for i, on in changes.items():
+            self._tx()
+            self.mask = self.mask | (1 << i) if on else self.mask & ~(1 << i)
+
+def make_backend(cfg):
+    kind = cfg.get("backend", "auto")
+    if kind in ("dll", "auto") and sys.platform == "win32":
+        try:
+            return DllBackend(cfg.get("dll"), cfg.get("serial"), cfg.get("timeout_ms", 200))
+        except OSError as e:
+            if kind == "dll": raise ADUError(f"cannot load ADU DLL: {e}") from None
+            logging.warning("ADU DLL not available (%s); using the simulated device", e)
+    elif kind == "dll":
+        raise ADUError("the ADU DLL backend needs Windows")
+    return SimBackend(cfg.get("sim_latency_ms", 4) / 1000.0)
+
 class ADUClient:
-    def __init__(self):
-        self.ready = False  # set True when DLL wired
+    """Relay engine over one cached device handle.
+
+    Actions are "<RELAY>_ON", "_OFF", "_TOGGLE" and "_PULSE" (optionally
+    "_PULSE:<ms>"); relay names map to relay numbers via `adu.relays` in
+    app.yaml (default: first-seen order of the commands.yaml adu_buttons).
+
+    submit() queues an action and returns a Future (True/False); action()
+    waits for it. One worker applies everything queued within `coalesce_ms`
+    to a cached copy of the relay state and writes only the net change, as one
+    MK transaction when the full state is known (per-relay SK/RK otherwise).
+    ON-then-OFF inside the window therefore never reaches the device, and a
+    command for a relay already in that state costs nothing. A pulse switches
+    on now and off after its duration; its future resolves once it is off."""
+
+    def __init__(self, cfg=None, bus=None, actions=None, backend=None):
+        cfg = cfg or {}
+        self.bus = bus
+        self.coalesce_s = cfg.get("coalesce_ms", 5) / 1000.0
+        self.pulse_ms = int(cfg.get("pulse_ms", 500))
+        self.timeout_s = cfg.get("action_timeout_ms", 2000) / 1000.0
+        self.relays = dict(cfg.get("relays") or {})
+        for a in actions or []:
+            name = a.rsplit("_", 1)[0]
+            if name not in self.relays: self.relays[name] = len(self.relays)
+        self.backend = backend or make_backend(cfg)
+        self.state = [None] * RELAYS          # cached relay state; None = unknown
+        self._pending = collections.deque()   # (t, relay, op, ms, future)
+        self._timers = []                     # heap of (due, n, relay, future) pulse offs
+        self._n = 0
+        self._cv = threading.Condition()
+        self._closed = False
+        self.ops = self.transactions = self.redundant = self.errors = 0
+        self.tx_ms = 0.0
+        self._thread = threading.Thread(target=self._loop, name="adu", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        return self.backend.handle is not None
+
+    # ---- API ----
+    def parse(self, action):
+        """'LIGHT_PULSE:250' → (relay number, 'pulse', 250)."""
+        head, _, arg = action.partition(":")
+        name, _, op = head.rpartition("_")
+        op = op.lower()
+        if op not in ("on", "off", "toggle", "pulse") or name not in self.relays:
+            raise ValueError(f"unknown ADU action {action!r}")
+        return self.relays[name], op, int(arg) if arg else self.pulse_ms
+
+    def submit(self, action):
+        fut = Future()
+        try:
+            relay, op, ms = self.parse(action)
+        except ValueError as e:
+            fut.set_exception(e)
+            return fut
+        with self._cv:
+            if self._closed:
+                fut.set_exception(ADUError("ADU client closed"))
+                return fut
+            self._pending.append((time.monotonic(), relay, op, ms, fut))
+            self._cv.notify()
+        return fut
+
+    def action(self, name: str, timeout=None):
+        """Blocking: True once the relay is in the requested state (a pulse: over)."""
+        try:
+            _, op, ms = self.parse(name)
+            return bool(self.submit(name).result(timeout or self.timeout_s + (ms / 1000.0 if op == "pulse" else 0)))
+        except Exception as e:
+            logging.warning("ADU %s failed: %s", name, e)
+            return False
+
+    def pulse(self, relay, ms=None):
+        """Future for switching relay name `relay` on for `ms`."""
+        return self.submit(f"{relay}_PULSE:{int(ms or self.pulse_ms)}")
+
+    def relay_state(self):
+        return {n: self.state[i] for n, i in self.relays.items()}
+
+    def stats(self):
+        return {"ready": self.ready, "backend": type(self.backend).__name__, "ops": self.ops,
+                "transactions": self.transactions, "redundant": self.redundant, "errors": self.errors,
+                "tx_ms_avg": round(self.tx_ms / self.transactions, 3) if self.transactions else 0.0,
+                "relays": self.relay_state()}
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._cv.notify()
+        self._thread.join(timeout=2)
+        try: self.backend.close()
+        except Exception: pass
+
+    # ---- worker ----
+    def _open(self):
+        if self.backend.handle is not None: return
+        self.backend.open()
+        try:
+            m = self.backend.read_mask()
+            self.state = [bool(m >> i & 1) for i in range(RELAYS)]
+        except ADUError:
+            self.state = [None] * RELAYS    # per-relay writes until each one is known
+        self._publish()
+
+    def _loop(self):
+        try: self._open()
+        except Exception as e: logging.info("ADU not available yet: %s", e)
+        while True:
+            with self._cv:
+                while True:
+                    now = time.monotonic()
+                    if self._closed and not self._pending: break
+                    wait = self._timers[0][0] - now if self._timers else None
+                    if self._pending:
+                        left = self._pending[0][0] + self.coalesce_s - now
+                        if left <= 0 or self._closed: break
+                        wait = left if wait is None else min(wait, left)
+                    if wait is not None and wait <= 0: break
+                    self._cv.wait(wait)
+                if self._closed and not self._pending and not self._timers: return
+                batch = list(self._pending); self._pending.clear()
+                due = []
+                while self._timers and (self._timers[0][0] <= now or self._closed):
+                    due.append(heapq.heappop(self._timers))
+            try:
+                self._apply(batch, due)
+            except Exception:
+                logging.exception("ADU batch failed")
+                for fut in [d[3] for d in due] + [b[4] for b in batch]:
+                    if not fut.done(): fut.set_result(False)
+            if self._closed and not self._pending and not self._timers: return
+
+    def _read_back(self):
+        # a toggle needs the current state; retry the read that failed at open
+        try:
+            self._open()
+            if None in self.state:
+                m = self.backend.read_mask()
+                self.state = [bool(m >> i & 1) for i in range(RELAYS)]
+        except Exception as e:
+            logging.info("ADU state read-back failed: %s", e)
+
+    def _apply(self, batch, due):
+        if any(op == "toggle" and self.state[relay] is None for _, relay, op, _, _ in batch):
+            self._read_back()
+        target = list(self.state)
+        done, pulses = [], []
+        for _, _, relay, fut in due:
+            target[relay] = False
+            done.append(fut)
+        for _, relay, op, ms, fut in batch:
+            if op == "toggle":
+                if target[relay] is None:     # don't guess: `not None` would always switch it ON
+                    fut.set_exception(ADUError("relay state unknown, can't toggle (use _ON/_OFF)"))
+                    continue
+                target[relay] = not target[relay]
+            else: target[relay] = op != "off"
+            if op == "pulse": pulses.append((relay, ms, fut))
+            else: done.append(fut)
+        self.ops += len(batch)
+        changes = {i: v for i, v in enumerate(target) if v is not None and v != self.state[i]}
+        ok = True
+        if changes:
+            t = time.perf_counter()
+            try:
+                self._open()
+                changes = {i: v for i, v in enumerate(target) if v is not None and v != self.state[i]}
+                if changes and all(s is not None for s in self.state):
+                    self.backend.write_mask(sum(1 << i for i, v in enumerate(target) if v))
+                elif changes:
+                    self.backend.write_relays(changes)
+                for i, v in changes.items(): self.state[i] = v
+            except Exception as e:
+                ok = False
+                self.errors += 1
+                logging.warning("ADU write failed: %s", e)
+                try: self.backend.close()     # reopen on the next transaction
+                except Exception: pass
+            dt = (time.perf_counter() - t) * 1000
+            self.transactions += 1
+            self.tx_ms += dt
+            if METRICS.enabled: METRICS.observe("adu:tx", dt)
+            if ok: self._publish()
+        else:
+            self.redundant += len(batch)
+        for fut in done:
+            if not fut.done(): fut.set_result(ok)
+        with self._cv:
+            for relay, ms, fut in pulses:
+                if not ok:
+                    if not fut.done(): fut.set_result(False)
+                    continue
+                self._n += 1
+                heapq.heappush(self._timers, (time.monotonic() + ms / 1000.0, self._n, relay, fut))
 
-    def action(self, name: str):
-        # map to DLL calls later
-        return False
+    def _publish(self):
+        if self.bus: self.bus.publish("adu:state", self.relay_state())
@@ -1,31 +1,109 @@
 # OpenCV camera worker
-import cv2, threading, time
+import threading, time, logging
+from core.metrics import METRICS
+from core.pacing import Pacer, Adapter
+
+class FrameSlot:
+    """Single-slot mailbox: the capture thread overwrites, the reader takes the newest.
+    Frames replaced before anyone read them are counted in `dropped`."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None      # (seq, ts, frame)
+        self._taken = True
+        self.read_at = 0.0     # monotonic time of the last successful get()
+        self.seq = 0
+        self.dropped = 0
+
+    def put(self, frame, ts):
+        with self._lock:
+            if not self._taken: self.dropped += 1
+            self.seq += 1
+            self._item = (self.seq, ts, frame)
+            self._taken = False
+
+    def get(self, after_seq=0):
+        with self._lock:
+            if self._item is None or self._item[0] <= after_seq: return None
+            self._taken = True
+            self.read_at = time.monotonic()
+            return self._item
+
+class RateMeter:
+    """Events per second over a rolling ~1 s window."""
+    def __init__(self, window=1.0):
+        self.window = window
+        self.rate = 0.0
+        self._n, self._t0 = 0, time.monotonic()
+
+    def tick(self, n=1):
+        self._n += n
+        now = time.monotonic()
+        dt = now - self._t0
+        if dt >= self.window:
+            self.rate = self._n / dt
+            self._n, self._t0 = 0, now
 
 class CameraWorker:
-    def __init__(self, index=0, width=640, height=480, target_fps=20, on_frame=None):
+    """Captures one camera and fans frames out (mailbox, pre-trigger ring, on_frame).
+
+    mode="thread"  – grab() at the sensor rate on a thread of this process, paced
+                     to target_fps by monotonic deadlines; retrieve() (the decode)
+                     only runs for frames an outlet will use
+    mode="process" – capture runs in a child process writing into a shared-memory
+                     ring (core.shm_frames). Display, recorder and vision read it
+                     through their own zero-copy consumer(); the pump thread feeds
+                     the pre-trigger ring from the slot and copies a frame out
+                     only for on_frame, an active mailbox reader or last_frame (~1/s).
+
+    `demand()` says a consumer needs every frame (recording); `lag()` reports
+    consumer backlog 0..1 for the adaptive fps/resolution ladder (`pacing` cfg).
+    It must be a backlog a lower capture rate relieves: a recorder pads back to
+    the fps it opened with, so its queue is not one."""
+
+    def __init__(self, index=0, width=640, height=480, target_fps=20, on_frame=None,
+                 mode="thread", shm_slots=8, sensor_fps=None, pacing=None, demand=None, lag=None):
         self.idx, self.size = index, (width, height)
         self.fps = target_fps
-        self.on_frame = on_frame
+        self.sensor_fps = sensor_fps or target_fps   # rate asked of the device; grabs above target are skipped
+        self.on_frame = on_frame   # called on the capture thread; keep it cheap
+        self.mode = mode
+        self.shm_slots = shm_slots
+        self.demand, self.lag = demand, lag
+        self.pacer = Pacer(target_fps)
+        self.adapter = Adapter(target_fps, pacing)
+        self.grab_rate = RateMeter()
+        self.slot_rate = RateMeter()
+        self.decoded = 0
+        self.decode_skipped = 0   # due frames grabbed but never retrieved (nobody waiting)
+        self._scale = 1.0
+        self._last_pub = 0.0
         self.cap = None
-        self.stop = threading.Event()
+        self._thread = None
+        self._consumers = []
+        self._stop = threading.Event()
         self.last_frame = None
         self.last_frame_bgr = None
+        self.mailbox = FrameSlot()
+        self.capture_rate = RateMeter()
+        self.ring = None           # pre-trigger FrameRing, built on the first frame
+        self._ring_cfg = None
+        self._m_read = f"cam:{index}:read"    # metrics: retrieve/decode time (thread) or ring copy (process)
 
     def start(self):
-        # Prefer DirectShow on Windows to avoid long blocking opens
-        try:
-            self.cap = cv2.VideoCapture(self.idx, cv2.CAP_DSHOW)
-        except Exception:
-            self.cap = cv2.VideoCapture(self.idx)
-
-        # Small buffer & size caps help reduce latency
-        try: self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        except Exception: pass
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
-        # Some drivers accept a target FPS hint
-        try: self.cap.set(cv2.CAP_PROP_FPS, float(self.fps))
-        except Exception: pass
+        if self.mode == "process":
+            from core.shm_frames import ProcessCapture
+            cap = ProcessCapture(self.idx, self.size[0], self.size[1], self.fps, self.shm_slots,
+                                 sensor_fps=self.sensor_fps)
+            if not cap.start():
+                logging.warning("Camera %s: %s", self.idx, cap.error)
+                return
+            self.cap = cap
+            self._thread = threading.Thread(target=self._pump, name=f"cam-{self.idx}-pump", daemon=True)
+            self._thread.start()
+            return
+        # device index → cv2.VideoCapture (imported on first open), "synthetic" → SyntheticCapture
+        from core.synthetic_source import open_capture
+        self.cap = open_capture(self.idx, self.size[0], self.size[1], self.sensor_fps)
 
         # Open timeout (≈1s): if not opened, bail out cleanly
         import time
@@ -42,34 +120,168 @@ class CameraWorker:
             self.cap = None
             return
 
-        threading.Thread(target=self._loop, daemon=True).start()
+        self._thread = threading.Thread(target=self._loop, name=f"cam-{self.idx}", daemon=True)
+        self._thread.start()
+
+    def enable_pretrigger(self, seconds=10, max_mb=200, jpeg_quality=0):
+        """Keep the last `seconds` of frames (capped at `max_mb`) for dump_clip().
+        The ring takes every frame, so decode skipping and rescaling stop while it's on."""
+        self._ring_cfg = dict(seconds=seconds, max_mb=max_mb, jpeg_quality=jpeg_quality)
+
+    def dump_clip(self, name, post_s=5, rec_cfg=None, bus=None):
+        """Write the buffered past plus the next `post_s` seconds; runs in the background."""
+        if self.ring is None: return None
+        from core.frame_ring import ClipDump
+        d = ClipDump(self.ring, name, post_s, rec_cfg, bus, fps=self.effective_fps or None)
+        d.start()
+        return d
+
+    @property
+    def effective_fps(self):
+        """Measured frame-slot rate: what a recorder should be told (decode skips don't count)."""
+        return self.capture_rate.rate if self.mode == "process" else self.slot_rate.rate
 
+    def stats(self):
+        """Pacing/decode numbers for the tile, metrics and tuning the per-camera config."""
+        st = {"target_fps": self.fps, "fps": round(self.effective_fps, 1),
+              "decode_fps": round(self.capture_rate.rate, 1)}
+        if self.mode == "process": return st
+        fps, scale = self.adapter.step
+        return {**st, "grab_fps": round(self.grab_rate.rate, 1), **self.pacer.stats(),
+                "decoded": self.decoded, "decode_skipped": self.decode_skipped,
+                "level": self.adapter.level, "step_fps": round(fps, 1), "scale": self._scale,
+                "load": round(self.adapter.load, 2), "adaptations": self.adapter.changes}
+
+    @property
+    def shm_name(self):
+        """Shared-memory ring name for readers in other processes (process mode)."""
+        ring = getattr(self.cap, "ring", None)
+        return ring.name if ring is not None else None
+
+    def consumer(self, name):
+        """Zero-copy reader of the shared ring (process mode), else None."""
+        ring = getattr(self.cap, "ring", None)
+        if ring is None: return None
+        c = ring.consumer(name)
+        self._consumers.append(c)
+        return c
+
+    def release(self, consumer):
+        """Forget a consumer() reader that has stopped."""
+        if consumer in self._consumers: self._consumers.remove(consumer)
+
+    def consumer_stats(self):
+        return {c.name: c.stats() for c in self._consumers if c.ring.hdr is not None}
 
     def stop(self):
-        self.stop.set()
+        self._stop.set()
+        if self.mode == "process" and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)    # the pump must drop its ring views first
         if self.cap:
             try: self.cap.release()
             except: pass
         self.cap = None
 
+    def _publish(self, frame, ts):
+        self.capture_rate.tick()
+        self._to_ring(frame, ts)
+        self._hand_out(frame, ts)
+
+    def _to_ring(self, frame, ts):
+        if self._ring_cfg is None: return
+        if self.ring is None:
+            from core.frame_ring import FrameRing
+            self.ring = FrameRing(frame.shape, self.fps, **self._ring_cfg)
+        self.ring.push(frame, ts)
+
+    def _hand_out(self, frame, ts):
+        # owned frame for the in-process outlets
+        self.last_frame_bgr = frame
+        self.last_frame = frame
+        self.mailbox.put(frame, ts)
+        self._last_pub = ts
+        if self.on_frame:
+            self.on_frame(frame, ts)
+
+    def _pump(self):
+        # process mode: frames stay in the shared ring; the pre-trigger ring copies or
+        # encodes straight from the slot, and an owned copy is made only when
+        # something in this process needs one
+        cap = self.cap
+        c = self.consumer("app")
+        item = view = None
+        while not self._stop.is_set() and cap.isOpened():
+            if not c.wait(0.1): continue
+            item = c.next()
+            if item is None: continue
+            seq, ts, view = item
+            self.capture_rate.tick()
+            self._to_ring(view, ts)
+            if self.on_frame is not None or ts - self.mailbox.read_at < 0.5 or ts - self._last_pub >= 1.0:
+                t = time.perf_counter()
+                frame = view.copy()
+                if METRICS.enabled: METRICS.observe(self._m_read, (time.perf_counter() - t) * 1000)
+                if c.still_valid(seq): self._hand_out(frame, ts)
+            item = view = None
+        if self.cap is cap and not self._stop.is_set():
+            self.stop()     # capture process died
+
+    def _wanted(self, now):
+        # the pre-trigger ring and a recording take every frame; mailbox readers
+        # (display, vision) while they're active. With nobody reading, e.g. a hidden
+        # tile, decode about once a second so last_frame stays fresh.
+        return (self._ring_cfg is not None or now - self.mailbox.read_at < 0.5
+                or (self.demand is not None and self.demand()) or now - self._last_pub >= 1.0)
+
+    def _adapt(self, now):
+        lag = 0.0
+        if self.lag is not None:
+            try: lag = float(self.lag())
+            except Exception: pass
+        step = self.adapter.update(now, lag)
+        if step is not None:
+            self.pacer.set_fps(step[0])
+            logging.info("Camera %s: load %.2f → level %d (%.1f fps, scale %.2g)",
+                         self.idx, self.adapter.load, self.adapter.level, step[0], step[1])
+        # resizing mid-recording or under a fixed-shape ring would break them, so a
+        # rescale waits; checked on every slot so it lands once they're gone
+        scale = self.adapter.step[1]
+        if scale != self._scale and self._ring_cfg is None and not (self.demand and self.demand()):
+            import cv2
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(self.size[0] * scale))
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(self.size[1] * scale))
+            self._scale = scale
+            logging.info("Camera %s: capture scale %.2g", self.idx, scale)
+
     def _loop(self):
-        delay = max(1.0/self.fps, 0.02)
+        cap = self.cap
         bad = 0
-        while not self.stop.is_set() and self.cap and self.cap.isOpened():
-            ok, frame = self.cap.read()
-            if ok and frame is not None:
-                bad = 0
-                self.last_frame_bgr = frame
-                self.last_frame = frame
-                if self.on_frame:
-                    self.on_frame(frame)
-            else:
+        while not self._stop.is_set() and cap.isOpened():
+            t0 = time.perf_counter()
+            if not cap.grab():
                 bad += 1
-                if bad >= 30:   # ~1.5s at 20fps
-                    break
-            time.sleep(delay)
+                if bad >= 30: break      # ~0.6 s of failed grabs
+                time.sleep(0.02)
+                continue
+            bad = 0
+            ts = time.monotonic()        # capture time, before any decode
+            self.grab_rate.tick()
+            if not self.pacer.due(ts):
+                if time.perf_counter() - t0 < 0.001:     # grab() didn't block: don't spin
+                    time.sleep(max(0.0, min(self.pacer.wait_s(ts), 0.1)))
+                continue
+            self.slot_rate.tick()
+            if self._wanted(ts):
+                t = time.perf_counter()
+                ok, frame = cap.retrieve()
+                if METRICS.enabled: METRICS.observe(self._m_read, (time.perf_counter() - t) * 1000)
+                if ok and frame is not None:
+                    self.decoded += 1
+                    self._publish(frame, ts)
+            else:
+                self.decode_skipped += 1
+            self._adapt(ts)
         # cleanup
-        try: self.cap.release()
+        try: cap.release()
         except Exception: pass
         self.cap = None
-
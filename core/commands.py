@@ -0,0 +1,142 @@
+# Request/response matching for serial commands
+import re, threading, time, collections, logging
+from concurrent.futures import Future
+
+Response = collections.namedtuple("Response", "cmd lines rtt_ms")
+
+class ResponseSpec:
+    """How to recognise the reply to one command (commands.yaml `responses:`).
+
+    match      regex for the first reply line (default: any line, once this
+               is the oldest request outstanding)
+    until      regex for the last line of a multi-line reply
+    idle_ms    multi-line reply ends after this much silence
+    timeout_ms fail the request if nothing completes in time"""
+
+    def __init__(self, match=None, until=None, idle_ms=None, timeout_ms=1000):
+        self.match = re.compile(match) if match else None
+        self.until = re.compile(until) if until else None
+        self.idle = idle_ms / 1000.0 if idle_ms else None
+        self.timeout = timeout_ms / 1000.0
+
+    @property
+    def multi(self):
+        return self.until is not None or self.idle is not None
+
+class _Pending:
+    __slots__ = ("cmd", "spec", "future", "t0", "deadline", "lines", "last")
+
+    def __init__(self, cmd, spec, timeout):
+        self.cmd, self.spec = cmd, spec
+        self.future = Future()
+        self.t0 = time.perf_counter()
+        self.deadline = self.t0 + (timeout if timeout is not None else spec.timeout)
+        self.lines = None      # list once the first reply line matched
+        self.last = 0.0
+
+class CommandRouter:
+    """Matches incoming lines to outstanding requests, oldest first, so several
+    commands can be in flight on the same line. Timeouts and idle-terminated
+    multi-line replies are handled by one watchdog thread."""
+
+    def __init__(self, responses=None):
+        responses = dict(responses or {})
+        default = responses.pop("default", {}) or {}
+        self.default = ResponseSpec(**default)
+        self.specs = {}
+        for cmd, spec in responses.items():
+            self.specs[cmd] = ResponseSpec(**{**default, **(spec or {})})
+        self.pending = []
+        self._lock = threading.Condition()
+        self._watchdog = None
+
+    def spec_for(self, cmd):
+        return self.specs.get(cmd.split()[0] if cmd.strip() else cmd, self.default)
+
+    def has_spec(self, cmd):
+        return cmd.split()[0] in self.specs if cmd.strip() else False
+
+    def register(self, cmd, timeout=None):
+        p = _Pending(cmd, self.spec_for(cmd), timeout)
+        with self._lock:
+            self.pending.append(p)
+            self._lock.notify()
+        self._ensure_watchdog()
+        return p.future
+
+    def on_lines(self, lines):
+        now = time.perf_counter()
+        with self._lock:
+            for line in lines:
+                p = self._claim(line, now)
+                if p is None: continue
+                s = p.spec
+                first = p.lines is None
+                if first: p.lines = []
+                p.lines.append(line); p.last = now
+                if (first and not s.multi) or (s.until is not None and s.until.search(line)):
+                    self._finish(p, now)
+            self._lock.notify()
+
+    def _claim(self, line, now):
+        """Pending request this line belongs to, or None (log only). In order:
+        a waiting request whose `match` fits; a multi-line reply still being
+        collected; a waiting request with no `match`, only when it is the oldest
+        one outstanding. An idle reply whose silence already ran out gets no more lines."""
+        for p in [p for p in self.pending if p.lines is not None and p.spec.idle is not None
+                  and now - p.last >= p.spec.idle]:
+            self._finish(p, p.last)
+        for p in self.pending:
+            if p.lines is None and p.spec.match is not None and p.spec.match.search(line):
+                # a new reply starting ends any older idle-terminated one
+                for q in self.pending[:self.pending.index(p)]:
+                    if q.lines is not None and q.spec.until is None: self._finish(q, q.last)
+                return p
+        for p in self.pending:
+            if p.lines is not None: return p
+        if self.pending and self.pending[0].spec.match is None:
+            return self.pending[0]
+        return None
+
+    def _finish(self, p, now):
+        self.pending.remove(p)
+        self._resolve(p, now)
+
+    def fail_all(self, exc):
+        with self._lock:
+            pend, self.pending = self.pending, []
+        for p in pend:
+            if not p.future.done(): p.future.set_exception(exc)
+
+    def _resolve(self, p, now):
+        if not p.future.done():
+            p.future.set_result(Response(p.cmd, p.lines, round((now - p.t0) * 1000, 3)))
+
+    def _ensure_watchdog(self):
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch, name="cmd-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def _watch(self):
+        with self._lock:
+            while True:
+                if not self.pending:
+                    self._lock.wait()
+                    continue
+                now = time.perf_counter()
+                keep, wake = [], now + 1.0
+                for p in self.pending:
+                    if p.lines is not None and p.spec.idle is not None and now - p.last >= p.spec.idle:
+                        self._resolve(p, p.last)
+                    elif now >= p.deadline:
+                        if not p.future.done():
+                            p.future.set_exception(TimeoutError(
+                                f"{p.cmd}: no response in {(p.deadline - p.t0) * 1000:.0f} ms"))
+                            logging.info("[CMD] %s timed out", p.cmd)
+                    else:
+                        keep.append(p)
+                        wake = min(wake, p.deadline)
+                        if p.lines is not None and p.spec.idle is not None:
+                            wake = min(wake, p.last + p.spec.idle)
+                self.pending = keep
+                self._lock.wait(max(0.0005, wake - now))
@@ -0,0 +1,123 @@
+# Parsed + validated configuration, shared by the whole app
+import os, json, hashlib, logging, yaml
+
+FILES = {"app": "app.yaml", "commands": "commands.yaml", "syscheck": "syscheck.yaml", "macros": "macros.yaml"}
+CACHE_VERSION = 2
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+class ConfigError(ValueError):
+    pass
+
+class Config:
+    """app.yaml, commands.yaml, syscheck.yaml and macros.yaml as plain dicts
+    (.app, .commands, .syscheck, .macros). Build one with load_config() and hand
+    the same object to every panel instead of re-reading YAML."""
+
+    def __init__(self, data, paths, fingerprints, parsed):
+        self.app = data["app"]
+        self.commands = data["commands"]
+        self.syscheck = data["syscheck"]
+        self.macros = data["macros"]
+        self.paths = paths
+        self.fingerprints = fingerprints   # name -> sha1 of the file bytes
+        self.parsed = parsed               # names actually parsed (not served from cache)
+
+def _fingerprint(raw):
+    return hashlib.sha1(raw).hexdigest()
+
+def _need(errors, d, dotted, typ, where):
+    cur = d
+    for k in dotted.split("."):
+        if not isinstance(cur, dict) or k not in cur:
+            errors.append(f"{where}: missing {dotted}")
+            return
+        cur = cur[k]
+    if not isinstance(cur, typ):
+        name = typ.__name__ if isinstance(typ, type) else "/".join(t.__name__ for t in typ)
+        errors.append(f"{where}: {dotted} must be {name}, got {type(cur).__name__}")
+
+def validate(data):
+    """Raise ConfigError listing every problem found, not just the first."""
+    errors = []
+    app = data["app"]
+    for key, typ in (("app.name", str), ("serial.baudrate", int), ("serial.eol", str),
+                     ("serial.ping", str), ("serial.pong", str), ("logging.folder", str)):
+        _need(errors, app, key, typ, "app.yaml")
+    for cam in ("cam_a", "cam_b"):
+        _need(errors, app, f"cameras.{cam}.index", (int, str), "app.yaml")
+        for key in ("width", "height", "target_fps"):
+            _need(errors, app, f"cameras.{cam}.{key}", (int, float), "app.yaml")
+        if app.get("cameras", {}).get(cam, {}).get("capture", "thread") not in ("thread", "process"):
+            errors.append(f"app.yaml: cameras.{cam}.capture must be thread or process")
+        pacing = app.get("cameras", {}).get(cam, {}).get("pacing") or {}
+        if not pacing.get("low", 0.5) < pacing.get("high", 0.85):
+            errors.append(f"app.yaml: cameras.{cam}.pacing.low must be below pacing.high")
+    rec = app.get("cameras", {}).get("recording", {})
+    if rec.get("on_full", "drop_oldest") not in ("drop_oldest", "drop_newest", "block"):
+        errors.append("app.yaml: cameras.recording.on_full must be drop_oldest, drop_newest or block")
+    if app.get("adu", {}).get("backend", "auto") not in ("auto", "dll", "sim"):
+        errors.append("app.yaml: adu.backend must be auto, dll or sim")
+    cmds = data["commands"]
+    for group, field in (("arduino_buttons", "cmd"), ("adu_buttons", "action")):
+        for i, b in enumerate(cmds.get(group) or []):
+            if not isinstance(b, dict) or "label" not in b or field not in b:
+                errors.append(f"commands.yaml: {group}[{i}] needs label and {field}")
+    for i, st in enumerate(data["syscheck"].get("steps") or []):
+        if not isinstance(st, dict) or "type" not in st:
+            errors.append(f"syscheck.yaml: steps[{i}] needs a type")
+    if data["macros"]:
+        from core.macro import check_macros
+        errors += check_macros(data["macros"])
+    if errors:
+        raise ConfigError("; ".join(errors))
+
+def _jsonable(d):
+    # YAML can yield int keys, dates, sets...: only cache what JSON gives back unchanged
+    try: return json.loads(json.dumps(d)) == d
+    except (TypeError, ValueError): return False
+
+def load_config(folder="config", cache="cache/config.json", **paths):
+    """Load the config files, re-parsing only those whose bytes changed
+    since the cached copy (plain JSON, so loading it runs no code).
+    `paths` overrides a file, e.g. app="other/app.yaml"."""
+    paths = {n: paths.get(n) or os.path.join(folder, f) for n, f in FILES.items()}
+    raws = {}
+    for n, p in paths.items():
+        try:
+            with open(p, "rb") as f: raws[n] = f.read()
+        except FileNotFoundError:
+            if n == "app": raise
+            raws[n] = b""
+    fps = {n: _fingerprint(r) for n, r in raws.items()}
+    cached = {}
+    if cache:
+        try:
+            with open(cache, "r", encoding="utf-8") as f:
+                c = json.load(f)
+            if c.get("version") == CACHE_VERSION: cached = c["entries"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+    data, parsed = {}, []
+    for n, raw in raws.items():
+        hit = cached.get(paths[n])
+        if hit and hit[0] == fps[n]:
+            data[n] = hit[1]
+            continue
+        try:
+            data[n] = yaml.load(raw, Loader=_Loader) or {}
+        except yaml.YAMLError as e:
+            raise ConfigError(f"{paths[n]}: {e}") from None
+        parsed.append(n)
+    validate(data)
+    fresh = [n for n in parsed if _jsonable(data[n])]
+    if cache and fresh:
+        for n in fresh: cached[paths[n]] = (fps[n], data[n])
+        try:
+            os.makedirs(os.path.dirname(cache) or ".", exist_ok=True)
+            tmp = cache + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "entries": cached}, f, separators=(",", ":"))
+            os.replace(tmp, cache)
+        except OSError:
+            logging.warning("Could not write config cache %s", cache)
+    return Config(data, paths, fps, parsed)
@@ -0,0 +1,291 @@
+# Local remote-control API: length-prefixed JSON over localhost TCP or a Unix socket
+import os, json, time, socket, struct, asyncio, threading, logging, collections
+
+HDR = struct.Struct(">I")
+MAX_MSG = 16 * 1024 * 1024
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+def _frame(obj):
+    body = _dumps(obj)
+    return HDR.pack(len(body)) + body
+
+class ControlServer:
+    """asyncio server on its own thread, so nothing here ever runs on the Tk loop.
+
+    Each message is a 4-byte big-endian length + UTF-8 JSON. Requests are
+    {"id": n, "op": ..., ...}; replies {"id": n, "ok": true, "result": ...} or
+    {"id": n, "ok": false, "error": "..."}. Requests on one connection are
+    handled concurrently (reply order follows completion), so clients can
+    pipeline. After {"op": "subscribe", "topics": [...]} bus events arrive as
+    {"event": topic, "data": [payloads]}, batched per loop wake-up.
+
+    ops: ping, scan, connect, disconnect, send, batch, adu, snapshot,
+         subscribe, unsubscribe, stats"""
+
+    def __init__(self, engine, host="127.0.0.1", port=8765, unix_socket=None, cameras=None):
+        self.engine, self.bus = engine, engine.bus
+        self.host, self.port, self.unix_socket = host, port, unix_socket
+        self.cameras = cameras or engine.camera     # name -> CameraWorker or None
+        self.loop = None
+        self.clients = set()
+        self.requests = 0
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._ops = {name[4:]: getattr(self, name) for name in dir(self) if name.startswith("_op_")}
+
+    # ---- lifecycle ----
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self.address
+
+    @property
+    def address(self):
+        return self.unix_socket or (self.host, self.port)
+
+    def stop(self):
+        if self.loop is None: return
+        self.bus.remove_tap(self._tap)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            if self.unix_socket:
+                if os.path.exists(self.unix_socket): os.remove(self.unix_socket)
+                srv = asyncio.start_unix_server(self._client, self.unix_socket)
+            else:
+                srv = asyncio.start_server(self._client, self.host, self.port)
+            self._server = self.loop.run_until_complete(srv)
+            if not self.unix_socket:
+                self.port = self._server.sockets[0].getsockname()[1]   # port=0 → picked by the OS
+        except Exception:
+            logging.exception("Control server failed to start")
+            self._ready.set()
+            return
+        self.bus.add_tap(self._tap)
+        logging.info("Control server listening on %s", self.address)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self._server.close()
+            for c in list(self.clients): c.writer.close()
+            self.loop.close()
+
+    # ---- bus → subscribers ----
+    def _tap(self, topic, payloads, ts):
+        # publisher thread: a set lookup per client; one loop wake-up per burst
+        for c in self.clients:
+            if topic in c.topics:
+                c.inbox.append((topic, payloads))
+                if not c.scheduled:
+                    c.scheduled = True
+                    self.loop.call_soon_threadsafe(c.flush)
+
+    # ---- connections ----
+    async def _client(self, reader, writer):
+        c = _Client(writer)
+        self.clients = self.clients | {c}
+        sock = writer.get_extra_info("socket")
+        if sock is not None and sock.family != getattr(socket, "AF_UNIX", None):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                hdr = await reader.readexactly(HDR.size)
+                n = HDR.unpack(hdr)[0]
+                if n > MAX_MSG: raise ValueError(f"message too large ({n} bytes)")
+                msg = json.loads(await reader.readexactly(n))
+                self.requests += 1
+                op = self._ops.get(msg.get("op"))
+                if op is None:
+                    c.send({"id": msg.get("id"), "ok": False, "error": f"unknown op {msg.get('op')!r}"})
+                elif asyncio.iscoroutinefunction(op):
+                    asyncio.ensure_future(self._call(c, op, msg))
+                else:
+                    self._reply(c, msg, op, c)     # cheap ops answer inline
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logging.warning("Control client dropped: %s", e)
+        finally:
+            self.clients = self.clients - {c}
+            writer.close()
+
+    def _reply(self, c, msg, op, *args):
+        try:
+            c.send({"id": msg.get("id"), "ok": True, "result": op(msg, *args)})
+        except Exception as e:
+            c.send({"id": msg.get("id"), "ok": False, "error": str(e) or type(e).__name__})
+
+    async def _call(self, c, op, msg):
+        try:
+            res = await op(msg)
+            c.send({"id": msg.get("id"), "ok": True, "result": res})
+        except Exception as e:
+            c.send({"id": msg.get("id"), "ok": False, "error": str(e) or type(e).__name__})
+
+    def _blocking(self, fn, *args):
+        return self.loop.run_in_executor(None, fn, *args)
+
+    # ---- ops ----
+    def _op_ping(self, msg, c):
+        return {"t": time.time()}
+
+    def _op_stats(self, msg, c):
+        return {"serial": self.engine.serial.stats(), "hub": self.engine.hub.stats(),
+                "clients": len(self.clients), "requests": self.requests,
+                "events_dropped": sum(c.dropped for c in self.clients)}
+
+    def _op_subscribe(self, msg, c):
+        c.topics = c.topics | set(msg.get("topics", []))
+        return sorted(c.topics)
+
+    def _op_unsubscribe(self, msg, c):
+        c.topics = c.topics - set(msg.get("topics", [])) if msg.get("topics") else frozenset()
+        return sorted(c.topics)
+
+    async def _op_scan(self, msg):
+        return await self._blocking(self.engine.scan)
+
+    async def _op_connect(self, msg):
+        return await self._blocking(self.engine.connect, msg.get("port"))
+
+    async def _op_disconnect(self, msg):
+        await self._blocking(self.engine.disconnect)
+        return True
+
+    def _request(self, device, cmds, timeout):
+        if device:
+            return self.engine.hub.request_many(device, cmds, timeout)
+        return self.engine.serial.request_many(cmds, timeout)
+
+    async def _op_send(self, msg):
+        """{"cmd": "VER", "device": optional hub name, "timeout": s, "wait": true}
+        wait=false (or a command without a reply spec) just writes it."""
+        cmd, dev = msg["cmd"], msg.get("device")
+        router = self.engine.hub.devices[dev].router if dev else self.engine.serial.router
+        if not msg.get("wait", router.has_spec(cmd)):
+            ok = self.engine.hub.write_line(dev, cmd) if dev else self.engine.serial.write_line(cmd)
+            if not ok: raise ConnectionError("write failed (not connected)")
+            return None
+        r = await asyncio.wrap_future(self._request(dev, [cmd], msg.get("timeout"))[0])
+        return {"lines": r.lines, "rtt_ms": r.rtt_ms}
+
+    async def _op_batch(self, msg):
+        """{"cmds": [...]} pipelined in one write; per-command result or error."""
+        futs = self._request(msg.get("device"), list(msg["cmds"]), msg.get("timeout"))
+        out = []
+        for f in futs:
+            try:
+                r = await asyncio.wrap_future(f)
+                out.append({"ok": True, "lines": r.lines, "rtt_ms": r.rtt_ms})
+            except Exception as e:
+                out.append({"ok": False, "error": str(e) or type(e).__name__})
+        return out
+
+    async def _op_adu(self, msg):
+        """{"action": "LIGHT_PULSE:200"} → True once applied (queued on the ADU worker)."""
+        return await asyncio.wrap_future(self.engine.adu.submit(msg["action"]))
+
+    async def _op_snapshot(self, msg):
+        """{"cam": "cam_a", "path": optional} → saved file path."""
+        w = self.cameras(msg["cam"])
+        frame = getattr(w, "last_frame_bgr", None)
+        if frame is None: raise RuntimeError(f"{msg['cam']}: no frame")
+        path = msg.get("path") or os.path.join(
+            self.engine.cfg["cameras"].get("recording", {}).get("folder", "captures"),
+            f"{msg['cam']}_{time.strftime('%Y%m%d-%H%M%S')}_{int(time.time() * 1000) % 1000:03d}.png")
+        def save():
+            import cv2
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if not cv2.imwrite(path, frame): raise RuntimeError(f"could not write {path}")
+            return path
+        return await self._blocking(save)
+
+class _Client:
+    __slots__ = ("writer", "topics", "inbox", "scheduled", "dropped")
+    MAX_BUFFERED = 4 * 1024 * 1024     # a slow subscriber loses events, never stalls the server
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.topics = frozenset()
+        self.inbox = collections.deque()
+        self.scheduled = False
+        self.dropped = 0
+
+    def send(self, obj):
+        self.writer.write(_frame(obj))
+
+    def flush(self):
+        self.scheduled = False
+        batch = {}
+        inbox = self.inbox
+        while inbox:
+            topic, payloads = inbox.popleft()
+            batch.setdefault(topic, []).extend(payloads)
+        if not batch or self.writer.is_closing(): return
+        if self.writer.transport.get_write_buffer_size() > self.MAX_BUFFERED:
+            self.dropped += sum(len(d) for d in batch.values())
+            return
+        self.writer.write(b"".join(_frame({"event": t, "data": d}) for t, d in batch.items()))
+
+class ControlClient:
+    """Blocking client for scripts and tests.
+
+        c = ControlClient(("127.0.0.1", 8765))
+        c.call("send", cmd="VER")     # → {"lines": [...], "rtt_ms": ...}"""
+
+    def __init__(self, address=("127.0.0.1", 8765), timeout=10.0):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self._buf = bytearray()
+        self._id = 0
+        self.events = []            # events received while waiting for replies
+
+    def close(self):
+        self.sock.close()
+
+    def send_many(self, requests):
+        """Write several requests at once; returns their ids."""
+        ids, out = [], []
+        for op, kw in requests:
+            self._id += 1
+            ids.append(self._id)
+            out.append(_frame({"id": self._id, "op": op, **kw}))
+        self.sock.sendall(b"".join(out))
+        return ids
+
+    def recv(self):
+        while True:
+            if len(self._buf) >= HDR.size:
+                n = HDR.unpack_from(self._buf)[0]
+                if len(self._buf) >= HDR.size + n:
+                    msg = json.loads(bytes(self._buf[HDR.size:HDR.size + n]))
+                    del self._buf[:HDR.size + n]
+                    return msg
+            chunk = self.sock.recv(65536)
+            if not chunk: raise ConnectionError("server closed the connection")
+            self._buf += chunk
+
+    def call(self, op, **kw):
+        rid = self.send_many([(op, kw)])[0]
+        while True:
+            msg = self.recv()
+            if "event" in msg:
+                self.events.append(msg)
+                continue
+            if msg.get("id") == rid: break
+        if not msg["ok"]: raise RuntimeError(msg["error"])
+        return msg["result"]
@@ -1,34 +1,137 @@
 # Ping–Pong scanning
-import serial, serial.tools.list_ports, time, threading
+import serial, serial.tools.list_ports, time, threading, json, os, logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
+
+def port_key(p):
+    # stable identity across COM renumbering: USB VID/PID/serial, else device name
+    if getattr(p, "vid", None) is not None:
+        return f"{p.vid:04X}:{p.pid or 0:04X}:{getattr(p, 'serial_number', None) or ''}"
+    return p.device
 
 class DeviceScanner:
     def __init__(self, bus, serial_cfg):
         self.bus = bus
         self.cfg = serial_cfg
         self.best_port = None
+        self.last_result = None
+        self.cache_path = serial_cfg.get("port_cache", os.path.join("cache", "last_port.json"))
 
-    def scan_async(self):
-        threading.Thread(target=self._scan, daemon=True).start()
+    def scan_async(self, ports=None):
+        threading.Thread(target=self._scan, args=(ports,), daemon=True).start()
 
-    def _scan(self):
-        ports = serial.tools.list_ports.comports()
-        ping = (self.cfg["ping"] + self.cfg["eol"]).encode()
-        timeout = self.cfg.get("scan_timeout_ms", 800)/1000.0
-        best = None
+    def _scan(self, ports=None):
+        res = self.scan(ports)
+        self.bus.publish("scan:result", res)
+
+    def scan(self, ports=None):
+        """Probe candidate ports in parallel; returns as soon as one answers PONG.
+        `ports` may be device names or list_ports entries (default: all comports)."""
+        t0 = time.perf_counter()
+        cands = self._candidates(ports)
+        timings = {}
+        best, via = None, None
+
+        # port that answered last session (matched by USB identity) goes into the
+        # pool first, so it gets a worker straight away without delaying the others
+        cached = self._load_cache()
+        first = next((p for p in cands if cached and port_key(p) == cached.get("key")), None) \
+            or next((p for p in cands if cached and p.device == cached.get("device")), None)
+        if first is not None:
+            cands = [first] + [p for p in cands if p is not first]
+
+        if cands:
+            cancel = threading.Event()
+            workers = max(1, min(int(self.cfg.get("scan_workers", 8)), len(cands)))
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan")
+            futs = {pool.submit(self._probe, p, cancel): p for p in cands}
+            try:
+                for f in as_completed(futs):
+                    p = futs[f]
+                    ok, ms, why = f.result()
+                    timings[p.device] = {"ms": ms, "result": why}
+                    if ok:
+                        best, via = p, "cache" if p is first else "scan"
+                        cancel.set()
+                        break
+            finally:
+                # losers notice `cancel` within one read slice and close their ports
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        if best is not None:
+            self._save_cache(best)
+        self.best_port = best.device if best else None
+        self.last_result = {
+            "best": self.best_port,
+            "via": via,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "ports": len(cands),
+            "timings": timings,
+        }
+        logging.info("Scan: best=%s via=%s in %.1f ms (%s)", self.best_port, via,
+                     self.last_result["elapsed_ms"], timings)
+        return self.last_result
+
+    def _candidates(self, ports):
+        if ports is None:
+            ports = serial.tools.list_ports.comports()
+        out = []
         for p in ports:
+            if isinstance(p, str):
+                p = SimpleNamespace(device=p, description="", vid=None, pid=None, serial_number=None)
             if "Bluetooth" in (p.description or ""): continue
-            try:
-                ser = serial.Serial(p.device, self.cfg["baudrate"], timeout=timeout)
-                time.sleep(0.15)
-                ser.reset_input_buffer(); ser.reset_output_buffer()
-                ser.write(ping)
-                time.sleep(0.3)
-                resp = ser.read(128).decode(errors="ignore")
-                ser.close()
-                if self.cfg["pong"] in resp:
-                    best = p.device
-                    break
-            except Exception:
-                pass
-        self.best_port = best
-        self.bus.publish("scan:result", {"best": best})
+            out.append(p)
+        return out
+
+    def _probe(self, p, cancel):
+        """Open one port, PING it and wait for the PONG bytes (not a fixed sleep)."""
+        t0 = time.perf_counter()
+        ms = lambda: round((time.perf_counter() - t0) * 1000, 1)
+        ping = (self.cfg["ping"] + self.cfg["eol"]).encode()
+        pong = self.cfg["pong"].encode()
+        timeout = self.cfg.get("scan_timeout_ms", 800) / 1000.0
+        settle = self.cfg.get("scan_settle_ms", 150) / 1000.0
+        resend = self.cfg.get("scan_ping_interval_ms", 250) / 1000.0
+        ser = None
+        try:
+            ser = serial.Serial(p.device, self.cfg["baudrate"], timeout=0.05)
+            if settle and cancel.wait(settle):
+                return False, ms(), "cancelled"
+            ser.reset_input_buffer(); ser.reset_output_buffer()
+            ser.write(ping)
+            buf = b""
+            deadline = time.perf_counter() + timeout
+            next_ping = time.perf_counter() + resend
+            while time.perf_counter() < deadline:
+                if cancel.is_set():
+                    return False, ms(), "cancelled"
+                buf += ser.read(ser.in_waiting or 1)
+                if pong in buf:
+                    return True, ms(), "pong"
+                buf = buf[-128:]
+                if time.perf_counter() >= next_ping:
+                    # board may still be booting after the DTR reset; ask again
+                    ser.write(ping)
+                    next_ping += resend
+            return False, ms(), "timeout"
+        except Exception as e:
+            return False, ms(), f"error: {e}"
+        finally:
+            if ser is not None:
+                try: ser.close()
+                except Exception: pass
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _save_cache(self, p):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"key": port_key(p), "device": p.device}, f)
+        except Exception:
+            pass
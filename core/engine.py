@@ -0,0 +1,202 @@
+# GUI-independent device engine (bus, serial, scanner, cameras, ADU, system check, macros)
+import time, threading, logging
+from core.config import load_config
+from core.event_bus import EventBus
+from core.serial_manager import SerialManager
+from core.serial_hub import SerialHub
+from core.device_scanner import DeviceScanner
+from core.adu_client import ADUClient
+from core.metrics import METRICS
+
+class Engine:
+    """Everything the app does to devices, with no Tk/PIL import.
+
+    The GUI builds its panels on top of one Engine; cli.py drives the same
+    object from the command line. cv2 is only imported once a camera is used."""
+
+    def __init__(self, app_cfg, commands_cfg=None, bus=None):
+        self.cfg = app_cfg
+        self.commands = commands_cfg if commands_cfg is not None else load_config().commands
+        self.bus = bus or EventBus()
+        self.bus.configure("log:line", mode="batch", maxlen=20000)
+        self.bus.configure("conn:state", mode="latest")
+        s = app_cfg["serial"]
+        self.serial = SerialManager(self.bus, baud=s["baudrate"], eol=s["eol"],
+                                    responses=self.commands.get("responses"))
+        self.hub = SerialHub(self.bus, s.get("devices") or {}, baud=s["baudrate"], eol=s["eol"],
+                             responses=self.commands.get("responses"))
+        self.scanner = DeviceScanner(self.bus, s)
+        self.bus.configure("adu:state", mode="latest")
+        self.bus.configure("macro:progress", mode="latest")
+        self.adu = ADUClient(app_cfg.get("adu"), bus=self.bus,
+                             actions=[b["action"] for b in self.commands.get("adu_buttons") or []])
+        self.cameras = {}      # name -> CameraWorker opened by the engine
+        self.recorders = {}    # name -> Recorder
+        self.session = None
+        self.control = None
+        # pulled only when a metrics snapshot is taken (see core/metrics.py)
+        METRICS.source("bus", self.bus.metrics)
+        METRICS.source("serial", self.serial.stats)
+        if self.hub.devices: METRICS.source("hub", self.hub.stats)
+        METRICS.source("adu", self.adu.stats)
+        METRICS.source("engine_cameras", lambda: {
+            n: {"capture_fps": round(w.capture_rate.rate, 1), "dropped": w.mailbox.dropped, **w.stats(),
+                **({"shm": w.consumer_stats()} if w.mode == "process" else {})}
+            for n, w in list(self.cameras.items())})
+
+    # ---- serial ----
+    def scan(self):
+        """Blocking scan; returns the scanner's result dict (best, elapsed_ms, ...)."""
+        return self.scanner.scan()
+
+    def connect(self, port=None):
+        port = port or self.scanner.best_port or self.scan().get("best")
+        return bool(port) and self.serial.open(port)
+
+    def disconnect(self):
+        self.serial.close()
+
+    def connect_devices(self):
+        """Open every serial.devices entry on the hub; missing ones keep retrying."""
+        return self.hub.connect_all()
+
+    def disconnect_devices(self):
+        for name in self.hub.devices: self.hub.disconnect(name)
+
+    def send(self, cmd, timeout=None):
+        """Request/response for commands with a reply spec, plain write otherwise.
+        Returns a Response, True for a plain write; raises on timeout/not connected."""
+        if self.serial.router.has_spec(cmd):
+            return self.serial.request(cmd, timeout).result()
+        if not self.serial.write_line(cmd):
+            raise ConnectionError("write failed (not connected)")
+        return True
+
+    def send_file(self, path, gap_ms=0, on_result=None):
+        """Send a command file: one command per line, `#` comments, `@wait <ms>`
+        pauses. Returns (sent, failed); a malformed line counts as failed and is
+        reported through on_result without stopping the file."""
+        sent = failed = 0
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [ln.strip() for ln in f]
+        for no, ln in enumerate(lines, 1):
+            if not ln or ln.startswith("#"): continue
+            if ln.startswith("@wait"):
+                try:
+                    _, ms = ln.split()
+                    ms = float(ms)
+                    if not ms >= 0: raise ValueError
+                except ValueError:
+                    failed += 1
+                    if on_result: on_result(ln, ValueError(f"line {no}: @wait needs one delay in ms >= 0"))
+                    continue
+                time.sleep(ms / 1000.0)
+                continue
+            try:
+                r = self.send(ln)
+                sent += 1
+            except Exception as e:
+                r = e
+                failed += 1
+            if on_result: on_result(ln, r)
+            if gap_ms: time.sleep(gap_ms / 1000.0)
+        return sent, failed
+
+    # ---- cameras ----
+    def camera(self, name):
+        """Live worker for `name`, or None (SystemCheck's cameras= callable)."""
+        return self.cameras.get(name)
+
+    def open_camera(self, name):
+        if name in self.cameras: return self.cameras[name]
+        from core.camera_worker import CameraWorker
+        from core.recorder import Recorder
+        c = self.cfg["cameras"][name]
+        rec = self.recorders.setdefault(name, Recorder(name, self.cfg["cameras"].get("recording", {}), self.bus))
+        proc = c.get("capture", "thread") == "process"
+        w = CameraWorker(index=c["index"], width=c["width"], height=c["height"],
+                         target_fps=c["target_fps"], on_frame=None if proc else rec.push,
+                         mode=c.get("capture", "thread"), shm_slots=c.get("shm_slots", 8),
+                         sensor_fps=c.get("sensor_fps"), pacing=c.get("pacing"),
+                         demand=lambda: rec.recording)
+        pre = self.cfg["cameras"].get("pretrigger", {})
+        if pre.get("enabled", False):
+            w.enable_pretrigger(seconds=pre.get("seconds", 10), max_mb=pre.get("max_mb", 200),
+                                jpeg_quality=pre.get("jpeg_quality", 0))
+        w.start()
+        if w.cap is None:
+            self.bus.publish("log:line", f"[{name}] Camera not available")
+            return None
+        if proc: rec.follow(w.consumer("recorder"))   # encodes from the shared ring in place
+        self.cameras[name] = w
+        return w
+
+    def close_camera(self, name):
+        w = self.cameras.pop(name, None)
+        rec = self.recorders.get(name)
+        if rec: rec.stop(); rec.follow(None)
+        if w: w.stop()
+
+    def record(self, name, seconds, stop=None):
+        """Record `seconds` of `name` (opening it if needed); returns the file path."""
+        w = self.open_camera(name)
+        if w is None: return None
+        deadline = time.monotonic() + 2.0
+        while w.last_frame is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        if w.last_frame is None: return None
+        h, fw = w.last_frame.shape[:2]
+        rec = self.recorders[name]
+        path = rec.start((fw, h), w.effective_fps or float(self.cfg["cameras"][name]["target_fps"]))
+        (stop or threading.Event()).wait(seconds)
+        rec.stop()
+        return path
+
+    # ---- system check / sessions ----
+    def syscheck(self, cfg=None, confirm=None, cameras=None):
+        from core.syscheck import SystemCheck
+        return SystemCheck(
+            cfg if cfg is not None else load_config().syscheck, self.bus,
+            serial=self.serial, scanner=self.scanner, adu=self.adu,
+            cameras=cameras or self.camera, cams_cfg=self.cfg["cameras"],
+            vision_cfg=self.cfg.get("vision", {}), confirm=confirm,
+            retries=self.cfg["serial"].get("retries", 1))
+
+    def macro(self, name, cfg=None, cameras=None):
+        """MacroRunner for macros.yaml `name`, not yet started (run() blocks, start() threads)."""
+        from core.macro import MacroRunner
+        return MacroRunner(cfg if cfg is not None else load_config().macros, name, self.bus,
+                           serial=self.serial, adu=self.adu, cameras=cameras or self.camera)
+
+    def start_session(self, folder=None, name=None):
+        from core.session import SessionRecorder
+        if self.session is None or self.session.error is not None:
+            sc = self.cfg.get("session", {})
+            self.session = SessionRecorder(self.bus, folder=folder or sc.get("folder", "sessions"),
+                                           name=name, index_every=sc.get("index_every", 256))
+        return self.session
+
+    def start_control(self, cameras=None):
+        """Start the local control server from app.yaml `control:`; returns it."""
+        from core.control_server import ControlServer
+        c = self.cfg.get("control", {})
+        self.control = ControlServer(self, host=c.get("host", "127.0.0.1"), port=c.get("port", 8765),
+                                     unix_socket=c.get("unix_socket"), cameras=cameras)
+        self.control.start()
+        return self.control
+
+    def stop_session(self):
+        if self.session is not None:
+            self.session.stop()
+            self.session = None
+
+    def close(self):
+        for name in list(self.cameras): self.close_camera(name)
+        for rec in self.recorders.values(): rec.close()
+        self.serial.close()
+        self.hub.close()
+        self.adu.close()
+        if self.control is not None: self.control.stop()
+        self.stop_session()
+        for name in ("bus", "serial", "hub", "adu", "engine_cameras"): METRICS.remove_source(name)
+        logging.info("Engine closed")
@@ -1,31 +1,203 @@
 # Thread-safe pub/sub
-import queue, threading
+import threading, time, logging, collections, queue
+from core.metrics import METRICS
+
+MODES = ("fifo", "latest", "batch")
+TARGETS = ("worker", "ui")
+
+class _Channel:
+    """Queue for one (target, topic) pair.
+
+    fifo   – every payload delivered in order
+    latest – only the newest pending payload is delivered (status, frames)
+    batch  – all pending payloads delivered as one list (log lines)"""
+    __slots__ = ("topic", "target", "mode", "handlers", "stamped", "items", "scheduled",
+                 "published", "handled", "dropped", "coalesced", "errors", "lat")
+
+    def __init__(self, topic, target, mode, maxlen):
+        self.topic, self.target, self.mode = topic, target, mode
+        self.handlers = []
+        self.stamped = set()     # handlers that also get publish times
+        self.items = collections.deque(maxlen=1 if mode == "latest" else maxlen)
+        self.scheduled = False
+        self.published = self.handled = self.dropped = self.coalesced = self.errors = 0
+        self.lat = collections.deque(maxlen=1024)   # recent publish→handle latencies (s)
 
 class EventBus:
-    def __init__(self):
-        self.q = queue.Queue()
-        self.handlers = {}
-        self._pump_started = False
+    """Pub/sub with explicit dispatch targets.
+
+    Handlers subscribed with target="worker" run on a small thread pool (one
+    channel is never drained by two threads at once, so per-topic order holds).
+    target="ui" handlers only run from the Tk main loop once attach_tk() is
+    called, drained in batches within a per-tick time budget."""
+
+    def __init__(self, workers=2, default_maxlen=10000):
+        self._lock = threading.Lock()
+        self._topics = {}          # topic -> {"mode":, "maxlen":}
+        self._channels = {}        # topic -> [channel, ...]
+        self._ready = queue.SimpleQueue()        # worker channels with pending items
+        self._ui_ready = collections.deque()     # ui channels with pending items
+        self._workers = workers
+        self._started = False
+        self._default_maxlen = default_maxlen
+        self._tk = None
+        self._taps = ()
+        self.ui_budget_s = 0.008
+        self.ui_interval_ms = 16
+
+    # ---- configuration ----
+    def configure(self, topic, mode="fifo", maxlen=None):
+        if mode not in MODES: raise ValueError(f"mode must be one of {MODES}")
+        with self._lock:
+            self._topics[topic] = {"mode": mode, "maxlen": maxlen or self._default_maxlen}
+            for ch in self._channels.get(topic, []):
+                old = list(ch.items)
+                ch.mode = mode
+                ch.items = collections.deque(old, maxlen=1 if mode == "latest" else maxlen or self._default_maxlen)
+
+    def subscribe(self, topic, handler, target="worker", stamped=False):
+        """`stamped` handlers get a second argument: the time.monotonic() of each
+        publish (a list alongside a batch), for consumers that need arrival times."""
+        if target not in TARGETS: raise ValueError(f"target must be one of {TARGETS}")
+        with self._lock:
+            chans = self._channels.setdefault(topic, [])
+            ch = next((c for c in chans if c.target == target), None)
+            if ch is None:
+                t = self._topics.get(topic, {})
+                ch = _Channel(topic, target, t.get("mode", "fifo"), t.get("maxlen", self._default_maxlen))
+                chans.append(ch)
+            ch.handlers.append(handler)
+            if stamped: ch.stamped.add(handler)
+        if target == "worker": self._start_workers()
+
+    def add_tap(self, fn):
+        """`fn(topic, payloads, t)` sees every publish, subscribed or not (session recording)."""
+        self._taps = self._taps + (fn,)
 
+    def remove_tap(self, fn):
+        self._taps = tuple(t for t in self._taps if t != fn)   # bound methods: equal, not identical
+
+    def attach_tk(self, widget, interval_ms=16, budget_ms=8):
+        """Start draining ui-target handlers on `widget`'s main loop."""
+        self._tk = widget
+        self.ui_interval_ms = interval_ms
+        self.ui_budget_s = budget_ms / 1000.0
+        widget.after(interval_ms, self._ui_tick)
+
+    # ---- publishing ----
     def publish(self, topic, payload):
-        if isinstance(payload, str):
-            payload = payload  # allow direct strings for log lines
-        self.q.put((topic, payload))
-        self._start_pump()
+        self._push(topic, (payload,))
+
+    def publish_many(self, topic, payloads):
+        """Publish several payloads with one lock round-trip."""
+        if payloads: self._push(topic, payloads)
+
+    def _push(self, topic, payloads):
+        for tap in self._taps:
+            tap(topic, payloads, time.monotonic())
+        chans = self._channels.get(topic)
+        if not chans: return
+        now = time.perf_counter()
+        with self._lock:
+            for ch in chans:
+                items = ch.items
+                for p in payloads:
+                    if len(items) == items.maxlen:
+                        if ch.mode == "latest": ch.coalesced += 1
+                        else: ch.dropped += 1
+                    items.append((now, p))
+                ch.published += len(payloads)
+                if not ch.scheduled:
+                    ch.scheduled = True
+                    if ch.target == "ui": self._ui_ready.append(ch)
+                    else: self._ready.put(ch)
 
-    def subscribe(self, topic, handler):
-        self.handlers.setdefault(topic, []).append(handler)
-        self._start_pump()
+    # ---- dispatch ----
+    def _take(self, ch, limit):
+        with self._lock:
+            if ch.mode == "batch" or limit is None or limit >= len(ch.items):
+                out = list(ch.items); ch.items.clear()
+            else:
+                out = [ch.items.popleft() for _ in range(limit)]
+            return out
 
-    def _start_pump(self):
-        if self._pump_started: return
-        self._pump_started = True
-        t = threading.Thread(target=self._loop, daemon=True)
-        t.start()
+    def _deliver(self, ch, items):
+        if not items: return
+        t = time.perf_counter()
+        lat = ch.lat
+        off = time.monotonic() - t if ch.stamped else 0.0
+        if ch.mode == "batch":
+            payloads = [p for _, p in items]
+            stamps = [ts + off for ts, _ in items] if ch.stamped else None
+            for h in ch.handlers:
+                try:
+                    if h in ch.stamped: h(payloads, stamps)
+                    else: h(payloads)
+                except Exception:
+                    ch.errors += 1
+                    logging.exception("Bus handler failed for %s", ch.topic)
+            lat.append(t - items[0][0])
+        else:
+            for ts, p in items:
+                for h in ch.handlers:
+                    try:
+                        if h in ch.stamped: h(p, ts + off)
+                        else: h(p)
+                    except Exception:
+                        ch.errors += 1
+                        logging.exception("Bus handler failed for %s", ch.topic)
+                lat.append(t - ts)
+        ch.handled += len(items)
+
+    def _reschedule(self, ch):
+        with self._lock:
+            if ch.items:
+                if ch.target == "ui": self._ui_ready.append(ch)
+                else: self._ready.put(ch)
+            else:
+                ch.scheduled = False
+
+    def _start_workers(self):
+        if self._started: return
+        self._started = True
+        for i in range(self._workers):
+            threading.Thread(target=self._loop, name=f"bus-{i}", daemon=True).start()
 
     def _loop(self):
         while True:
-            topic, payload = self.q.get()
-            for h in self.handlers.get(topic, []):
-                try: h(payload)
-                except Exception: pass
+            ch = self._ready.get()
+            self._deliver(ch, self._take(ch, 256))
+            self._reschedule(ch)
+
+    def _ui_tick(self):
+        t0 = time.perf_counter()
+        deadline = t0 + self.ui_budget_s
+        timed = METRICS.enabled and self._ui_ready
+        n = len(self._ui_ready)
+        while n and time.perf_counter() < deadline:
+            ch = self._ui_ready.popleft(); n -= 1
+            t = time.perf_counter()
+            self._deliver(ch, self._take(ch, 64))
+            if timed: METRICS.observe(f"tk:bus:{ch.topic}", (time.perf_counter() - t) * 1000)
+            self._reschedule(ch)
+        if timed: METRICS.observe("tk:bus_tick", (time.perf_counter() - t0) * 1000)
+        try:
+            self._tk.after(self.ui_interval_ms, self._ui_tick)
+        except Exception:
+            pass   # window destroyed
+
+    # ---- metrics ----
+    def metrics(self):
+        out = {}
+        with self._lock:
+            chans = [c for cs in self._channels.values() for c in cs]
+        for ch in chans:
+            lat = sorted(ch.lat)
+            pct = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 3) if lat else 0.0
+            out[f"{ch.target}:{ch.topic}"] = {
+                "mode": ch.mode, "depth": len(ch.items), "published": ch.published,
+                "handled": ch.handled, "dropped": ch.dropped, "coalesced": ch.coalesced,
+                "errors": ch.errors, "lat_p50_ms": pct(0.5), "lat_p99_ms": pct(0.99),
+                "lat_max_ms": round(lat[-1] * 1000, 3) if lat else 0.0,
+            }
+        return out
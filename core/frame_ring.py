@@ -0,0 +1,185 @@
+# Pre-trigger frame ring ("save the last N seconds")
+import threading, time, collections, logging
+import numpy as np
+import cv2
+from core.recorder import Recorder
+
+MB = 1024 * 1024
+
+class FrameRing:
+    """Fixed-memory ring holding the most recent frames.
+
+    Raw mode keeps frames in one preallocated (slots, h, w, 3) block; JPEG mode
+    keeps encoded frames in one byte pool sized from a ~10:1 compression guess
+    and doubled whenever a push would evict frames still inside `seconds`.
+    Either way memory is capped at `max_mb`, and the ring holds
+    min(seconds, what fits) of video.
+    Frames are addressed by a global sequence number; `read()` returns None for
+    frames that were already overwritten."""
+
+    def __init__(self, shape, fps, seconds=10, max_mb=200, jpeg_quality=0):
+        self.shape = tuple(shape)
+        self.jpeg_quality = int(jpeg_quality or 0)
+        self.seconds = float(seconds)
+        want = max(2, int(seconds * fps + 0.5))
+        self._lock = threading.Condition()
+        self.seq = 0           # seq of the next frame to be written
+        self.overruns = 0
+        if self.jpeg_quality:
+            self.cap = int(max_mb * MB)
+            self.pool = bytearray(min(self.cap, want * int(np.prod(self.shape)) // 10))
+            self.slots = want
+            self._entries = collections.deque()   # (seq, off, n, ts), oldest first
+            self._head = 0
+        else:
+            fb = int(np.prod(self.shape))
+            self.slots = max(2, min(want, int(max_mb * MB) // fb))
+            if self.slots < want:
+                logging.warning("Pre-trigger ring capped at %d frames (%.1f s) by max_mb=%s",
+                                self.slots, self.slots / fps, max_mb)
+            self.buf = np.empty((self.slots,) + self.shape, np.uint8)
+            self.ts = np.zeros(self.slots, np.float64)
+            self.seqs = np.full(self.slots, -1, np.int64)
+
+    @property
+    def nbytes(self):
+        return len(self.pool) if self.jpeg_quality else self.buf.nbytes + self.ts.nbytes + self.seqs.nbytes
+
+    # ---- capture thread ----
+    def push(self, frame, ts):
+        if frame.shape != self.shape: return False
+        if self.jpeg_quality:
+            ok, enc = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok: return False
+            self._push_bytes(enc, ts)
+        else:
+            i = self.seq % self.slots
+            with self._lock:
+                self.seqs[i] = -1          # slot is being rewritten
+            np.copyto(self.buf[i], frame)
+            with self._lock:
+                self.ts[i] = ts
+                self.seqs[i] = self.seq
+                self.seq += 1
+                self._lock.notify_all()
+        return True
+
+    def _push_bytes(self, enc, ts):
+        n = enc.nbytes
+        with self._lock:
+            while len(self.pool) < self.cap and (n > len(self.pool) or self._evicts_live(n, ts)):
+                self._grow(n)
+            if n > len(self.pool): return
+            e = self._entries
+            if self._head + n > len(self.pool):
+                # wrap: everything left in the tail region is older than the start
+                while e and e[0][1] >= self._head: e.popleft()
+                self._head = 0
+            lo, hi = self._head, self._head + n
+            while e and (e[0][1] < hi and e[0][1] + e[0][2] > lo):
+                e.popleft()
+            while e and (len(e) >= self.slots or ts - e[0][3] > self.seconds):
+                e.popleft()
+            self.pool[lo:hi] = enc.tobytes()
+            e.append((self.seq, lo, n, ts))
+            self._head = hi
+            self.seq += 1
+            self._lock.notify_all()
+
+    def _evicts_live(self, n, ts):
+        # would placing n bytes drop a frame that is still wanted (inside seconds and slots)?
+        e = self._entries
+        if not e: return False
+        live = lambda x: len(e) < self.slots and ts - x[3] <= self.seconds
+        head = self._head
+        if head + n > len(self.pool):
+            if any(x[1] >= head and live(x) for x in e): return True
+            head = 0
+        return any(x[1] < head + n and x[1] + x[2] > head and live(x) for x in e)
+
+    def _grow(self, n):
+        # compact the live entries into a pool twice the size (at most cap)
+        new = bytearray(min(self.cap, max(2 * len(self.pool), len(self.pool) + n)))
+        off, moved = 0, collections.deque()
+        for seq, o, k, ts in self._entries:
+            new[off:off + k] = self.pool[o:o + k]
+            moved.append((seq, off, k, ts))
+            off += k
+        self.pool, self._entries, self._head = new, moved, off
+
+    # ---- readers ----
+    def oldest_seq(self):
+        with self._lock:
+            if self.jpeg_quality:
+                return self._entries[0][0] if self._entries else self.seq
+            return max(0, self.seq - self.slots + 1)
+
+    def wait_for(self, seq, timeout):
+        with self._lock:
+            return self._lock.wait_for(lambda: self.seq > seq, timeout)
+
+    def read(self, seq):
+        """(ts, frame copy) for `seq`, or None if it is gone or not written yet."""
+        if self.jpeg_quality:
+            with self._lock:
+                e = self._entries
+                if not e or seq < e[0][0] or seq >= self.seq: return None
+                _, off, n, ts = e[seq - e[0][0]]
+                data = bytes(self.pool[off:off + n])
+            return ts, cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        i = seq % self.slots
+        with self._lock:
+            if self.seqs[i] != seq: return None
+            ts = float(self.ts[i])
+        frame = self.buf[i].copy()
+        with self._lock:
+            # seqlock check: the capture thread may have lapped us during the copy
+            if self.seqs[i] != seq: return None
+        return ts, frame
+
+    def duration(self):
+        with self._lock:
+            if self.jpeg_quality:
+                e = self._entries
+                return e[-1][3] - e[0][3] if len(e) > 1 else 0.0
+            n = min(self.seq, self.slots)
+            if n < 2: return 0.0
+            last = (self.seq - 1) % self.slots
+            first = (self.seq - n) % self.slots
+            return float(self.ts[last] - self.ts[first])
+
+class ClipDump(threading.Thread):
+    """Writes ring contents plus the next `post_s` seconds to a clip while capture runs."""
+
+    def __init__(self, ring, name, post_s, rec_cfg=None, bus=None, fps=None):
+        super().__init__(name=f"clip-{name}", daemon=True)
+        cfg = dict(rec_cfg or {})
+        cfg.update(on_full="block", block_timeout_ms=5000)
+        self.ring, self.post_s, self.bus, self.fps = ring, float(post_s), bus, fps
+        self.rec = Recorder(f"{name}_clip", cfg, bus)
+        self.trigger_ts = time.monotonic()
+        self.lost = 0
+
+    def run(self):
+        ring = self.ring
+        seq = ring.oldest_seq()
+        fps = self.fps or (ring.slots / ring.seconds)
+        h, w = ring.shape[:2]
+        self.rec.start((w, h), fps)
+        end = self.trigger_ts + self.post_s
+        while True:
+            if seq >= ring.seq and not ring.wait_for(seq, 1.0):
+                break   # capture stopped
+            item = ring.read(seq)
+            seq += 1
+            if item is None:
+                self.lost += 1
+                ring.overruns += 1
+                seq = max(seq, ring.oldest_seq())
+                continue
+            ts, frame = item
+            if ts > end: break
+            self.rec.push(frame, ts)
+        self.rec.close()
+        if self.lost and self.bus:
+            self.bus.publish("log:line", f"[{self.rec.name}] {self.lost} pre-trigger frames overwritten before dump")
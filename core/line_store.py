@@ -0,0 +1,171 @@
+# Bounded serial-monitor history with fast search
+import re, bisect, collections, threading
+from array import array
+
+TAG_RE = re.compile(r"\[([^\]\s]{1,16})\]")
+
+def line_tag(text):
+    """Leading level/source tag: "[ERR] x" -> "ERR", "→ VER" -> "TX", else None."""
+    if text.startswith("→"): return "TX"
+    m = TAG_RE.match(text)
+    return m.group(1) if m else None
+
+def split_lines(lines):
+    """Lines with embedded CR/LF broken into one entry per physical line, since
+    chunk offsets and the widget line count assume one line per entry."""
+    for l in lines:
+        if "\n" in l or "\r" in l: yield from l.splitlines()
+        else: yield l
+
+class _Chunk:
+    __slots__ = ("first", "text", "offsets", "tags", "n", "_lower")
+
+    def __init__(self, first, lines, tags):
+        self.first = first
+        self.text = "\n".join(lines) + "\n"
+        offs = array("I", [0]) if lines else array("I")
+        pos = 0
+        for l in lines[:-1]:
+            pos += len(l) + 1
+            offs.append(pos)
+        self.offsets = offs
+        self.tags = tags      # tag -> array of local line indexes
+        self.n = len(lines)
+        self._lower = None
+
+    def lower(self):
+        # built on the first case-insensitive search; False if lowering changes offsets
+        if self._lower is None:
+            low = self.text.lower()
+            self._lower = low if len(low) == len(self.text) else False
+        return self._lower
+
+    def line(self, i):
+        end = self.offsets[i + 1] - 1 if i + 1 < self.n else len(self.text) - 1
+        return self.text[self.offsets[i]:end]
+
+class LineStore:
+    """Append-only line history bounded to `max_lines`.
+
+    Lines are kept in sealed chunks of `chunk_lines` joined into one string, so
+    substring/regex search runs at C speed over whole chunks and evicting old
+    history is dropping a chunk. A per-chunk tag index is built incrementally
+    at append time, so tag filters never rescan text."""
+
+    def __init__(self, max_lines=1_000_000, chunk_lines=4096):
+        self.max_lines = max(chunk_lines, int(max_lines))
+        self.chunk_lines = chunk_lines
+        self._lock = threading.Lock()
+        self._chunks = collections.deque()
+        self._open, self._open_tags = [], {}
+        self.first_seq = 0      # oldest retained line
+        self.next_seq = 0       # seq the next line will get
+        self.tags = collections.Counter()
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def extend(self, lines):
+        with self._lock:
+            for l in split_lines(lines):
+                t = line_tag(l.split("  ", 1)[-1])
+                if t is not None:
+                    self._open_tags.setdefault(t, array("I")).append(len(self._open))
+                    self.tags[t] += 1
+                self._open.append(l)
+                self.next_seq += 1
+                if len(self._open) >= self.chunk_lines:
+                    self._seal()
+
+    def _seal(self):
+        first = self.next_seq - len(self._open)
+        self._chunks.append(_Chunk(first, self._open, self._open_tags))
+        self._open, self._open_tags = [], {}
+        while len(self) > self.max_lines and self._chunks:
+            c = self._chunks.popleft()
+            self.first_seq = c.first + c.n
+            for t, idx in c.tags.items():
+                self.tags[t] -= len(idx)
+                if self.tags[t] <= 0: del self.tags[t]
+
+    def clear(self):
+        with self._lock:
+            self._chunks.clear()
+            self._open, self._open_tags = [], {}
+            self.first_seq = self.next_seq
+            self.tags.clear()
+
+    def tail(self, n):
+        return [l for _, l in self.iter_lines(max(self.first_seq, self.next_seq - n))]
+
+    def iter_lines(self, since=0):
+        """(seq, line) from `since` onwards."""
+        with self._lock:
+            chunks, open_ = list(self._chunks), list(self._open)
+            open_first = self.next_seq - len(open_)
+        for c in chunks:
+            if c.first + c.n <= since: continue
+            for i in range(max(0, since - c.first), c.n):
+                yield c.first + i, c.line(i)
+        for i in range(max(0, since - open_first), len(open_)):
+            yield open_first + i, open_[i]
+
+    @staticmethod
+    def compile(query, regex=False, case=False):
+        """Matcher for search(): None (match all), a plain string, ("ci", lowered
+        string) for case-insensitive literals, or a compiled regex."""
+        if not query: return None
+        if regex:
+            return re.compile(query, re.MULTILINE | (0 if case else re.IGNORECASE))
+        return query if case else ("ci", query.lower(), re.compile(re.escape(query), re.IGNORECASE))
+
+    def search(self, query=None, regex=False, case=False, tag=None, limit=1000, since=0):
+        """Newest `limit` matching (seq, line), oldest first. `since` makes repeated
+        searches incremental: pass the previous result's next_seq to scan only new lines."""
+        pat = self.compile(query, regex, case)
+        with self._lock:
+            chunks = list(self._chunks)
+            open_first = self.next_seq - len(self._open)
+            open_chunk = _Chunk(open_first, list(self._open), dict(self._open_tags)) if self._open else None
+        if open_chunk is not None: chunks.append(open_chunk)
+        out = []
+        for c in reversed(chunks):
+            if c.first + c.n <= since: break
+            hits = self._chunk_hits(c, pat, tag)
+            lo = max(0, since - c.first)
+            for i in reversed(hits):
+                if i < lo: break
+                out.append((c.first + i, c.line(i)))
+                if len(out) >= limit: return out[::-1]
+        return out[::-1]
+
+    def _chunk_hits(self, c, pat, tag):
+        if tag is not None:
+            cand = c.tags.get(tag)
+            if not cand: return []
+            if pat is None: return list(cand)
+            return [i for i in cand if self._match_line(pat, c.line(i))]
+        if pat is None: return list(range(c.n))
+        hits, offs, text = [], c.offsets, c.text
+        if isinstance(pat, tuple):
+            low = c.lower()
+            pat, text = (pat[1], low) if low else (pat[2], text)
+        pos = 0
+        while True:
+            if isinstance(pat, str):
+                at = text.find(pat, pos)
+            else:
+                m = pat.search(text, pos)
+                at = m.start() if m else -1
+            if at < 0: break
+            i = bisect.bisect_right(offs, at) - 1
+            hits.append(i)
+            if i + 1 >= c.n: break
+            pos = offs[i + 1]     # one hit per line
+        return hits
+
+    @staticmethod
+    def _match_line(pat, line):
+        if isinstance(pat, str): return pat in line
+        if isinstance(pat, tuple): return pat[1] in line.lower()
+        return pat.search(line) is not None
@@ -0,0 +1,176 @@
+# Queue-based logging: callers enqueue, one thread formats, writes and rotates
+import os, sys, time, json, glob, logging, threading, queue, atexit
+
+TEXT_FMT = "%(asctime)s [%(levelname)s] %(message)s"
+
+class FastQueueHandler(logging.Handler):
+    """Puts records on a queue with the minimum work in the calling thread:
+    the message is merged with its args (so later mutation can't change it) and
+    exception text is rendered, everything else happens in the listener.
+    The queue is bounded: when it is full the record is dropped and counted."""
+
+    def __init__(self, q):
+        super().__init__()
+        self.q = q
+        self.dropped = 0
+
+    def emit(self, record):
+        try:
+            if record.args:
+                record.msg = record.getMessage()
+                record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self.q.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, r):
+        d = {"t": round(r.created, 6), "lvl": r.levelname, "thr": r.threadName, "msg": r.getMessage()}
+        if r.exc_text: d["exc"] = r.exc_text
+        return json.dumps(d, ensure_ascii=False)
+
+class RotatingWriter:
+    """Appends to app_<ts>.log; past `max_bytes` starts a new file, and only the
+    newest `keep` app_* files in the folder survive."""
+
+    def __init__(self, folder, max_bytes, keep, ext="log"):
+        self.folder, self.max_bytes, self.keep, self.ext = folder, max_bytes, keep, ext
+        os.makedirs(folder, exist_ok=True)
+        self.f = None
+        self.path = None
+        self.part = 0
+        self._open()
+
+    def _open(self):
+        ts = time.strftime("%Y%m%d-%H%M%S")
+        name = f"app_{ts}.{self.ext}" if self.part == 0 else f"app_{ts}_{self.part:02d}.{self.ext}"
+        self.path = os.path.join(self.folder, name)
+        self.f = open(self.path, "ab")
+        self.size = self.f.tell()
+        self._prune()
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.f.write(data)
+        self.size += len(data)
+        if self.max_bytes and self.size >= self.max_bytes:
+            self.f.close()
+            self.part += 1
+            self._open()
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def _prune(self):
+        if not self.keep: return
+        files = sorted(glob.glob(os.path.join(self.folder, "app_*.log")) +
+                       glob.glob(os.path.join(self.folder, "app_*.jsonl")), key=os.path.getmtime)
+        for old in files[:-self.keep]:
+            if old == self.path: continue
+            try: os.remove(old)
+            except OSError: pass
+
+class LogListener(threading.Thread):
+    """Drains the queue in batches: one write per batch per sink. A record that
+    fails to format is reported on stderr and skipped, and records the handler
+    dropped on a full queue are noted in the log as they are noticed."""
+
+    def __init__(self, q, writer, formatter, console=None, batch=512, flush_s=0.25, handler=None):
+        super().__init__(name="log-writer", daemon=True)
+        self.q, self.writer, self.formatter = q, writer, formatter
+        self.console = console
+        self.console_fmt = logging.Formatter(TEXT_FMT)
+        self.batch, self.flush_s = batch, flush_s
+        self.handler = handler
+        self.written = self.errors = 0
+        self._dropped = 0
+        self._sentinel = object()
+
+    def _format(self, fmt, recs):
+        out = []
+        for r in recs:
+            try:
+                out.append(fmt.format(r) + "\n")
+            except Exception:
+                self.errors += 1
+                try: sys.stderr.write(f"--- log record failed to format: {r.msg!r}\n")
+                except Exception: pass
+        return "".join(out)
+
+    def _drops(self):
+        n = self.handler.dropped if self.handler is not None else 0
+        if n == self._dropped: return []
+        rec = logging.makeLogRecord({"msg": f"log queue full: {n - self._dropped} records dropped",
+                                     "levelname": "WARNING", "levelno": logging.WARNING})
+        self._dropped = n
+        return [rec]
+
+    def run(self):
+        while True:
+            recs = [self.q.get()]
+            try:
+                while len(recs) < self.batch:
+                    recs.append(self.q.get_nowait())
+            except queue.Empty:
+                pass
+            stop = any(r is self._sentinel for r in recs)
+            recs = self._drops() + [r for r in recs if r is not self._sentinel]
+            if recs:
+                try:
+                    self.writer.write(self._format(self.formatter, recs))
+                except Exception as e:
+                    self.errors += 1
+                    try: sys.stderr.write(f"--- log write failed: {e!r}\n")
+                    except Exception: pass
+                if self.console is not None:
+                    try:
+                        self.console.write(self._format(self.console_fmt, recs))
+                    except Exception:
+                        pass
+                self.written += len(recs)
+            if stop or self.q.empty():
+                self.writer.flush()
+                if self.console is not None:
+                    try: self.console.flush()
+                    except Exception: pass
+            if stop:
+                self.writer.close()
+                return
+            if len(recs) < self.batch:
+                time.sleep(self.flush_s if self.q.empty() else 0)
+
+    def stop(self):
+        if not self.is_alive(): return
+        self.q.put(self._sentinel)
+        self.join(timeout=5)
+
+def start_logging(log_cfg, console=True):
+    """Install the queue handler on the root logger; returns the listener
+    (its .writer.path is the current log file)."""
+    folder = log_cfg.get("folder", "logs")
+    level = getattr(logging, log_cfg.get("level", "INFO").upper(), logging.INFO)
+    jsonl = log_cfg.get("format", "text") == "jsonl"
+    writer = RotatingWriter(folder, int(float(log_cfg.get("rotate_mb", 10)) * 1024 * 1024),
+                            int(log_cfg.get("keep_files", 10)), "jsonl" if jsonl else "log")
+    q = queue.Queue(maxsize=int(log_cfg.get("queue_max", 100_000)))
+    handler = FastQueueHandler(q)
+    listener = LogListener(q, writer, _JsonFormatter() if jsonl else logging.Formatter(TEXT_FMT),
+                           console=sys.stdout if console else None, handler=handler)
+    # our formats never use process info: skip collecting it per call
+    logging.logProcesses = logging.logMultiprocessing = False
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
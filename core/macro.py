@@ -0,0 +1,406 @@
+# Timed macros: Arduino / ADU / camera sequences on a monotonic-deadline clock
+import os, re, csv, json, time, threading, logging, collections
+from core.metrics import METRICS
+from core.syscheck import StepFailed
+
+KINDS = ("send", "adu", "wait", "wait_for", "snapshot", "log", "repeat", "if", "call")
+DEFAULTS = {"spin_ms": 2.0, "max_late_ms": 250, "progress_ms": 200, "report": True, "path": "reports",
+            "snapshot_path": "captures", "timeout_s": 2.0}
+
+class MacroError(ValueError):
+    pass
+
+class _Cancelled(Exception):
+    pass
+
+class Node:
+    __slots__ = ("id", "kind", "arg", "expect", "timeout", "optional", "body", "orelse")
+
+    def __init__(self, sid, kind, arg, spec):
+        self.id, self.kind, self.arg = sid, kind, arg
+        self.expect = None
+        self.timeout = spec.get("timeout_s")
+        self.optional = bool(spec.get("optional", False))
+        self.body = self.orelse = None
+
+    @property
+    def label(self):
+        return f"{self.id}:{self.kind} {getattr(self.arg, 'pattern', self.arg)}"
+
+def _regex(sid, pattern):
+    try:
+        return re.compile(pattern)
+    except (re.error, TypeError) as e:
+        raise MacroError(f"step {sid}: bad regex {pattern!r} ({e})") from None
+
+def compile_steps(steps, macros, prefix="", stack=()):
+    """macros.yaml steps → Node tree, checked once so a typo fails before the run, not at cycle 9000."""
+    if not isinstance(steps, list): raise MacroError(f"{stack[-1] if stack else 'macro'}: steps must be a list")
+    out = []
+    for i, spec in enumerate(steps, 1):
+        sid = f"{prefix}{i}"
+        if not isinstance(spec, dict): raise MacroError(f"step {sid}: must be a mapping")
+        kinds = [k for k in KINDS if k in spec]
+        if len(kinds) != 1: raise MacroError(f"step {sid}: needs exactly one of {', '.join(KINDS)}")
+        kind = kinds[0]
+        n = Node(sid, kind, spec[kind], spec)
+        if kind == "wait":
+            if not isinstance(n.arg, (int, float)) or n.arg < 0:
+                raise MacroError(f"step {sid}: wait must be seconds >= 0")
+            n.arg = float(n.arg)
+        elif kind == "wait_for":
+            n.arg = _regex(sid, n.arg)
+        elif kind in ("send", "adu", "snapshot", "log"):
+            if not isinstance(n.arg, str) or not n.arg: raise MacroError(f"step {sid}: {kind} needs a string")
+            if kind == "send" and spec.get("expect") is not None: n.expect = _regex(sid, spec["expect"])
+        elif kind == "repeat":
+            if n.arg != "forever" and (not isinstance(n.arg, int) or n.arg < 0):
+                raise MacroError(f"step {sid}: repeat must be a count or 'forever'")
+            n.body = compile_steps(spec.get("steps"), macros, f"{sid}.", stack)
+            if not n.body: raise MacroError(f"step {sid}: repeat needs at least one step")
+        elif kind == "if":
+            cond = n.arg
+            if not isinstance(cond, dict) or not cond or set(cond) - {"ok", "match", "every"}:
+                raise MacroError(f"step {sid}: if needs ok, match and/or every")
+            n.arg = dict(cond)
+            if "match" in cond: n.arg["match"] = _regex(sid, cond["match"])
+            n.body = compile_steps(spec.get("then") or [], macros, f"{sid}.", stack)
+            n.orelse = compile_steps(spec.get("else") or [], macros, f"{sid}e.", stack)
+        elif kind == "call":
+            if n.arg not in macros: raise MacroError(f"step {sid}: unknown macro {n.arg!r}")
+            if n.arg in stack: raise MacroError(f"step {sid}: {n.arg} calls itself")
+            n.body = compile_steps((macros[n.arg] or {}).get("steps"), macros, f"{sid}.", stack + (n.arg,))
+        out.append(n)
+    return out
+
+def check_macros(cfg):
+    """Config-validation hook: a list of problems in macros.yaml (empty when fine)."""
+    macros = (cfg or {}).get("macros") or {}
+    if not isinstance(macros, dict): return ["macros.yaml: macros must be a mapping of name → macro"]
+    errors = []
+    for name, m in macros.items():
+        try:
+            compile_steps((m or {}).get("steps"), macros, stack=(name,))
+            if (m or {}).get("on_error", "stop") not in ("stop", "continue"):
+                raise MacroError("on_error must be stop or continue")
+        except MacroError as e:
+            errors.append(f"macros.yaml: {name}: {e}")
+    return errors
+
+class MacroRunner:
+    """Runs one macro from macros.yaml on its own thread.
+
+    The plan clock only moves on `wait:` steps, so "M_ON, wait 5.4, M_OFF" puts
+    M_OFF 5.4 s after M_ON was due however long the write took, and cycle N
+    starts exactly where the plan says. Waits sleep coarsely, then yield-spin
+    the last `spin_ms` for sub-millisecond release. A step that needs an answer
+    (a send with a reply matcher or `expect:`, `wait_for:`) re-bases the plan on
+    when the answer came; a step more than `max_late_ms` behind re-bases too
+    and is counted as a resync. Pause stops the plan clock, cancel ends at the
+    next step boundary or within 50 ms of a wait.
+
+    Every action step is written to reports/macro_<name>_<time>.csv with its
+    planned and achieved start; the summary JSON next to it has lateness
+    percentiles over the steps that follow a wait."""
+
+    def __init__(self, cfg, name, bus=None, serial=None, adu=None, cameras=None):
+        cfg = cfg or {}
+        macros = cfg.get("macros") or {}
+        if name not in macros: raise MacroError(f"unknown macro {name!r}")
+        self.name, self.bus = name, bus
+        self.serial, self.adu = serial, adu
+        self.cameras = cameras or (lambda cam: None)
+        self.settings = {**DEFAULTS, **(cfg.get("settings") or {})}
+        spec = macros[name] or {}
+        self.steps = compile_steps(spec.get("steps"), macros, stack=(name,))
+        self.on_error = spec.get("on_error", "stop")
+        self.state = "idle"      # idle → running ⇄ paused → finished | failed | cancelled
+        self.cycle = 0           # iterations of the top-level repeat
+        self.error = None
+        self.report = None
+        self._cancel = threading.Event()
+        self._resume = threading.Event(); self._resume.set()
+        self._thread = None
+        self._spin = self.settings["spin_ms"] / 1000.0
+        self._max_late = self.settings["max_late_ms"] / 1000.0
+        self._progress_s = self.settings["progress_ms"] / 1000.0
+        # serial lines seen during the run, for expect:/wait_for:
+        self._rx = collections.deque(maxlen=1000)
+        self._rx_seq = self._mark = 0
+        self._rx_cv = threading.Condition()
+        self._last = (True, [])  # (ok, lines) of the previous action, for if:
+        self._answered = False   # the running step waited on the device: re-base the plan after it
+        self._snaps = None
+
+    # ---- control (any thread) ----
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f"macro-{self.name}", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def cancel(self):
+        self._cancel.set()
+        self._resume.set()
+
+    @property
+    def paused(self):
+        return not self._resume.is_set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None: self._thread.join(timeout)
+        return self.report
+
+    # ---- run ----
+    def run(self):
+        self.t0 = time.monotonic()
+        self._paused_s = 0.0
+        self.plan = 0.0          # run-time seconds (pauses excluded) the next step is due at
+        self._timed = True       # next action follows a wait (its lateness is the scheduler's)
+        self.late = collections.deque(maxlen=200000)
+        self.stats = {"steps": 0, "failed": 0, "resyncs": 0, "late_max_ms": 0.0, "late_over_1ms": 0}
+        self._t_progress = 0.0
+        self._open_records()
+        if self.serial is not None: self.serial.add_rx_tap(self._on_rx)
+        self._set_state("running")
+        try:
+            self._exec(self.steps, 0, 0)
+            state = "finished"
+        except _Cancelled:
+            state = "cancelled"
+        except StepFailed as e:
+            state, self.error = "failed", str(e)
+        except Exception as e:
+            logging.exception("Macro %s crashed", self.name)
+            state, self.error = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            if self.serial is not None: self.serial.remove_rx_tap(self._on_rx)
+            if self._snaps is not None: self._snaps.shutdown(wait=True)
+            if self._csv is not None: self._csv_file.close()
+        self.state = state
+        self.report = self._write_report()
+        self._progress(force=True, report=self.report.get("path"), error=self.error)
+        return self.report
+
+    def _now(self):
+        return time.monotonic() - self.t0 - self._paused_s
+
+    def _exec(self, nodes, i, depth):
+        for n in nodes:
+            self._checkpoint()
+            k = n.kind
+            if k == "wait":
+                self.plan += n.arg
+                self._timed = True
+                self._sleep_until(self.plan)
+            elif k == "repeat":
+                j = 0
+                while n.arg == "forever" or j < n.arg:
+                    self._checkpoint()     # a body of empty ifs never reaches one
+                    j += 1
+                    if depth == 0: self.cycle = j
+                    self._exec(n.body, j, depth + 1)
+            elif k == "if":
+                self._exec(n.body if self._test(n.arg, i) else n.orelse, i, depth)
+            elif k == "call":
+                self._exec(n.body, i, depth)
+            else:
+                self._action(n, i)
+
+    def _test(self, cond, i):
+        ok, lines = self._last
+        if "ok" in cond and ok != bool(cond["ok"]): return False
+        if "match" in cond and not any(cond["match"].search(ln) for ln in lines): return False
+        if "every" in cond and (not i or i % int(cond["every"])): return False
+        return True
+
+    def _action(self, n, i):
+        due = self.plan
+        self._sleep_until(due)
+        start = self._now()
+        late = start - due
+        timed, self._timed = self._timed, False
+        if late > self._max_late:
+            self.plan = start      # something stalled: don't burst through the backlog
+            self.stats["resyncs"] += 1
+        self._answered = False
+        try:
+            lines = self._do(n, i)
+            ok, detail = True, None
+        except StepFailed as e:
+            lines, ok, detail = [str(e)], False, str(e)
+        end = self._now()
+        self._last = (ok, lines)
+        if self._answered: self.plan = max(self.plan, end)
+        self._record(n, i, due, start, end, ok, timed, detail)
+        if not ok and not n.optional:
+            self.stats["failed"] += 1
+            if self.on_error == "stop": raise StepFailed(f"step {n.label}: {detail}")
+        self._progress()
+
+    def _do(self, n, i):
+        k, timeout = n.kind, n.timeout or self.settings["timeout_s"]
+        if k == "send":
+            if self.serial is None: raise StepFailed("no serial port")
+            if n.expect is None and self.serial.router.has_spec(n.arg):
+                self._answered = True
+                try:
+                    r = self.serial.request(n.arg, n.timeout).result(timeout + 1.0)
+                except Exception as e:
+                    raise StepFailed(f"{n.arg}: {e or type(e).__name__}") from None
+                return list(r.lines)
+            mark = self._rx_seq
+            if not self.serial.write_line(n.arg): raise StepFailed(f"send {n.arg} failed (not connected)")
+            self._mark = mark
+            if n.expect is None: return []
+            self._answered = True
+            return self._wait_line(n.expect, mark, timeout)
+        if k == "wait_for":
+            self._answered = True
+            return self._wait_line(n.arg, self._mark, timeout)
+        if k == "adu":
+            if self.adu is None or not self.adu.action(n.arg): raise StepFailed(f"ADU {n.arg} failed")
+            return []
+        if k == "snapshot":
+            return [self._snapshot(n.arg)]
+        if k == "log":
+            text = n.arg.replace("{i}", str(i)).replace("{cycle}", str(self.cycle))
+            if self.bus is not None: self.bus.publish("log:line", f"[MACRO] {text}")
+            return []
+        raise StepFailed(f"unknown step {k}")
+
+    def _snapshot(self, cam):
+        frame = getattr(self.cameras(cam), "last_frame_bgr", None)
+        if frame is None: raise StepFailed(f"{cam}: no frame")
+        folder = self.settings["snapshot_path"]
+        path = os.path.join(folder, f"{cam}_{self.name}_{self.cycle:06d}_{time.strftime('%Y%m%d-%H%M%S')}.png")
+        if self._snaps is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._snaps = ThreadPoolExecutor(1, thread_name_prefix="macro-snap")
+        def save():
+            import cv2
+            os.makedirs(folder, exist_ok=True)
+            if not cv2.imwrite(path, frame): logging.warning("Macro %s: could not write %s", self.name, path)
+        self._snaps.submit(save)     # encoding off the timed thread
+        return path
+
+    # ---- timing ----
+    def _checkpoint(self):
+        if self._cancel.is_set(): raise _Cancelled()
+        if not self._resume.is_set():
+            t = time.monotonic()
+            self._set_state("paused")
+            self._resume.wait()
+            self._paused_s += time.monotonic() - t
+            if self._cancel.is_set(): raise _Cancelled()
+            self._set_state("running")
+
+    def _sleep_until(self, due):
+        while True:
+            self._checkpoint()
+            left = due - self._now()
+            if left <= 0: return
+            if left > self._spin:
+                time.sleep(min(left - self._spin, 0.05))
+                continue
+            end = time.monotonic() + left
+            while time.monotonic() < end:
+                time.sleep(0)      # yield the GIL while spinning
+            return
+
+    # ---- serial lines ----
+    def _on_rx(self, lines, t):
+        # straight from the serial reader: only device lines, not [MACRO]/[SESSION]/... log text
+        with self._rx_cv:
+            for p in lines:
+                self._rx_seq += 1
+                self._rx.append((self._rx_seq, p))
+            self._rx_cv.notify_all()
+
+    def _wait_line(self, rx, mark, timeout):
+        deadline = time.monotonic() + timeout
+        seen = mark
+        with self._rx_cv:
+            while True:
+                for seq, line in self._rx:
+                    if seq <= seen: continue
+                    seen = seq
+                    if isinstance(line, str) and rx.search(line): return [line]
+                left = deadline - time.monotonic()
+                if left <= 0: raise StepFailed(f"no line matching {rx.pattern!r} within {timeout:g} s")
+                if self._cancel.is_set(): raise _Cancelled()
+                self._rx_cv.wait(min(left, 0.05))
+
+    # ---- records ----
+    def _open_records(self):
+        self._csv = self._csv_file = None
+        self.path = None
+        if not self.settings["report"]: return
+        folder = self.settings["path"]
+        try:
+            os.makedirs(folder, exist_ok=True)
+            self.path = os.path.join(folder, f"macro_{self.name}_{time.strftime('%Y%m%d-%H%M%S')}")
+            self._csv_file = open(self.path + ".csv", "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(("cycle", "i", "step", "planned_ms", "start_ms", "late_ms", "dur_ms",
+                                "timed", "ok", "detail"))
+        except OSError:
+            logging.exception("Macro %s: could not open timing record", self.name)
+            self.path = self._csv = self._csv_file = None
+
+    def _record(self, n, i, due, start, end, ok, timed, detail):
+        late_ms = (start - due) * 1000
+        st = self.stats
+        st["steps"] += 1
+        if timed:
+            self.late.append(late_ms)
+            if late_ms > st["late_max_ms"]: st["late_max_ms"] = late_ms
+            if late_ms > 1.0: st["late_over_1ms"] += 1
+            if METRICS.enabled: METRICS.observe("macro:late", late_ms)
+        if self._csv is not None:
+            self._csv.writerow((self.cycle, i, n.label, round(due * 1000, 3), round(start * 1000, 3),
+                                round(late_ms, 3), round((end - start) * 1000, 3), int(timed), int(ok), detail or ""))
+
+    def timing(self):
+        xs = sorted(self.late)
+        q = lambda p: round(xs[min(len(xs) - 1, int(p * len(xs)))], 3) if xs else 0.0
+        return {"timed_steps": len(xs), "late_p50_ms": q(0.5), "late_p99_ms": q(0.99),
+                "late_max_ms": round(self.stats["late_max_ms"], 3), "late_over_1ms": self.stats["late_over_1ms"],
+                "resyncs": self.stats["resyncs"]}
+
+    def _write_report(self):
+        wall = time.monotonic() - self.t0
+        rep = {"macro": self.name, "state": self.state, "ok": self.state == "finished", "error": self.error,
+               "time": time.strftime("%Y-%m-%d %H:%M:%S"), "cycles": self.cycle, "steps": self.stats["steps"],
+               "failed": self.stats["failed"], "wall_s": round(wall, 3), "paused_s": round(self._paused_s, 3),
+               "planned_s": round(self.plan, 3), **self.timing()}
+        if self.path is not None:
+            rep["records"] = self.path + ".csv"
+            try:
+                with open(self.path + ".json", "w", encoding="utf-8") as f:
+                    json.dump(rep, f, indent=2)
+                rep["path"] = self.path + ".json"
+            except OSError:
+                logging.exception("Macro %s: could not write report", self.name)
+        logging.info("Macro %s %s: %d cycles, %d steps, late p99 %.3f ms", self.name, self.state,
+                     self.cycle, rep["steps"], rep["late_p99_ms"])
+        return rep
+
+    # ---- progress ----
+    def _set_state(self, state):
+        self.state = state
+        self._progress(force=True)
+
+    def _progress(self, force=False, **extra):
+        if self.bus is None: return
+        now = time.monotonic()
+        if not force and now - self._t_progress < self._progress_s: return
+        self._t_progress = now
+        self.bus.publish("macro:progress", {"macro": self.name, "state": self.state, "cycle": self.cycle,
+                                            "steps": self.stats["steps"], "failed": self.stats["failed"],
+                                            "late_max_ms": round(self.stats["late_max_ms"], 3), **extra})
@@ -0,0 +1,151 @@
+# Runtime metrics: counters, latency histograms and pulled stats sources
+import os, json, time, bisect, threading, logging
+
+# histogram bucket upper bounds in ms: 10 µs … ~10 s, doubling
+BOUNDS = [0.01 * 2 ** k for k in range(21)]
+
+class Histogram:
+    """Log-bucketed latency histogram. observe() is one bisect and two adds;
+    updates from several threads are not locked (a lost increment is fine here)."""
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.total = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BOUNDS, ms)] += 1
+        self.total += ms
+
+def _quantile(counts, n, q):
+    want, acc = q * n, 0
+    for i, c in enumerate(counts):
+        acc += c
+        if acc >= want:
+            return BOUNDS[i] if i < len(BOUNDS) else float("inf")
+    return 0.0
+
+class Metrics:
+    """Process-wide registry (METRICS below).
+
+    Hot paths guard every call with `if METRICS.enabled:` so a disabled
+    registry costs one attribute check. Things that already keep their own
+    stats (bus, serial, camera tiles) are registered as sources and only
+    called when a snapshot is taken. Each reader gets its own Cursor, so the
+    status bar and the file dump see their own intervals."""
+
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.hists = {}
+        self.sources = {}      # name -> callable returning a JSON-able dict
+        self.t0 = time.monotonic()
+        self.path = None       # metrics_*.jsonl while dumping
+        self._dump = None
+        self._stop = threading.Event()
+
+    def configure(self, cfg, folder=None):
+        """Apply app.yaml `metrics:`; starts the periodic dump when enabled."""
+        cfg = cfg or {}
+        self.enabled = bool(cfg.get("enabled", False))
+        if self.enabled and cfg.get("dump_s", 10):
+            self.start_dump(folder or cfg.get("folder", "logs"), float(cfg.get("dump_s", 10)))
+        return self
+
+    # ---- recording (call only when enabled) ----
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, ms):
+        h = self.hists.get(name)
+        if h is None: h = self.hists.setdefault(name, Histogram())
+        h.observe(ms)
+
+    def source(self, name, fn):
+        self.sources[name] = fn
+
+    def remove_source(self, name):
+        self.sources.pop(name, None)
+
+    def cursor(self):
+        return Cursor(self)
+
+    # ---- periodic dump ----
+    def start_dump(self, folder, interval_s):
+        if self._dump is not None: return
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f"metrics_{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+        self._stop.clear()
+        self._dump = threading.Thread(target=self._dump_loop, args=(interval_s,), name="metrics-dump", daemon=True)
+        self._dump.start()
+        logging.info("Metrics → %s every %.0f s", self.path, interval_s)
+
+    def stop(self):
+        self._stop.set()
+        if self._dump is not None:
+            self._dump.join(timeout=2)
+            self._dump = None
+
+    def _dump_loop(self, interval_s):
+        cur = self.cursor()
+        while not self._stop.wait(interval_s):
+            self._write(cur.snapshot())
+        self._write(cur.snapshot())     # final partial interval
+
+    def _write(self, snap):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(snap, default=str) + "\n")
+        except OSError:
+            logging.warning("Could not write metrics to %s", self.path)
+
+class Cursor:
+    """Interval view of a Metrics registry: each snapshot() covers the time
+    since this cursor's previous one (rates, percentiles of that interval)."""
+
+    def __init__(self, metrics):
+        self.m = metrics
+        self.t = time.monotonic()
+        self.prev_counts = {}
+        self.prev_hists = {}
+
+    def snapshot(self):
+        m, now = self.m, time.monotonic()
+        dt = max(1e-6, now - self.t)
+        self.t = now
+        out = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "uptime_s": round(now - m.t0, 1),
+               "interval_s": round(dt, 2), "counters": {}, "hist": {}, "sources": {}}
+        for name, total in list(m.counters.items()):
+            d = total - self.prev_counts.get(name, 0)
+            self.prev_counts[name] = total
+            out["counters"][name] = {"total": total, "per_s": round(d / dt, 1)}
+        for name, h in list(m.hists.items()):
+            counts, total = list(h.counts), h.total
+            pc, pt = self.prev_hists.get(name, (None, 0.0))
+            self.prev_hists[name] = (counts, total)
+            d = counts if pc is None else [a - b for a, b in zip(counts, pc)]
+            n = sum(d)
+            if not n: continue
+            out["hist"][name] = {"n": n, "mean_ms": round((total - pt) / n, 3),
+                                 "p50_ms": _quantile(d, n, 0.5), "p99_ms": _quantile(d, n, 0.99)}
+        for name, fn in list(m.sources.items()):
+            try:
+                out["sources"][name] = fn()
+            except Exception as e:
+                out["sources"][name] = {"error": str(e)}
+        return out
+
+def describe(snap):
+    """Multi-line text of a snapshot for the overlay."""
+    out = [f"uptime {snap['uptime_s']:.0f} s · interval {snap['interval_s']:.1f} s"]
+    for name, h in sorted(snap["hist"].items()):
+        out.append(f"{name:28s} n={h['n']:<6} mean {h['mean_ms']:8.3f}  p50 ≤{h['p50_ms']:.2f}  p99 ≤{h['p99_ms']:.2f} ms")
+    for name, c in sorted(snap["counters"].items()):
+        out.append(f"{name:28s} {c['per_s']:>10}/s  total {c['total']}")
+    for name, src in sorted(snap["sources"].items()):
+        out.append(f"[{name}]")
+        for k, v in (src.items() if isinstance(src, dict) else [("", src)]):
+            out.append(f"  {k}: {json.dumps(v, default=str, separators=(',', ':'))}")
+    return "\n".join(out)
+
+METRICS = Metrics()
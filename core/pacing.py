@@ -0,0 +1,104 @@
+# Capture pacing: monotonic frame deadlines and a load-driven quality ladder
+import collections, time
+
+class Pacer:
+    """Frame slots on a monotonic clock at `fps`.
+
+    due(t) says whether a frame grabbed at t fills the next slot. A grab up to
+    `slack` of a period early still counts, so the long-run rate is exactly fps
+    whatever the sensor runs at. When the source is slower than fps the
+    schedule resyncs instead of bursting to catch up."""
+
+    def __init__(self, fps, slack=0.25):
+        self.slack = slack
+        self.set_fps(fps)
+        self.next = None
+        self.last = None
+        self.slots = 0
+        self.late = 0          # slots filled more than a period after their deadline
+        self.intervals = collections.deque(maxlen=256)
+
+    def set_fps(self, fps):
+        self.fps = max(0.1, float(fps))
+        self.period = 1.0 / self.fps
+
+    def due(self, t):
+        if self.next is None: self.next = t
+        if t < self.next - self.period * self.slack: return False
+        if t - self.next > self.period:
+            self.late += 1
+            self.next = t
+        self.next += self.period
+        if self.last is not None: self.intervals.append(t - self.last)
+        self.last = t
+        self.slots += 1
+        return True
+
+    def wait_s(self, t):
+        """Seconds until the next slot opens (for sources whose grab() doesn't block)."""
+        return 0.0 if self.next is None else self.next - self.period * self.slack - t
+
+    def stats(self):
+        iv = list(self.intervals)
+        if len(iv) < 2: return {"paced_fps": 0.0, "jitter_ms": 0.0, "p99_dev_ms": 0.0, "late": self.late}
+        mean = sum(iv) / len(iv)
+        sd = (sum((x - mean) ** 2 for x in iv) / len(iv)) ** 0.5
+        dev = sorted(abs(x - self.period) for x in iv)
+        return {"paced_fps": round(1.0 / mean, 1), "jitter_ms": round(sd * 1000, 2),
+                "p99_dev_ms": round(dev[int(0.99 * (len(dev) - 1))] * 1000, 2), "late": self.late}
+
+class Adapter:
+    """Steps capture down a ladder of (fps, scale) while the load stays above
+    `high`, and back up one rung after `recover_s` below `low`.
+
+    Load is the larger of the capture thread's CPU share (thread_time over wall
+    time) and whatever `lag` the caller reports (a consumer backlog 0..1).
+    update() must be called from the capture thread."""
+
+    def __init__(self, fps, cfg=None):
+        cfg = cfg or {}
+        self.enabled = bool(cfg.get("adapt", True))
+        self.high = float(cfg.get("high", 0.85))
+        self.low = float(cfg.get("low", 0.5))
+        self.recover_s = float(cfg.get("recover_s", 3.0))
+        floor = min(float(fps), float(cfg.get("min_fps", 5)))
+        self.ladder = [(float(fps), 1.0)]
+        for f in (0.75, 0.5):
+            step = (max(floor, fps * f), 1.0)
+            if step != self.ladder[-1]: self.ladder.append(step)
+        if cfg.get("downscale", False):
+            self.ladder.append((self.ladder[-1][0], 0.5))
+        self.level = 0
+        self.changes = 0
+        self.load = 0.0
+        self._calm = None
+        self._t = self._cpu = None
+
+    @property
+    def step(self):
+        return self.ladder[self.level]
+
+    def update(self, now, lag=0.0):
+        """Re-evaluate about once a second; returns the new (fps, scale) on a change."""
+        if self._t is None:
+            self._t, self._cpu = now, time.thread_time()
+            return None
+        if now - self._t < 1.0: return None
+        cpu = time.thread_time()
+        self.load = max((cpu - self._cpu) / (now - self._t), lag)
+        self._t, self._cpu = now, cpu
+        if not self.enabled: return None
+        if self.load > self.high:
+            self._calm = None
+            if self.level < len(self.ladder) - 1:
+                self.level += 1; self.changes += 1
+                return self.step
+        elif self.load < self.low and self.level > 0:
+            if self._calm is None: self._calm = now
+            elif now - self._calm >= self.recover_s:
+                self.level -= 1; self.changes += 1
+                self._calm = now
+                return self.step
+        else:
+            self._calm = None
+        return None
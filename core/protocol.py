@@ -1 +1,84 @@
 # Message protocol helpers
+import time
+
+class LineFramer:
+    """Splits a serial byte stream into text lines.
+
+    Bytes land in one preallocated bytearray; complete lines are cut from it
+    in a single split per feed, so a long line or a burst costs O(n) instead
+    of re-splitting the whole backlog on every newline. Lines end with the
+    last byte of the configured EOL; a preceding CR is dropped, so CRLF and
+    LF firmware both work."""
+
+    def __init__(self, eol="\n", bufsize=64 * 1024, max_line=16 * 1024, encoding="utf-8"):
+        eol = eol.encode() if isinstance(eol, str) else eol
+        self.term = eol[-1:] or b"\n"
+        self.sep = self.term.decode()
+        self.buf = bytearray(bufsize)
+        self.start = self.end = 0
+        self.max_line = max_line
+        self.encoding = encoding
+
+    def feed(self, data):
+        """Add bytes, return the list of complete non-empty lines."""
+        n = len(data)
+        if not n: return []
+        if self.end + n > len(self.buf):
+            self._make_room(n)
+        self.buf[self.end:self.end + n] = data
+        scan_from = self.end
+        self.end += n
+        j = self.buf.rfind(self.term, scan_from, self.end)
+        if j < 0:
+            if self.end - self.start > self.max_line:
+                # runaway line without terminator: emit what we have
+                j = self.end - 1
+            else:
+                return []
+        text = str(memoryview(self.buf)[self.start:j + 1], self.encoding, "ignore")
+        self.start = j + 1
+        if self.start == self.end:
+            self.start = self.end = 0
+        return [s for s in (l.strip() for l in text.split(self.sep)) if s]
+
+    def _make_room(self, n):
+        pending = self.end - self.start
+        if pending + n > len(self.buf):
+            size = len(self.buf)
+            while size < pending + n: size *= 2
+            nb = bytearray(size)
+            nb[:pending] = self.buf[self.start:self.end]
+            self.buf = nb
+        else:
+            self.buf[:pending] = self.buf[self.start:self.end]
+        self.start, self.end = 0, pending
+
+    def reset(self):
+        self.start = self.end = 0
+
+def read_available(ser):
+    """Wait (up to ser.timeout) for the first byte, then take everything queued.
+    pyserial's blocking read waits on the OS (select / overlapped I/O), so an
+    idle port costs no polling and a busy one is drained in one call."""
+    first = ser.read(1)
+    if not first: return first
+    more = ser.in_waiting
+    return first + ser.read(more) if more else first
+
+class Throughput:
+    """Bytes/lines counters with rates since start()."""
+    def __init__(self):
+        self.start()
+
+    def start(self):
+        self.t0 = time.monotonic()
+        self.bytes = self.lines = 0
+
+    def add(self, nbytes, nlines):
+        self.bytes += nbytes
+        self.lines += nlines
+
+    def snapshot(self):
+        dt = max(1e-9, time.monotonic() - self.t0)
+        return {"bytes": self.bytes, "lines": self.lines, "seconds": round(dt, 3),
+                "bytes_per_s": round(self.bytes / dt, 1), "lines_per_s": round(self.lines / dt, 1)}
@@ -0,0 +1,210 @@
+# Background video/snapshot writer (one encoder thread per camera)
+import os, threading, time, collections, logging
+from core.camera_worker import RateMeter
+
+POLICIES = ("drop_oldest", "drop_newest", "block")
+
+class Recorder:
+    """Frames and snapshot jobs go through a bounded queue to a dedicated thread,
+    so encoder stalls never reach the capture thread or the UI.
+
+    Frames carry their capture timestamp; the writer emits frames at the measured
+    fps and duplicates/skips frames so playback time matches wall-clock time.
+    For process-mode cameras follow() a shared-ring consumer instead of push():
+    the encoder then reads each frame in place, with no per-frame copy."""
+
+    def __init__(self, name, cfg=None, bus=None):
+        cfg = cfg or {}
+        self.name, self.bus = name, bus
+        self.folder = cfg.get("folder", "captures")
+        self.codec = cfg.get("codec", "mp4v")
+        self.maxsize = int(cfg.get("queue_size", 64))
+        self.policy = cfg.get("on_full", "drop_oldest")
+        if self.policy not in POLICIES:
+            raise ValueError(f"recording.on_full must be one of {POLICIES}")
+        self.block_timeout = cfg.get("block_timeout_ms", 200) / 1000.0
+        self.max_dup_s = float(cfg.get("max_gap_fill_s", 5.0))
+
+        self._items = collections.deque()   # ("frame"|"open"|"close"|"snap", ...)
+        self._frames = 0                    # frame items currently queued
+        self._cv = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._src = None                    # ShmConsumer pulled while recording (follow())
+        self._src_lock = threading.Lock()   # held by the encoder while it reads a ring slot
+        self.recording = False
+        self.path = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.encoded = 0       # frames handed to the encoder (incl. duplicates)
+        self.duplicated = 0    # frames repeated to fill capture gaps
+        self.skipped = 0       # frames dropped because capture ran ahead of fps
+        self.dropped = 0       # frames lost to a full queue
+        self.torn = 0          # ring frames overwritten while being encoded
+        self.encode_rate = RateMeter()
+
+    # ---- producer side (capture / UI threads) ----
+    def start(self, size, fps):
+        os.makedirs(self.folder, exist_ok=True)
+        ts = time.strftime("%Y%m%d-%H%M%S")
+        ext = "avi" if self.codec.upper() in ("MJPG", "XVID", "DIVX") else "mp4"
+        path = os.path.join(self.folder, f"{self.name}_{ts}.{ext}")
+        self._reset_stats()
+        self.path = path
+        self.recording = True
+        self._put(("open", path, tuple(size), float(fps)))
+        return path
+
+    def stop(self):
+        if self.recording:
+            self.recording = False
+            self._put(("close",))
+
+    def push(self, frame, ts):
+        if not self.recording: return
+        with self._cv:
+            if self._frames >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return
+                if self.policy == "drop_oldest":
+                    for i, it in enumerate(self._items):
+                        if it[0] == "frame":
+                            del self._items[i]; self._frames -= 1; self.dropped += 1
+                            break
+                else:  # block (bounded, so capture can never hang forever)
+                    if not self._cv.wait_for(lambda: self._frames < self.maxsize, self.block_timeout):
+                        self.dropped += 1
+                        return
+            self._items.append(("frame", frame, ts))
+            self._frames += 1
+            self._cv.notify_all()
+        self._ensure_thread()
+
+    def follow(self, consumer):
+        """Record from `consumer` (a ShmConsumer) instead of pushed frames; None
+        detaches it, waiting for any frame being read from the ring."""
+        with self._src_lock:
+            self._src = consumer
+        with self._cv:
+            self._cv.notify_all()
+        if consumer is not None: self._ensure_thread()
+
+    def snapshot(self, frame, path=None):
+        """Queue a PNG write; returns the path it will be written to."""
+        if path is None:
+            os.makedirs(self.folder, exist_ok=True)
+            path = os.path.join(self.folder, f"{self.name}_{time.strftime('%Y%m%d-%H%M%S')}.png")
+        self._put(("snap", path, frame))
+        return path
+
+    def close(self):
+        self.stop()
+        self._put(("quit",))
+
+    def stats(self):
+        return {
+            "recording": self.recording,
+            "queue_depth": self._frames,
+            "encode_fps": round(self.encode_rate.rate, 1),
+            "encoded": self.encoded,
+            "duplicated": self.duplicated,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "torn": self.torn,
+        }
+
+    def _put(self, item):
+        # control items bypass the frame bound so they are never lost
+        with self._cv:
+            self._items.append(item)
+            self._cv.notify_all()
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name=f"rec-{self.name}", daemon=True)
+            self._thread.start()
+
+    # ---- encoder thread ----
+    def _loop(self):
+        import cv2    # first encoder use; keeps OpenCV off the startup path
+        self._out = None
+        while True:
+            with self._cv:
+                while not self._items and not (self._out is not None and self._src is not None):
+                    self._cv.wait()
+                item = self._items.popleft() if self._items else None
+                if item is not None and item[0] == "frame": self._frames -= 1
+                self._cv.notify_all()
+            if item is None:
+                self._pull()
+                continue
+            kind = item[0]
+            try:
+                if kind == "frame" and self._out is not None:
+                    self._write(item[1], item[2])
+                elif kind == "open":
+                    _, path, size, fps = item
+                    self._out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.codec), fps, size)
+                    self._fps, self._t0, self._n = fps, None, 0
+                    with self._src_lock:
+                        # a followed ring starts at the frame after this point
+                        if self._src is not None: self._src.cursor = self._src.ring.write_seq
+                    self._log(f"Recording → {path} @ {fps:.1f} fps")
+                elif kind == "close":
+                    if self._out is not None:
+                        self._out.release(); self._out = None
+                        st = self.stats()
+                        self._log(f"Recording saved: {self.path} ({self._n} frames, "
+                                  f"{st['duplicated']} dup, {st['skipped']} skipped, {st['dropped']} dropped)")
+                elif kind == "snap":
+                    _, path, frame = item
+                    cv2.imwrite(path, frame)
+                    self._log(f"Snapshot saved: {path}")
+                elif kind == "quit":
+                    return
+            except Exception:
+                logging.exception("[%s] recorder %s failed", self.name, kind)
+
+    def _pull(self):
+        # one frame from the followed ring, encoded straight from its slot
+        with self._src_lock:
+            src = self._src
+            if src is None: return
+            try:
+                if not src.wait(0.05): return
+                got = src.next()
+                if got is None: return
+                seq, ts, view = got
+                self._write(view, ts)
+                if not src.still_valid(seq): self.torn += 1
+                got = view = None
+            except Exception:
+                # ring closed under us (capture process gone): stop following it
+                logging.exception("[%s] recorder lost its frame source", self.name)
+                self._src = None
+
+    def _write(self, frame, ts):
+        fps = self._fps
+        if self._t0 is None: self._t0 = ts
+        due = int((ts - self._t0) * fps + 0.5) + 1   # frames that should exist by now
+        if due <= self._n:
+            self.skipped += 1
+            return
+        reps = due - self._n
+        if reps > 1:
+            reps = min(reps, int(self.max_dup_s * fps) or 1)
+            self.duplicated += reps - 1
+        for _ in range(reps):
+            self._out.write(frame)
+        # a capped fill drops the rest of the gap from the timeline, so
+        # the frames after it don't each pay another max_dup_s of padding
+        self._n = due
+        self.encoded += reps
+        self.encode_rate.tick(reps)
+
+    def _log(self, msg):
+        if self.bus:
+            self.bus.publish("log:line", f"[{self.name}] {msg}")
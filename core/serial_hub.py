@@ -0,0 +1,273 @@
+# Several named serial devices served by one reader thread
+import os, time, socket, selectors, threading, logging, collections
+import serial, serial.tools.list_ports
+from core.protocol import LineFramer, Throughput
+from core.commands import CommandRouter
+from core.device_scanner import port_key
+
+class HubDevice:
+    """One named connection: its port, framer, reply router and counters."""
+
+    def __init__(self, name, port=None, match=None, baud=115200, eol="\n", responses=None):
+        self.name, self.port, self.match = name, port, match
+        self.baud, self.eol = baud, eol
+        self.ser = None
+        self.fd = None
+        self.framer = LineFramer(eol)
+        self.router = CommandRouter(responses)
+        self.rx = Throughput()
+        self.wlock = threading.Lock()
+        self.olock = threading.Lock()    # caller's connect() vs the hub's retry
+        self.topic = f"serial:{name}:line"
+        self.wanted = False        # connect() called and not disconnect()ed
+        self.retry_at = 0.0
+        self.backoff = 0.0
+        self.reconnects = 0
+
+    @property
+    def connected(self):
+        return self.ser is not None
+
+    def resolve(self):
+        """Port to open: `match` (VID:PID[:serial] prefix, any case) wins over the fixed name,
+        so a board that re-enumerates under a new COM/tty is found again."""
+        if self.match:
+            for p in serial.tools.list_ports.comports():
+                if port_key(p).upper().startswith(self.match.upper()): return p.device
+            return None
+        return self.port
+
+class SerialHub:
+    """Owns any number of named serial devices and reads all of them from a
+    single thread.
+
+    Where pyserial exposes a file descriptor (POSIX) the thread blocks in a
+    selector on every open port plus a wake-up socket; elsewhere (Windows COM
+    handles) it polls `in_waiting` across all ports every `poll_ms`. Lines go
+    to "serial:<name>:line" (and, with `mirror_log`, to "log:line" prefixed
+    with the device name); state changes to "serial:<name>:state". A port that
+    errors or vanishes is closed and reopened with exponential backoff."""
+
+    def __init__(self, bus, devices=None, baud=115200, eol="\n", responses=None,
+                 mirror_log=True, backoff_s=(0.5, 8.0), poll_ms=2):
+        self.bus = bus
+        self.defaults = {"baud": baud, "eol": eol, "responses": responses}
+        self.mirror_log = mirror_log
+        self.backoff_min, self.backoff_max = backoff_s
+        self.poll_s = poll_ms / 1000.0
+        self.devices = {}
+        self._lock = threading.Lock()
+        self._sel = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        self._stop = threading.Event()
+        self._thread = None
+        self._calls = collections.deque()   # (fn, result, done) to run on the hub thread
+        for name, spec in (devices or {}).items():
+            self.add(name, **(spec or {}))
+
+    # ---- devices ----
+    def add(self, name, port=None, match=None, baud=None, eol=None, responses=None):
+        d = HubDevice(name, port, match, baud or self.defaults["baud"], eol or self.defaults["eol"],
+                      responses if responses is not None else self.defaults["responses"])
+        with self._lock:
+            self.devices[name] = d
+        return d
+
+    def connect(self, name, port=None):
+        """Open now; on failure keep retrying in the background. Returns True if open."""
+        d = self.devices[name]
+        if port: d.port = port
+        d.wanted, d.backoff = True, 0.0
+        self._ensure_thread()
+        ok = self._open(d)
+        self._wake()
+        return ok
+
+    def connect_all(self):
+        return {n: self.connect(n) for n in list(self.devices)}
+
+    def disconnect(self, name):
+        d = self.devices[name]
+        d.wanted = False
+        self._close(d, "disconnected")
+        self._wake()
+
+    def close(self):
+        for name in list(self.devices): self.disconnect(name)
+        self._stop.set()
+        self._wake()
+        if self._thread: self._thread.join(timeout=2)
+
+    # ---- writing ----
+    def write_lines(self, name, lines):
+        d = self.devices[name]
+        ser = d.ser
+        if ser is None: return False
+        try:
+            with d.wlock:
+                ser.write("".join(t + d.eol for t in lines).encode())
+            self.bus.publish_many(f"serial:{name}:sent", lines)
+            return True
+        except Exception:
+            self._lost(d)
+            return False
+
+    def write_line(self, name, text):
+        return self.write_lines(name, [text])
+
+    def request(self, name, cmd, timeout=None):
+        """Future resolving to a Response from device `name` (see SerialManager.request)."""
+        return self.request_many(name, [cmd], timeout)[0]
+
+    def request_many(self, name, cmds, timeout=None):
+        router = self.devices[name].router
+        futs = [router.register(c, timeout) for c in cmds]
+        if not self.write_lines(name, cmds):
+            err = ConnectionError(f"{name}: write failed (not connected)")
+            for f in futs:
+                if not f.done(): f.set_exception(err)
+            router.fail_all(err)
+        return futs
+
+    def stats(self):
+        return {n: {**d.rx.snapshot(), "connected": d.connected, "port": d.port,
+                    "reconnects": d.reconnects} for n, d in self.devices.items()}
+
+    # ---- open / close ----
+    def _open(self, d):
+        with d.olock:
+            return d.connected or self._open_locked(d)
+
+    def _open_locked(self, d):
+        port = d.resolve()
+        if not port:
+            self._schedule_retry(d)
+            return False
+        try:
+            ser = serial.Serial(port, d.baud, timeout=0, write_timeout=1)
+        except Exception as e:
+            logging.debug("Hub %s: open %s failed: %s", d.name, port, e)
+            self._schedule_retry(d)
+            return False
+        try:
+            fd = ser.fileno()
+        except Exception:
+            fd = None       # no selectable handle: served by the poll path
+        d.framer.reset()
+        d.rx.start()
+        with self._lock:
+            d.ser, d.fd, d.port = ser, fd, port
+            d.backoff = 0.0
+        # queued, not awaited: we hold d.olock, which the hub thread's retry path takes too
+        if fd is not None: self._on_hub(self._sel.register, fd, selectors.EVENT_READ, d, wait=False)
+        self.bus.publish(f"serial:{d.name}:state", {"connected": True, "port": port})
+        logging.info("Hub %s connected on %s", d.name, port)
+        return True
+
+    def _close(self, d, why):
+        with self._lock:
+            ser, fd = d.ser, d.fd
+            d.ser = d.fd = None
+        if fd is not None: self._on_hub(self._unregister, fd)
+        if ser is None: return False
+        d.router.fail_all(ConnectionError(f"{d.name}: {why}"))
+        try: ser.close()
+        except Exception: pass
+        self.bus.publish(f"serial:{d.name}:state", {"connected": False, "port": d.port, "reason": why})
+        return True
+
+    def _lost(self, d):
+        if not self._close(d, "port lost"): return
+        logging.warning("Hub %s: port %s lost, reconnecting", d.name, d.port)
+        if d.wanted:
+            d.reconnects += 1
+            self._schedule_retry(d)
+            self._wake()
+
+    def _schedule_retry(self, d):
+        d.backoff = min(self.backoff_max, max(self.backoff_min, d.backoff * 2))
+        d.retry_at = time.monotonic() + d.backoff
+
+    # ---- reader thread ----
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="serial-hub", daemon=True)
+            self._thread.start()
+
+    def _unregister(self, fd):
+        try: self._sel.unregister(fd)
+        except (KeyError, ValueError): pass
+
+    def _on_hub(self, fn, *args, wait=True):
+        """Run fn on the hub thread, between selects (and wait for it). The selector
+        is only touched there, so a port is never closed under a running select()."""
+        t = self._thread
+        if t is None or t is threading.current_thread() or not t.is_alive():
+            return fn(*args)
+        res, done = [None], threading.Event()
+        self._calls.append((lambda: fn(*args), res, done))
+        self._wake()
+        if wait and not done.wait(2.0):
+            logging.warning("Hub: thread did not pick up %s", getattr(fn, "__name__", fn))
+        return res[0]
+
+    def _run_calls(self):
+        while self._calls:
+            fn, res, done = self._calls.popleft()
+            try: res[0] = fn()
+            except Exception: logging.exception("Hub call failed")
+            finally: done.set()
+
+    def _wake(self):
+        try: self._wake_w.send(b"\0")
+        except OSError: pass
+
+    def _deliver(self, d, chunk):
+        lines = d.framer.feed(chunk)
+        d.rx.add(len(chunk), len(lines))
+        if lines:
+            if d.router.pending: d.router.on_lines(lines)
+            self.bus.publish_many(d.topic, lines)
+            if self.mirror_log:
+                self.bus.publish_many("log:line", [f"[{d.name}] {ln}" for ln in lines])
+
+    def _loop(self):
+        try:
+            self._serve()
+        finally:
+            self._run_calls()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            self._run_calls()
+            now = time.monotonic()
+            polled = []
+            timeout = 0.5
+            for d in list(self.devices.values()):
+                if d.wanted and not d.connected:
+                    if now >= d.retry_at: self._open(d)
+                    if not d.connected: timeout = min(timeout, max(0.0, d.retry_at - now))
+                if d.connected and d.fd is None: polled.append(d)
+            if polled: timeout = min(timeout, self.poll_s)
+            for key, _ in self._sel.select(timeout):
+                d = key.data
+                if d is None:
+                    try: self._wake_r.recv(4096)
+                    except OSError: pass
+                    continue
+                if d.fd != key.fd: continue      # closed since select() returned
+                try:
+                    chunk = os.read(key.fd, 65536)
+                except OSError:
+                    chunk = b""
+                if chunk: self._deliver(d, chunk)
+                else: self._lost(d)   # EOF / EIO: device unplugged
+            for d in polled:
+                try:
+                    n = d.ser.in_waiting
+                    if n: self._deliver(d, d.ser.read(n))
+                except Exception:
+                    self._lost(d)
@@ -1,8 +1,10 @@
 # Handles serial comms
 import serial, threading, time
+from core.protocol import LineFramer, Throughput, read_available
+from core.commands import CommandRouter
 
 class SerialManager:
-    def __init__(self, bus, baud=115200, eol="\n"):
+    def __init__(self, bus, baud=115200, eol="\n", responses=None):
         self.bus = bus
         self.baud = baud
         self.eol = eol
@@ -10,6 +12,10 @@ class SerialManager:
         self.ser = None
         self.stop = threading.Event()
         self.reader = None
+        self.rx = Throughput()
+        self.router = CommandRouter(responses)
+        self._wlock = threading.Lock()
+        self._rx_taps = ()
 
     def open(self, port):
         if not port: return False
@@ -17,6 +23,7 @@ class SerialManager:
             self.ser = serial.Serial(port, self.baud, timeout=0.1)
             self.port = port
             self.stop.clear()
+            self.rx.start()
             self.reader = threading.Thread(target=self._read_loop, daemon=True)
             self.reader.start()
             self.bus.publish("conn:state", {"connected": True, "port": port})
@@ -27,6 +34,7 @@ class SerialManager:
 
     def close(self):
         self.stop.set()
+        self.router.fail_all(ConnectionError("serial port closed"))
         if self.ser:
             try: self.ser.close()
             except: pass
@@ -34,26 +42,59 @@ class SerialManager:
         self.bus.publish("conn:state", {"connected": False})
 
     def write_line(self, text: str):
+        return self.write_lines([text])
+
+    def write_lines(self, lines):
+        """Write several commands with a single write call."""
         if not self.ser or not self.ser.is_open: return False
         try:
-            self.ser.write((text + self.eol).encode())
+            with self._wlock:
+                self.ser.write("".join(t + self.eol for t in lines).encode())
+            self.bus.publish_many("cmd:sent", lines)
             return True
         except Exception:
             return False
 
+    def request(self, cmd, timeout=None):
+        """Send `cmd`; the returned Future resolves to a Response(cmd, lines, rtt_ms)
+        matched via commands.yaml `responses:`, or fails with TimeoutError.
+        Use asyncio.wrap_future() to await it from a coroutine."""
+        return self.request_many([cmd], timeout)[0]
+
+    def request_many(self, cmds, timeout=None):
+        """Pipeline several commands in one write; one Future per command."""
+        futs = [self.router.register(c, timeout) for c in cmds]
+        if not self.write_lines(cmds):
+            err = ConnectionError("write failed (not connected)")
+            for f in futs:
+                if not f.done(): f.set_exception(err)
+            self.router.fail_all(err)
+        return futs
+
+    def stats(self):
+        return self.rx.snapshot()
+
+    def add_rx_tap(self, fn):
+        """`fn(lines, t)` sees every batch of received lines on the reader thread,
+        before the log:line publish (macro expect:/wait_for:)."""
+        self._rx_taps = self._rx_taps + (fn,)
+
+    def remove_rx_tap(self, fn):
+        self._rx_taps = tuple(t for t in self._rx_taps if t != fn)
+
     def _read_loop(self):
-        buf = b""
+        framer = LineFramer(self.eol)
+        ser = self.ser
         while not self.stop.is_set():
             try:
-                chunk = self.ser.read(256)
+                chunk = read_available(ser)
                 if chunk:
-                    buf += chunk
-                    while b"\n" in buf:
-                        line, buf = buf.split(b"\n", 1)
-                        s = line.decode(errors="ignore").strip()
-                        if s:
-                            self.bus.publish("log:line", s)
-                else:
-                    time.sleep(0.02)
+                    lines = framer.feed(chunk)
+                    self.rx.add(len(chunk), len(lines))
+                    if lines:
+                        if self.router.pending: self.router.on_lines(lines)
+                        for tap in self._rx_taps:
+                            tap(lines, time.monotonic())
+                        self.bus.publish_many("log:line", lines)
             except Exception:
                 break
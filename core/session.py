@@ -0,0 +1,201 @@
+# Session recording and time-accurate replay of bus events
+import os, json, mmap, struct, time, threading, queue, bisect, logging
+
+MAGIC = b"UDCS\x01\x00\x00\x00"
+REC = struct.Struct("<dHHI")     # t (s since start), topic id, kind, payload length
+IDX = struct.Struct("<dQQ")      # t, byte offset, record number
+K_STR, K_JSON = 0, 1
+
+class SessionRecorder:
+    """Appends every bus event to <name>.udcs as compact binary records.
+
+    A sparse index (<name>.idx, fixed-size entries every `index_every`
+    records) makes seeking cheap; topic names live in <name>.topics.json.
+    The bus tap only enqueues, a writer thread does all encoding and I/O."""
+
+    def __init__(self, bus, folder="sessions", name=None, index_every=256, flush_s=0.5):
+        os.makedirs(folder, exist_ok=True)
+        name = name or f"session_{time.strftime('%Y%m%d-%H%M%S')}"
+        self.path = os.path.join(folder, name)
+        self.bus = bus
+        self.index_every = int(index_every)
+        self.flush_s = flush_s
+        self.t0 = time.monotonic()
+        self.records = 0
+        self.error = None        # set if the writer thread died; recording has stopped
+        self._topics = {}
+        self._q = queue.SimpleQueue()
+        self._f = open(self.path + ".udcs", "wb", buffering=1 << 20)
+        self._idx = open(self.path + ".idx", "wb")
+        self._f.write(MAGIC)
+        self._off = len(MAGIC)
+        self._thread = threading.Thread(target=self._loop, name="session-rec", daemon=True)
+        self._thread.start()
+        bus.add_tap(self._tap)
+
+    def _tap(self, topic, payloads, ts):
+        self._q.put((ts - self.t0, topic, payloads))
+
+    def mark(self, topic, payload):
+        """Record an event that does not go through the bus."""
+        self._q.put((time.monotonic() - self.t0, topic, (payload,)))
+
+    def frame_ref(self, cam, path, frame_no, ts=None):
+        """Reference a frame stored elsewhere (clip/snapshot) instead of its pixels."""
+        t = (ts if ts is not None else time.monotonic()) - self.t0
+        self._q.put((t, "frame:ref", ({"cam": cam, "path": path, "frame": frame_no},)))
+
+    def stop(self):
+        self.bus.remove_tap(self._tap)
+        self._q.put(None)
+        self._thread.join(timeout=5)
+
+    def _topic_id(self, topic):
+        tid = self._topics.get(topic)
+        if tid is None:
+            tid = self._topics[topic] = len(self._topics)
+            with open(self.path + ".topics.json", "w", encoding="utf-8") as f:
+                json.dump(list(self._topics), f)
+        return tid
+
+    def _loop(self):
+        try:
+            self._write_loop()
+        except Exception as e:
+            # disk full, unencodable payload...: stop recording instead of letting the queue grow
+            self.error = e
+            self.bus.remove_tap(self._tap)
+            logging.exception("Session recording to %s failed", self.path)
+            self.bus.publish("log:line", f"[SESSION] recording stopped after {self.records} records: {e}")
+        finally:
+            for f in (self._f, self._idx):
+                try: f.close()
+                except Exception: pass
+
+    def _write_loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._q.get(timeout=self.flush_s)
+            except queue.Empty:
+                item = ()
+            if item is None: break
+            if item:
+                t, topic, payloads = item
+                tid = self._topic_id(topic)
+                for p in payloads:
+                    if isinstance(p, str):
+                        kind, data = K_STR, p.encode("utf-8")
+                    else:
+                        kind, data = K_JSON, json.dumps(p, separators=(",", ":"), default=str).encode("utf-8")
+                    if self.records % self.index_every == 0:
+                        self._idx.write(IDX.pack(t, self._off, self.records))
+                    self._f.write(REC.pack(t, tid, kind, len(data)))
+                    self._f.write(data)
+                    self._off += REC.size + len(data)
+                    self.records += 1
+            if time.monotonic() - last_flush >= self.flush_s:
+                self._f.flush(); self._idx.flush()
+                last_flush = time.monotonic()
+
+class _IndexView:
+    """Sequence of index timestamps over the mmap, for bisect."""
+    def __init__(self, mm): self.mm, self.n = mm, (len(mm) // IDX.size if mm else 0)
+    def __len__(self): return self.n
+    def __getitem__(self, i): return IDX.unpack_from(self.mm, i * IDX.size)[0]
+    def entry(self, i): return IDX.unpack_from(self.mm, i * IDX.size)
+
+class SessionReader:
+    def __init__(self, path):
+        path = path[:-5] if path.endswith(".udcs") else path
+        self.path = path
+        with open(path + ".topics.json", "r", encoding="utf-8") as f:
+            self.topics = json.load(f)
+        self._f = open(path + ".udcs", "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC: raise ValueError(f"{path}.udcs is not a session file")
+        self._if = open(path + ".idx", "rb")
+        size = os.fstat(self._if.fileno()).st_size
+        self._imm = mmap.mmap(self._if.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.index = _IndexView(self._imm)
+
+    def close(self):
+        for x in (self._imm, self._mm):
+            if x is not None: x.close()
+        self._if.close(); self._f.close()
+
+    def offset_for(self, t):
+        """Byte offset of an indexed record at or before time `t`."""
+        i = bisect.bisect_right(self.index, t) - 1
+        return self.index.entry(i)[1] if i >= 0 else len(MAGIC)
+
+    def duration(self):
+        last = None
+        if len(self.index):
+            for last in self.records(self.index.entry(len(self.index) - 1)[1]): pass
+        return last[0] if last else 0.0
+
+    def records(self, offset=None, start=0.0, end=None):
+        """Yield (t, topic, payload) from `start` to `end` seconds."""
+        mm = self._mm
+        off = self.offset_for(start) if offset is None else offset
+        n = len(mm)
+        while off + REC.size <= n:
+            t, tid, kind, ln = REC.unpack_from(mm, off)
+            if off + REC.size + ln > n: break     # torn tail of a live file
+            data = mm[off + REC.size: off + REC.size + ln]
+            off += REC.size + ln
+            if t < start: continue
+            if end is not None and t > end: break
+            payload = data.decode("utf-8") if kind == K_STR else json.loads(data)
+            yield t, self.topics[tid], payload
+
+class Replayer:
+    """Feeds a recorded session back through an EventBus at 1x, Nx or max speed
+    (speed=None). Consecutive events on one topic go out with publish_many()."""
+
+    def __init__(self, bus, path, speed=1.0, start=0.0, end=None, topics=None):
+        self.bus, self.speed = bus, speed
+        self.reader = SessionReader(path)
+        self.start, self.end = start, end
+        self.topics = set(topics) if topics else None
+        self.cancel = threading.Event()
+        self.published = 0
+        self.late_ms = 0.0          # worst lateness vs the recorded schedule
+        self._thread = None
+
+    def run_async(self):
+        self._thread = threading.Thread(target=self.run, name="session-replay", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def run(self):
+        wall0 = time.monotonic()
+        batch_topic, batch = None, []
+        def flush():
+            if batch:
+                self.bus.publish_many(batch_topic, list(batch))
+                self.published += len(batch)
+                batch.clear()
+        try:
+            for t, topic, payload in self.reader.records(start=self.start, end=self.end):
+                if self.cancel.is_set(): break
+                if self.topics is not None and topic not in self.topics: continue
+                if self.speed:
+                    due = wall0 + (t - self.start) / self.speed
+                    wait = due - time.monotonic()
+                    if wait > 0:
+                        flush()
+                        if self.cancel.wait(wait): break
+                    else:
+                        self.late_ms = max(self.late_ms, -wait * 1000)
+                if topic != batch_topic or len(batch) >= 1024:
+                    flush()
+                    batch_topic = topic
+                batch.append(payload)
+            flush()
+        except Exception:
+            logging.exception("Session replay failed")
+        finally:
+            self.reader.close()
+        return self.published
@@ -0,0 +1,240 @@
+# Shared-memory frame ring: one capture process, any number of zero-copy readers
+import os, time, queue, logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+HEADER = 64          # int64 x 8: write_seq, slots, h, w, c, writer pid, spare, spare
+
+def _align(n, a=64):
+    return (n + a - 1) // a * a
+
+class ShmFrameRing:
+    """`slots` frames of one fixed shape in a multiprocessing.shared_memory block.
+
+    Sequence numbers start at 1 and only grow. Slot i holds frame seq where
+    seq % slots == i; its table entry is -seq while the writer fills it and
+    seq once complete, so a reader can tell a finished frame from one being
+    overwritten. The writer never waits for readers: a reader that falls more
+    than a ring behind loses frames (counted per consumer), and a view it is
+    holding is overwritten once slots-1 newer frames have been written."""
+
+    def __init__(self, shm, owner=False):
+        self.shm, self.owner = shm, owner
+        self.hdr = np.ndarray((8,), np.int64, shm.buf, 0)
+        self.slots = int(self.hdr[1])
+        self.shape = tuple(int(x) for x in self.hdr[2:5])
+        self.seqs = np.ndarray((self.slots,), np.int64, shm.buf, HEADER)
+        self.ts = np.ndarray((self.slots,), np.float64, shm.buf, HEADER + 8 * self.slots)
+        self.frames = np.ndarray((self.slots,) + self.shape, np.uint8, shm.buf,
+                                 _align(HEADER + 16 * self.slots))
+
+    @classmethod
+    def create(cls, shape, slots=8, name=None):
+        shape = tuple(int(x) for x in shape)
+        size = _align(HEADER + 16 * slots) + slots * int(np.prod(shape))
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        hdr = np.ndarray((8,), np.int64, shm.buf, 0)
+        hdr[:] = 0
+        hdr[1], hdr[2:5], hdr[5] = slots, shape, os.getpid()
+        np.ndarray((2 * slots,), np.int64, shm.buf, HEADER)[:] = 0
+        del hdr
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def write_seq(self):
+        return int(self.hdr[0])
+
+    # ---- writer ----
+    def begin(self):
+        """(seq, slot view) to fill in place; nothing is visible until commit()."""
+        seq = int(self.hdr[0]) + 1
+        i = seq % self.slots
+        self.seqs[i] = -seq
+        return seq, self.frames[i]
+
+    def commit(self, seq, ts):
+        i = seq % self.slots
+        self.ts[i] = ts
+        self.seqs[i] = seq
+        self.hdr[0] = seq
+
+    def write(self, frame, ts):
+        seq, dst = self.begin()
+        np.copyto(dst, frame)
+        self.commit(seq, ts)
+        return seq
+
+    # ---- readers ----
+    def consumer(self, name):
+        return ShmConsumer(self, name)
+
+    def close(self):
+        self.hdr = self.seqs = self.ts = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # a reader still holds a view; the mapping goes away with it
+            logging.warning("Frame ring %s closed while views are still held", self.shm.name)
+        if self.owner:
+            try: self.shm.unlink()
+            except FileNotFoundError: pass
+
+class ShmConsumer:
+    """One reader's cursor into a ShmFrameRing.
+
+    next()   – frames in order; if the reader fell more than a ring behind it
+               skips to the oldest frame still safe to read (skips → dropped)
+    latest() – newest frame only; everything in between counts as dropped
+    Both return (seq, ts, view) or None. The view is zero-copy: use it (or
+    copy it) promptly, then still_valid(seq) tells whether the writer got to
+    that slot meanwhile (counted in `torn`)."""
+
+    def __init__(self, ring, name):
+        self.ring, self.name = ring, name
+        self.cursor = ring.write_seq      # only frames written from now on
+        self.read = self.dropped = self.torn = 0
+
+    def _take(self, seq):
+        r = self.ring
+        self.dropped += max(0, seq - self.cursor - 1)
+        self.cursor = seq
+        i = seq % r.slots
+        ts = float(r.ts[i])
+        if r.seqs[i] != seq:
+            self.torn += 1
+            return None
+        self.read += 1
+        return seq, ts, r.frames[i]
+
+    def next(self):
+        w = self.ring.write_seq
+        if w <= self.cursor: return None
+        # keep one slot of headroom: the writer may be filling seq w+1 right now
+        return self._take(max(self.cursor + 1, w - self.ring.slots + 2))
+
+    def latest(self):
+        w = self.ring.write_seq
+        return self._take(w) if w > self.cursor else None
+
+    def still_valid(self, seq):
+        if self.ring.seqs[seq % self.ring.slots] == seq: return True
+        self.torn += 1
+        return False
+
+    def wait(self, timeout, poll_s=0.002):
+        """Sleep until a frame newer than the cursor exists (no cross-process
+        condition variable, so this polls the header every `poll_s`)."""
+        deadline = time.monotonic() + timeout
+        while self.ring.write_seq <= self.cursor:
+            left = deadline - time.monotonic()
+            if left <= 0: return False
+            time.sleep(min(poll_s, left))
+        return True
+
+    def stats(self):
+        return {"read": self.read, "dropped": self.dropped, "torn": self.torn,
+                "lag": max(0, self.ring.write_seq - self.cursor)}
+
+def _capture_main(shm_name, index, width, height, fps, stop, status, sensor_fps=None):
+    """Child process: open the camera, grab at the sensor rate and retrieve the
+    frames that fall due at `fps` straight into ring slots."""
+    from core.synthetic_source import open_capture
+    from core.pacing import Pacer
+    ring = ShmFrameRing.attach(shm_name)
+    cap = open_capture(index, width, height, sensor_fps or fps)
+    t0 = time.monotonic()
+    while not cap.isOpened() and time.monotonic() - t0 < 1.0:
+        time.sleep(0.05)
+    if not cap.isOpened():
+        status.put(("error", f"camera {index} not available"))
+        ring.close()
+        return
+    status.put(("ok", os.getpid()))
+    h, w = ring.shape[:2]
+    pacer = Pacer(fps)
+    bad = 0
+    dst = frame = None
+    try:
+        while not stop.is_set():
+            t = time.perf_counter()
+            if not cap.grab():
+                bad += 1
+                if bad >= 30: break
+                time.sleep(0.02)
+                continue
+            bad = 0
+            ts = time.monotonic()
+            if not pacer.due(ts):
+                if time.perf_counter() - t < 0.001:
+                    time.sleep(max(0.0, min(pacer.wait_s(ts), 0.1)))
+                continue
+            seq, dst = ring.begin()
+            ok, frame = cap.retrieve(dst)   # fills dst in place when the size matches
+            if not ok or frame is None: continue
+            if frame is not dst:
+                if frame.shape == dst.shape:
+                    np.copyto(dst, frame)
+                else:
+                    import cv2
+                    cv2.resize(frame, (w, h), dst=dst, interpolation=cv2.INTER_AREA)
+            ring.commit(seq, ts)
+    finally:
+        try: cap.release()
+        except Exception: pass
+        dst = frame = None     # views into the ring must go before it closes
+        ring.close()
+
+class ProcessCapture:
+    """Runs one camera in its own process, writing into a ShmFrameRing.
+
+    Quacks like the bits of cv2.VideoCapture that CameraWorker's callers check
+    (isOpened, release); frames are read through `ring` consumers."""
+
+    def __init__(self, index, width=640, height=480, fps=30.0, slots=8, sensor_fps=None):
+        self.index, self.size, self.fps, self.slots = index, (int(width), int(height)), fps, int(slots)
+        self.sensor_fps = sensor_fps
+        self.ring = None
+        self.proc = None
+        self.error = None
+        self._ctx = mp.get_context("spawn")     # same behaviour on Windows and POSIX
+        self._stop = self._ctx.Event()
+
+    def start(self, timeout=10.0):
+        w, h = self.size
+        self.ring = ShmFrameRing.create((h, w, 3), self.slots)
+        status = self._ctx.Queue()
+        self.proc = self._ctx.Process(target=_capture_main, name=f"capture-{self.index}", daemon=True,
+                                      args=(self.ring.name, self.index, w, h, self.fps, self._stop, status,
+                                            self.sensor_fps))
+        self.proc.start()
+        try:
+            kind, info = status.get(timeout=timeout)
+        except queue.Empty:
+            kind, info = "error", "capture process did not start"
+        if kind != "ok":
+            self.error = info
+            self.release()
+            return False
+        return True
+
+    def isOpened(self):
+        return self.proc is not None and self.proc.is_alive()
+
+    def release(self):
+        self._stop.set()
+        if self.proc is not None:
+            self.proc.join(timeout=2)
+            if self.proc.is_alive(): self.proc.terminate()
+            self.proc = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
@@ -0,0 +1,49 @@
+# Startup timing: per-import and per-panel milliseconds
+import os, json, time, logging, importlib
+from contextlib import contextmanager
+
+T0 = time.perf_counter()    # as early as the entry point imports this module
+
+class StartupProfile:
+    """Named steps timed from process start. Import steps are inclusive (a
+    module's own imports count towards it); panel steps are widget builds.
+    write() appends one JSON line per start so releases can be compared."""
+
+    def __init__(self):
+        self.steps = []     # (name, start_ms, ms)
+        self.marks = {}     # name -> ms since start
+
+    @contextmanager
+    def step(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, round((t - T0) * 1000, 1), round((time.perf_counter() - t) * 1000, 1)))
+
+    def load(self, module):
+        """Import `module`, timed as "import:<module>"."""
+        with self.step(f"import:{module}"):
+            return importlib.import_module(module)
+
+    def mark(self, name):
+        self.marks[name] = round((time.perf_counter() - T0) * 1000, 1)
+
+    def summary(self):
+        return {"marks": self.marks,
+                "steps": [{"name": n, "at_ms": at, "ms": ms} for n, at, ms in self.steps]}
+
+    def write(self, folder="logs", version=None):
+        rec = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "version": version, **self.summary()}
+        try:
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, "startup_profile.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec) + "\n")
+        except OSError:
+            logging.warning("Could not write startup profile")
+        top = sorted(self.steps, key=lambda s: -s[2])[:6]
+        logging.info("Startup: %s | slowest: %s", ", ".join(f"{k} {v:.0f} ms" for k, v in self.marks.items()),
+                     ", ".join(f"{n} {ms:.0f} ms" for n, _, ms in top))
+        return rec
+
+PROFILE = StartupProfile()
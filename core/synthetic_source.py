@@ -0,0 +1,103 @@
+# Synthetic camera: a cv2.VideoCapture stand-in for benchmarks and camera-less rigs
+import time
+import numpy as np
+
+class SyntheticCapture:
+    """Paced moving-box frames with the VideoCapture calls the app uses
+    (isOpened, read, grab, retrieve, set, get, release).
+
+    Use index "synthetic" (or "synthetic:<seed>") in app.yaml to get one from
+    CameraWorker. fps=0 delivers frames as fast as they are asked for.
+    `jpeg_quality` > 0 round-trips every frame through JPEG to cost roughly what
+    an MJPG webcam decode costs."""
+
+    def __init__(self, width=640, height=480, fps=30.0, seed=0, jpeg_quality=0):
+        self.w, self.h = int(width), int(height)
+        self.fps = float(fps)
+        self.seed = seed
+        self.jpeg_quality = int(jpeg_quality)
+        self.n = 0
+        self._open = True
+        self._t_next = time.monotonic()
+        self._grabbed = False
+        self._build()
+
+    def _build(self):
+        # static background: gradient + noise, built once per size
+        rng = np.random.default_rng(self.seed)
+        grad = np.linspace(40, 160, self.w, dtype=np.float32)[None, :, None]
+        self._bg = np.clip(grad + rng.normal(0, 6, (self.h, self.w, 3)), 0, 255).astype(np.uint8)
+        self._box = max(8, self.h // 8)
+
+    def isOpened(self):
+        return self._open
+
+    def release(self):
+        self._open = False
+
+    def set(self, prop, value):
+        import cv2
+        if prop == cv2.CAP_PROP_FRAME_WIDTH: self.w = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT: self.h = int(value)
+        elif prop == cv2.CAP_PROP_FPS: self.fps = float(value); return True
+        else: return False
+        self._build()
+        return True
+
+    def get(self, prop):
+        import cv2
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.w, cv2.CAP_PROP_FRAME_HEIGHT: self.h,
+                cv2.CAP_PROP_FPS: self.fps, cv2.CAP_PROP_POS_FRAMES: self.n}.get(prop, 0.0)
+
+    def grab(self):
+        if not self._open: return False
+        if self.fps > 0:
+            self._t_next += 1.0 / self.fps
+            delay = self._t_next - time.monotonic()
+            if delay > 0: time.sleep(delay)
+            else: self._t_next = time.monotonic()     # fell behind: don't burst to catch up
+        self.n += 1
+        self._grabbed = True
+        return True
+
+    def retrieve(self, image=None):
+        if not self._grabbed: return False, None
+        self._grabbed = False
+        out = image if image is not None and image.shape == (self.h, self.w, 3) else \
+            np.empty((self.h, self.w, 3), np.uint8)
+        np.copyto(out, self._bg)
+        b = self._box
+        x = (self.n * 7) % max(1, self.w - b)
+        y = (self.n * 3) % max(1, self.h - b)
+        out[y:y + b, x:x + b] = (255, 255, 255)
+        out[0:4, 0:64] = self.n & 0xFF      # frame counter stripe
+        if self.jpeg_quality > 0:
+            import cv2
+            ok, enc = cv2.imencode(".jpg", out, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            out[...] = cv2.imdecode(enc, cv2.IMREAD_COLOR)
+        return True, out
+
+    def read(self, image=None):
+        if not self.grab(): return False, None
+        return self.retrieve(image)
+
+def open_capture(index, width=640, height=480, fps=30.0):
+    """cv2.VideoCapture for a device index, SyntheticCapture for "synthetic[:seed]"."""
+    if isinstance(index, str) and index.startswith("synthetic"):
+        seed = int(index.split(":", 1)[1]) if ":" in index else 0
+        return SyntheticCapture(width, height, fps, seed=seed)
+    import cv2
+    # Prefer DirectShow on Windows to avoid long blocking opens
+    try:
+        cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
+    except Exception:
+        cap = cv2.VideoCapture(index)
+    # Small buffer & size caps help reduce latency
+    try: cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    except Exception: pass
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    # Some drivers accept a target FPS hint
+    try: cap.set(cv2.CAP_PROP_FPS, float(fps))
+    except Exception: pass
+    return cap
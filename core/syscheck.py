@@ -1,4 +1,322 @@
 # System check orchestrator
 # syscheck.py
-class SystemCheck:
+import os, json, time, threading, logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class StepFailed(Exception):
     pass
+
+class Step:
+    __slots__ = ("name", "type", "spec", "needs", "resources", "timeout", "retries",
+                 "state", "attempts", "start", "end", "detail")
+
+    def __init__(self, name, spec, timeout, retries):
+        self.name, self.type, self.spec = name, spec["type"], spec
+        self.needs = set(spec.get("needs", []))
+        self.resources = set()
+        self.timeout = float(spec.get("timeout_s", timeout))
+        self.retries = int(spec.get("retries", retries))
+        self.state = "pending"   # pending → running → passed | failed | timeout | skipped | cancelled
+        self.attempts = 0
+        self.start = self.end = None
+        self.detail = None
+
+    @property
+    def wall_ms(self):
+        return round((self.end - self.start) * 1000, 1) if self.start and self.end else 0.0
+
+class SystemCheck:
+    """Runs syscheck.yaml as a dependency graph.
+
+    Edges come from explicit `needs:` plus shared resources: two steps that use
+    the serial port, the same camera, the ADU or the operator's attention run in
+    file order; everything else runs concurrently. Each step gets a timeout,
+    `retries` extra attempts and a cancel event. Progress is published on the
+    bus as "syscheck:progress"; the final report goes to report.path as JSON."""
+
+    def __init__(self, cfg, bus=None, serial=None, scanner=None, adu=None, cameras=None,
+                 cams_cfg=None, vision_cfg=None, confirm=None, retries=1, step_timeout=30.0):
+        self.cfg, self.bus = cfg or {}, bus
+        self.serial, self.scanner, self.adu = serial, scanner, adu
+        self.cameras = cameras or (lambda cam: None)   # cam name -> running CameraWorker or None
+        self.cams_cfg = cams_cfg or {}
+        self.vision_cfg = vision_cfg or {}
+        self.confirm = confirm                           # (prompt, timeout_s) -> bool, None if unanswered
+        self.mode = self.cfg.get("mode", "manual")
+        self.cancel = threading.Event()
+        self.stop_grace_s = float(self.cfg.get("stop_grace_s", 5.0))
+        self._local = threading.local()
+        self.steps = self.compile(retries, step_timeout)
+        self.report = None
+        self._thread = None
+
+    # ---- graph ----
+    def compile(self, retries=1, step_timeout=30.0):
+        steps, seen = [], {}
+        for i, spec in enumerate(self.cfg.get("steps", [])):
+            name = spec.get("name") or spec["type"]
+            if name in seen:
+                name = f"{name}_{i}"
+            st = Step(name, spec, step_timeout, retries)
+            st.resources = self._resources(spec)
+            seen[name] = st
+            steps.append(st)
+        for i, st in enumerate(steps):
+            unknown = st.needs - set(seen)
+            if unknown: raise ValueError(f"syscheck step {st.name}: unknown needs {sorted(unknown)}")
+            for prev in steps[:i]:
+                if prev.resources & st.resources:
+                    st.needs.add(prev.name)
+        return steps
+
+    def _resources(self, spec):
+        t = spec["type"]
+        res = set()
+        if t == "ping" or t == "arduino_sequence": res.add("serial")
+        if t == "adu_check": res.add("adu")
+        if t == "camera_check": res.update(f"cam:{c}" for c in spec.get("cams", []))
+        for item in spec.get("sequence", []) + spec.get("actions", []):
+            v = item.get("verify") or {}
+            if v.get("cam"): res.add(f"cam:{v['cam']}")
+            if v.get("method") == "user_confirm" or v.get("fallback") == "user_confirm" or self.mode == "manual":
+                res.add("operator")
+        return res
+
+    # ---- running ----
+    def run_async(self):
+        self._thread = threading.Thread(target=self.run, name="syscheck", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def run(self):
+        t0 = time.monotonic()
+        self._progress(None, "started", steps=[s.name for s in self.steps])
+        by_name = {s.name: s for s in self.steps}
+        running = {}    # future -> (step, deadline, cancel event)
+        abandoned = {}  # future -> (step, give-up time): timed-out attempts still winding down
+        # room for retries while timed-out attempts are still winding down
+        pool = ThreadPoolExecutor(max_workers=2 * len(self.steps) + 2, thread_name_prefix="syscheck")
+        try:
+            while True:
+                now = time.monotonic()
+                for fut, (st, give_up) in list(abandoned.items()):
+                    if fut.done(): del abandoned[fut]
+                    elif now >= give_up:
+                        del abandoned[fut]
+                        logging.warning("[CHECK] %s: attempt still running %.1f s after cancel", st.name,
+                                        self.stop_grace_s)
+                for st in self.steps:
+                    if st.state != "pending": continue
+                    deps = [by_name[n] for n in st.needs]
+                    if any(d.state in ("failed", "timeout", "skipped", "cancelled") for d in deps):
+                        st.state, st.detail = "skipped", "dependency failed"
+                        self._progress(st, "skipped")
+                    elif all(d.state == "passed" for d in deps) and not self.cancel.is_set():
+                        # a retry, or a step sharing its resources, waits for the abandoned attempt to stop
+                        if not any(a is st or a.resources & st.resources for a, _ in abandoned.values()):
+                            running.update(self._launch(pool, st))
+                if self.cancel.is_set():
+                    for st in self.steps:
+                        if st.state == "pending": st.state = "cancelled"
+                if not running and not any(st.state == "pending" for st in self.steps): break
+                if not running and not abandoned: break
+                nearest = min([d for _, d, _ in running.values()] + [g for _, g in abandoned.values()])
+                done, _ = wait(list(running) + list(abandoned),
+                               timeout=min(0.1, max(0.0, nearest - time.monotonic())),
+                               return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                for fut, (st, deadline, ev) in list(running.items()):
+                    if fut in done:
+                        del running[fut]
+                        try:
+                            st.detail = fut.result()
+                            ok = True
+                        except Exception as e:
+                            st.detail, ok = str(e) or type(e).__name__, False
+                        self._finish(st, "passed" if ok else "failed")
+                    elif now >= deadline or self.cancel.is_set():
+                        ev.set()   # step functions poll this; the attempt is tracked until it stops
+                        del running[fut]
+                        abandoned[fut] = (st, now + self.stop_grace_s)
+                        st.detail = "cancelled" if self.cancel.is_set() else f"timeout after {st.timeout:.1f} s"
+                        self._finish(st, "cancelled" if self.cancel.is_set() else "timeout")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.report = self._write_report(time.monotonic() - t0)
+        self._progress(None, "finished", ok=self.report["ok"], report=self.report.get("path"),
+                       total_ms=self.report["total_ms"])
+        return self.report
+
+    def _launch(self, pool, st):
+        st.state = "running"
+        st.attempts += 1
+        if st.start is None: st.start = time.monotonic()
+        ev = threading.Event()
+        self._progress(st, "running", attempt=st.attempts)
+        fut = pool.submit(self._run_step, st, ev)
+        return {fut: (st, time.monotonic() + st.timeout, ev)}
+
+    def _finish(self, st, state):
+        if state in ("failed", "timeout") and st.attempts <= st.retries and not self.cancel.is_set():
+            # back to pending: run() relaunches it once nothing abandoned holds its resources
+            self._progress(st, "retry", detail=st.detail)
+            st.state = "pending"
+            return
+        st.state, st.end = state, time.monotonic()
+        self._progress(st, state, detail=st.detail)
+
+    def _run_step(self, st, cancel):
+        fn = getattr(self, f"_step_{st.type}", None)
+        if fn is None: raise StepFailed(f"unknown step type {st.type}")
+        self._local.timeout = st.timeout     # bounds an operator prompt inside the step
+        return fn(st.spec, cancel)
+
+    # ---- step types ----
+    def _step_ping(self, spec, cancel):
+        if self.serial is not None and self.serial.ser is not None:
+            r = self.serial.request("PING").result(spec.get("timeout_s", 2))
+            return f"PONG in {r.rtt_ms:.1f} ms on {self.serial.port}"
+        if self.scanner is None: raise StepFailed("no serial port or scanner")
+        res = self.scanner.scan()
+        if not res.get("best"): raise StepFailed("no device answered PING")
+        return f"PONG from {res['best']} ({res['elapsed_ms']:.0f} ms scan)"
+
+    def _step_camera_check(self, spec, cancel):
+        out = {}
+        for cam in spec.get("cams", []):
+            worker, temp = self._camera(cam)
+            if worker is None: raise StepFailed(f"{cam}: camera not available")
+            try:
+                seq0 = worker.mailbox.seq
+                deadline = time.monotonic() + spec.get("frame_timeout_s", 3)
+                while worker.mailbox.seq <= seq0:
+                    if cancel.is_set() or time.monotonic() > deadline:
+                        raise StepFailed(f"{cam}: no frames")
+                    time.sleep(0.02)
+                out[cam] = "ok"
+            finally:
+                if temp: worker.stop()
+        return out
+
+    def _step_arduino_sequence(self, spec, cancel):
+        results = []
+        for item in spec.get("sequence", []):
+            if cancel.is_set(): raise StepFailed("cancelled")
+            def send(cmd=item["send"]):
+                if self.serial is None or not self.serial.write_line(cmd):
+                    raise StepFailed(f"send {cmd} failed (not connected)")
+            results.append(self._verify(item["send"], item.get("verify"), send, cancel))
+        return results
+
+    def _step_adu_check(self, spec, cancel):
+        results = []
+        for item in spec.get("actions", []):
+            if cancel.is_set(): raise StepFailed("cancelled")
+            def do(action=item["do"]):
+                if self.adu is None or not self.adu.action(action):
+                    raise StepFailed(f"ADU {action} failed")
+            results.append(self._verify(item["do"], item.get("verify"), do, cancel))
+        return results
+
+    def _verify(self, what, v, act, cancel):
+        """Run `act()` and check its effect. A vision check starts and settles its
+        baseline before the action, so the change it looks for happens while it watches."""
+        if not v:
+            act()
+            return {"what": what, "ok": True}
+        method = "user_confirm" if self.mode == "manual" else v.get("method", "user_confirm")
+        if method.startswith("vision_"):
+            worker, temp = self._camera(v.get("cam", "cam_a"))
+            if worker is not None:
+                from core.vision_check import VisionCheck
+                vc = VisionCheck(worker, self.vision_cfg)
+                vc.start()
+                try:
+                    time.sleep(0.3)   # baseline
+                    since = time.monotonic()
+                    act()
+                    if method == "vision_motion":
+                        verdict = vc.verify_motion(v.get("timeout_s", 3), since=since)
+                    else:
+                        verdict = vc.verify_brightness(v.get("direction", "up"), v.get("delta"),
+                                                       v.get("timeout_s", 3), since=since)
+                finally:
+                    vc.stop()
+                    if temp: worker.stop()
+                if verdict.ok or self.mode == "auto" or not v.get("fallback"):
+                    if not verdict.ok: raise StepFailed(f"{what}: {method} failed ({verdict.detail})")
+                    return {"what": what, "ok": True, "method": method, "confidence": verdict.confidence,
+                            "latency_ms": verdict.latency_ms}
+            else:
+                if self.mode == "auto" or not v.get("fallback"):
+                    raise StepFailed(f"{what}: camera {v.get('cam')} not available for {method}")
+                act()
+            method = v.get("fallback")
+        else:
+            act()
+        if method == "user_confirm":
+            if self.confirm is None: raise StepFailed(f"{what}: no operator to confirm")
+            ok = self.confirm(v.get("prompt", f"{what} OK?"), getattr(self._local, "timeout", None))
+            if ok is None: raise StepFailed(f"{what}: no answer from operator")
+            if not ok: raise StepFailed(f"{what}: operator said no")
+            return {"what": what, "ok": True, "method": "user_confirm"}
+        raise StepFailed(f"{what}: unknown verify method {method}")
+
+    def _camera(self, cam):
+        """(worker, started_here) — reuse a live tile worker or open one for the check."""
+        w = self.cameras(cam)
+        if w is not None and w.cap is not None: return w, False
+        c = self.cams_cfg.get(cam)
+        if not c: return None, False
+        from core.camera_worker import CameraWorker
+        w = CameraWorker(index=c["index"], width=c["width"], height=c["height"], target_fps=c["target_fps"],
+                         mode=c.get("capture", "thread"), shm_slots=c.get("shm_slots", 8),
+                         sensor_fps=c.get("sensor_fps"), pacing=c.get("pacing"))
+        w.start()
+        return (w, True) if w.cap is not None else (None, False)
+
+    # ---- reporting ----
+    def _progress(self, st, state, **extra):
+        msg = {"step": st.name if st else None, "state": state, **extra}
+        if st is not None and st.end is not None: msg["ms"] = st.wall_ms
+        if self.bus: self.bus.publish("syscheck:progress", msg)
+
+    def critical_path(self):
+        """Longest chain of dependent steps by wall time — what bounds total check time."""
+        by_name = {s.name: s for s in self.steps}
+        best = {}
+        def longest(st):
+            if st.name not in best:
+                prev = max((longest(by_name[n]) for n in st.needs), key=lambda x: x[0], default=(0.0, []))
+                best[st.name] = (prev[0] + st.wall_ms, prev[1] + [st.name])
+            return best[st.name]
+        ms, path = max((longest(s) for s in self.steps), key=lambda x: x[0], default=(0.0, []))
+        return {"steps": path, "ms": round(ms, 1)}
+
+    def _write_report(self, total_s):
+        t0 = min((s.start for s in self.steps if s.start), default=None)
+        rep = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "mode": self.mode,
+            "ok": all(s.state == "passed" for s in self.steps),
+            "total_ms": round(total_s * 1000, 1),
+            "critical_path": self.critical_path(),
+            "steps": [{
+                "name": s.name, "type": s.type, "state": s.state, "attempts": s.attempts,
+                "needs": sorted(s.needs), "wall_ms": s.wall_ms,
+                "start_ms": round((s.start - t0) * 1000, 1) if s.start and t0 else None,
+                "detail": s.detail,
+            } for s in self.steps],
+        }
+        rcfg = self.cfg.get("report", {})
+        if rcfg.get("save", True):
+            try:
+                folder = rcfg.get("path", "reports")
+                os.makedirs(folder, exist_ok=True)
+                path = os.path.join(folder, f"syscheck_{time.strftime('%Y%m%d-%H%M%S')}.json")
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(rep, f, indent=2, default=str)
+                rep["path"] = path
+            except Exception:
+                logging.exception("Could not write system check report")
+        return rep
@@ -0,0 +1,181 @@
+# Serial telemetry → columnar arrays
+import re, time, threading, collections
+import numpy as np
+
+class Channel:
+    """Timestamped numeric columns for one telemetry stream.
+
+    Rows go into preallocated chunks of `chunk_rows`; column 0 is the monotonic
+    timestamp. Growth appends a chunk, and once `max_rows` is exceeded the
+    oldest chunk is dropped, so memory per channel is bounded and predictable.
+    Each sealed chunk also keeps a min/max envelope of `chunk_rows // 64` rows,
+    which window(points=...) uses instead of the raw rows for long spans."""
+
+    def __init__(self, name, fields, chunk_rows=65536, max_rows=4_000_000):
+        self.name, self.fields = name, list(fields)
+        self.chunk_rows = int(chunk_rows)
+        self.max_chunks = max(2, int(max_rows) // self.chunk_rows)
+        self._chunks = collections.deque()     # full chunks
+        self._sums = collections.deque()       # their envelopes, same order
+        self._cur = self._new_chunk()
+        self._n = 0                            # rows used in _cur
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def _new_chunk(self):
+        return np.empty((self.chunk_rows, len(self.fields) + 1), np.float64)
+
+    @property
+    def nbytes(self):
+        return (len(self._chunks) + 1) * self.chunk_rows * (len(self.fields) + 1) * 8
+
+    def append(self, ts, rows):
+        """`ts`: array of timestamps, `rows`: (n, len(fields)) values."""
+        n = len(ts)
+        if not n: return
+        with self._lock:
+            i = 0
+            while i < n:
+                k = min(n - i, self.chunk_rows - self._n)
+                self._cur[self._n:self._n + k, 0] = ts[i:i + k]
+                self._cur[self._n:self._n + k, 1:] = rows[i:i + k]
+                self._n += k; i += k
+                if self._n == self.chunk_rows:
+                    self._chunks.append(self._cur)
+                    self._sums.append(_envelope(self._cur))
+                    if len(self._chunks) >= self.max_chunks:
+                        self._chunks.popleft(); self._sums.popleft()
+                    self._cur, self._n = self._new_chunk(), 0
+            self.total += n
+
+    def window(self, seconds=None, points=None):
+        """(t, values) covering the last `seconds` (all retained data if None).
+
+        With `points` (e.g. the plot width), sealed chunks are read from their
+        envelopes once the span holds more than 8x that many rows, so a long
+        window costs about (chunks * chunk_rows/64 + chunk_rows) rows, not all."""
+        with self._lock:
+            parts = list(zip(self._chunks, self._sums)) + [(self._cur[:self._n], None)]
+        parts = [p for p in parts if len(p[0])]
+        if not parts:
+            return np.empty(0), np.empty((0, len(self.fields)))
+        if seconds is not None:
+            t_lo = parts[-1][0][-1, 0] - seconds
+            while len(parts) > 1 and parts[0][0][-1, 0] < t_lo: parts.pop(0)
+        sealed = sum(1 for _, e in parts if e is not None)
+        use_env = points is not None and sealed * self.chunk_rows > 8 * points
+        parts = [e if use_env and e is not None else raw for raw, e in parts]
+        if seconds is not None:
+            parts[0] = parts[0][np.searchsorted(parts[0][:, 0], t_lo):]
+        data = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        return data[:, 0], data[:, 1:]
+
+def _envelope(chunk, step=128):
+    """Two rows per `step` rows: (first t, column minima) and (last t, column
+    maxima). Drawn as a line this keeps every spike of the chunk."""
+    idx = np.arange(0, len(chunk), step)
+    out = np.empty((2 * len(idx), chunk.shape[1]), np.float64)
+    out[0::2, 0] = chunk[idx, 0]
+    out[1::2, 0] = chunk[np.append(idx[1:] - 1, len(chunk) - 1), 0]
+    out[0::2, 1:] = np.fmin.reduceat(chunk[:, 1:], idx, axis=0)
+    out[1::2, 1:] = np.fmax.reduceat(chunk[:, 1:], idx, axis=0)
+    return out
+
+class _Rule:
+    """One configured line pattern.
+
+    prefix + fields: fast path for "M:pos=123 speed=45" style key=value lines
+    pattern:         regex whose named groups are the fields"""
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.prefix = spec.get("prefix")
+        self.regex = re.compile(spec["pattern"]) if spec.get("pattern") else None
+        if self.regex is not None:
+            self.fields = list(spec.get("fields") or self.regex.groupindex)
+        else:
+            self.fields = list(spec["fields"])
+        self._idx = {f: i for i, f in enumerate(self.fields)}
+
+    def parse(self, line):
+        if self.regex is not None:
+            m = self.regex.search(line)
+            if m is None: return None
+            return [float(m.group(f)) for f in self.fields]
+        if not line.startswith(self.prefix): return None
+        row = [np.nan] * len(self.fields)
+        for kv in line[len(self.prefix):].split():
+            k, sep, v = kv.partition("=")
+            i = self._idx.get(k)
+            if sep and i is not None:
+                try: row[i] = float(v)
+                except ValueError: pass
+        return row
+
+class Telemetry:
+    """Parses serial lines into per-channel column buffers (config `telemetry:`)."""
+
+    def __init__(self, cfg=None):
+        cfg = cfg or {}
+        self.rules = [_Rule(n, s) for n, s in (cfg.get("channels") or {}).items()]
+        self.channels = {r.name: Channel(r.name, r.fields, cfg.get("chunk_rows", 65536),
+                                         cfg.get("max_rows", 4_000_000)) for r in self.rules}
+        self.parsed = 0
+
+    def attach(self, bus, topic="log:line"):
+        bus.subscribe(topic, self.feed, stamped=True)
+
+    def feed(self, lines, ts=None):
+        """`ts`: one time for the whole batch, or one per line (the bus passes
+        each line's publish time, i.e. when the reader framed it)."""
+        if isinstance(lines, str): lines = [lines]
+        if not self.rules: return
+        now = time.monotonic() if ts is None else ts
+        per_line = not np.isscalar(now)
+        for r in self.rules:
+            parsed = list(map(r.parse, lines))
+            rows = [row for row in parsed if row is not None]
+            if rows:
+                arr = np.array(rows, np.float64)
+                if per_line:
+                    t = np.fromiter((x for x, row in zip(now, parsed) if row is not None), np.float64, len(rows))
+                else:
+                    t = np.full(len(rows), now)
+                self.channels[r.name].append(t, arr)
+                self.parsed += len(rows)
+
+# ---- downsampling for plots ----
+def minmax(t, y, buckets):
+    """Keep the min and max of each bucket (in time order): 2*buckets points,
+    preserves spikes and is fully vectorised."""
+    n = len(y)
+    if n <= 2 * buckets: return t, y
+    bs = n // buckets
+    m = bs * buckets
+    yb = y[n - m:].reshape(buckets, bs)
+    base = np.arange(buckets) * bs + (n - m)
+    if np.isnan(yb).any():
+        lo = base + np.argmin(np.where(np.isnan(yb), np.inf, yb), axis=1)
+        hi = base + np.argmax(np.where(np.isnan(yb), -np.inf, yb), axis=1)
+    else:
+        lo = base + yb.argmin(axis=1)
+        hi = base + yb.argmax(axis=1)
+    idx = np.sort(np.concatenate([lo, hi]))
+    return t[idx], y[idx]
+
+def lttb(t, y, n_out):
+    """Largest-Triangle-Three-Buckets downsampling to `n_out` points."""
+    n = len(y)
+    if n_out >= n or n_out < 3: return t, y
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        ct, cy = t[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((t[a] - ct) * (y[lo:hi] - y[a]) - (t[a] - t[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return t[out], y[out]
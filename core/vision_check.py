@@ -1,4 +1,152 @@
 # Motion/brightness heuristics
 # vision_check.py
+import threading, time, collections
+import numpy as np
+import cv2
+
+Verdict = collections.namedtuple("Verdict", "ok confidence latency_ms detail")
+Sample = collections.namedtuple("Sample", "ts motion moving brightness")
+
 class VisionCheck:
-    pass
+    """Motion and brightness verification for one camera.
+
+    Runs on its own thread at `analysis_fps`, independent of the display rate,
+    and works on frames downscaled to `width` and converted to grayscale. Motion
+    is the fraction of ROI pixels that differ from a running-average background;
+    a hysteresis band (motion_on / motion_off) turns that into a stable moving
+    flag. Brightness is the ROI mean. Everything per frame is a handful of
+    OpenCV/NumPy calls, no Python per-pixel work."""
+
+    def __init__(self, worker, cfg=None):
+        cfg = cfg or {}
+        self.worker = worker
+        self.interval = 1.0 / float(cfg.get("analysis_fps", 10))
+        self.width = int(cfg.get("width", 160))
+        self.roi = cfg.get("roi")                  # [x, y, w, h] as 0..1 fractions
+        self.alpha = float(cfg.get("bg_alpha", 0.05))
+        self.diff_thresh = int(cfg.get("diff_thresh", 25))
+        self.motion_on = float(cfg.get("motion_on", 0.02))
+        self.motion_off = float(cfg.get("motion_off", 0.01))
+        self.bright_delta = float(cfg.get("brightness_delta", 20))
+        self.history = collections.deque(maxlen=int(cfg.get("history", 600)))
+        self.moving = False
+        self.analyze_ms = 0.0
+        self._bg = None
+        self._roi_px = None
+        self._seq = 0
+        self._stop = threading.Event()
+        self._cv = threading.Condition()
+        self._thread = None
+
+    # ---- lifecycle ----
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="vision", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        nxt = time.monotonic()
+        # process-mode cameras: read the shared ring in place instead of the mailbox copy
+        shm = self.worker.consumer("vision") if self.worker and hasattr(self.worker, "consumer") else None
+        while not self._stop.is_set():
+            if shm is not None:
+                item = shm.latest()
+                if item is not None:
+                    seq = item[0]
+                    self.analyze(item[2], item[1], valid=lambda: shm.still_valid(seq))
+                    item = None
+            else:
+                item = self.worker.mailbox.get(self._seq) if self.worker else None
+                if item is not None:
+                    self._seq = item[0]
+                    self.analyze(item[2], item[1])
+            nxt += self.interval
+            delay = nxt - time.monotonic()
+            if delay < 0: nxt, delay = time.monotonic(), 0
+            self._stop.wait(delay)
+        if shm is not None: self.worker.release(shm)
+
+    # ---- per-frame analysis ----
+    def analyze(self, frame, ts=None, valid=None):
+        """Score one frame. `valid()` is asked once the frame has been read (a
+        shared-ring view may be overwritten meanwhile); False discards it."""
+        t0 = time.perf_counter()
+        h, w = frame.shape[:2]
+        sh = max(1, int(h * self.width / w))
+        small = cv2.resize(frame, (self.width, sh), interpolation=cv2.INTER_AREA)
+        if valid is not None and not valid(): return None
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        if self._roi_px is None or self._roi_px[4:] != gray.shape:
+            if self.roi:
+                x, y, rw, rh = self.roi
+                x0, y0 = int(x * gray.shape[1]), int(y * gray.shape[0])
+                self._roi_px = (x0, y0, max(x0 + 1, int((x + rw) * gray.shape[1])),
+                                max(y0 + 1, int((y + rh) * gray.shape[0]))) + gray.shape
+            else:
+                self._roi_px = (0, 0, gray.shape[1], gray.shape[0]) + gray.shape
+            self._bg = None
+        x0, y0, x1, y1 = self._roi_px[:4]
+        roi = gray[y0:y1, x0:x1]
+        if self._bg is None:
+            self._bg = roi.astype(np.float32)
+        diff = cv2.absdiff(roi, cv2.convertScaleAbs(self._bg))
+        motion = cv2.countNonZero(cv2.threshold(diff, self.diff_thresh, 255, cv2.THRESH_BINARY)[1]) / diff.size
+        cv2.accumulateWeighted(roi, self._bg, self.alpha)
+        if self.moving and motion <= self.motion_off: self.moving = False
+        elif not self.moving and motion >= self.motion_on: self.moving = True
+        s = Sample(time.monotonic() if ts is None else ts, motion, self.moving, float(cv2.mean(roi)[0]))
+        with self._cv:
+            self.history.append(s)
+            self._cv.notify_all()
+        self.analyze_ms = (time.perf_counter() - t0) * 1000
+        return s
+
+    # ---- verdicts ----
+    def _wait(self, pred, timeout, since):
+        deadline = since + timeout
+        with self._cv:
+            while True:
+                for s in self.history:
+                    if s.ts >= since and pred(s): return s
+                left = deadline - time.monotonic()
+                if left <= 0: return None
+                self._cv.wait(left)
+
+    def verify_motion(self, timeout=3.0, since=None):
+        """Wait for motion starting at `since` (default now). Confidence grows with
+        how far the peak score exceeded the on-threshold."""
+        t0 = time.monotonic() if since is None else since
+        s = self._wait(lambda s: s.moving, timeout, t0)
+        lat = round((time.monotonic() - t0) * 1000, 1)
+        with self._cv:
+            peak = max((x.motion for x in self.history if x.ts >= t0), default=0.0)
+        if s is None:
+            return Verdict(False, round(1.0 - min(1.0, peak / self.motion_on), 2), lat, {"peak": peak})
+        return Verdict(True, round(min(1.0, peak / (2 * self.motion_on)), 2), lat, {"peak": peak})
+
+    def verify_brightness(self, direction="up", delta=None, timeout=3.0, baseline_s=0.25, since=None):
+        """Wait for the ROI mean to move `delta` levels up/down from the baseline of
+        the `baseline_s` before `since` (default now, i.e. the action just taken)."""
+        delta = self.bright_delta if delta is None else float(delta)
+        t0 = time.monotonic() if since is None else since
+        with self._cv:
+            recent = [x.brightness for x in self.history if t0 - baseline_s <= x.ts < t0]
+        base = float(np.median(recent)) if recent else None
+        if base is None:
+            first = self._wait(lambda s: True, timeout, t0)
+            if first is None:
+                return Verdict(False, 0.0, round((time.monotonic() - t0) * 1000, 1), {"error": "no frames"})
+            base = first.brightness
+        sign = 1 if direction == "up" else -1
+        s = self._wait(lambda s: sign * (s.brightness - base) >= delta, timeout, t0)
+        lat = round((time.monotonic() - t0) * 1000, 1)
+        if s is not None: cur = s.brightness
+        else:
+            with self._cv: cur = self.history[-1].brightness if self.history else base
+        change = sign * (cur - base)
+        conf = min(1.0, change / (2 * delta)) if s else 1.0 - max(0.0, min(1.0, change / delta))
+        return Verdict(s is not None, round(conf, 2), lat, {"baseline": round(base, 1), "value": round(cur, 1)})
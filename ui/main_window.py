@@ -1,26 +1,37 @@
 # Main CTk window
 import customtkinter as ctk
-import logging
+from tkinter import messagebox
+import threading, time
+from core.startup_profile import PROFILE as prof
 from ui.panels.status_bar import StatusBar
-from ui.panels.camera_panel import DualCameraPanel
 from ui.panels.arduino_panel import ArduinoPanel
 from ui.panels.adu_panel import ADUPanel
+from ui.panels.macro_panel import MacroPanel
 from ui.panels.log_panel import LogPanel
-from core.serial_manager import SerialManager
-from core.device_scanner import DeviceScanner
-from core.event_bus import EventBus
+from ui.panels.telemetry_panel import TelemetryPanel
+from core.engine import Engine
+from core.telemetry import Telemetry
+from core.config import load_config
+from core.metrics import METRICS, describe
 
 class MainWindow(ctk.CTk):
-    def __init__(self, app_cfg, logfile, version):
+    def __init__(self, app_cfg, logfile, version, config=None):
         super().__init__()
+        self.cfg_all = config or load_config()
+        self.version = version
         self.title(f'{app_cfg["app"]["name"]} – {app_cfg["app"]["version_tag"]}')
         self.geometry("1400x930")
         self.minsize(1200, 760)
 
-        self.bus = EventBus()
-        self.serial = SerialManager(self.bus, baud=app_cfg["serial"]["baudrate"],
-                                    eol=app_cfg["serial"]["eol"])
-        self.scanner = DeviceScanner(self.bus, app_cfg["serial"])
+        # devices live in the engine; the window only renders and forwards clicks
+        with prof.step("engine"):
+            self.engine = Engine(app_cfg, commands_cfg=self.cfg_all.commands)
+        self.bus, self.serial, self.scanner = self.engine.bus, self.engine.serial, self.engine.scanner
+        self.adu_client = self.engine.adu
+        self.app_cfg = app_cfg
+        self.syscheck = None
+        if app_cfg.get("session", {}).get("record"):
+            self.engine.start_session()
 
         # GRID: 3 cols (main area + main area + narrow actions); 3 rows
         self.grid_columnconfigure(0, weight=1)
@@ -30,16 +41,27 @@ class MainWindow(ctk.CTk):
         self.grid_rowconfigure(2, weight=1)
 
         # Status bar (row 0, span all)
-        self.status = StatusBar(self, initial="Ready")
-        self.status.grid(row=0, column=0, columnspan=3, sticky="ew", padx=10, pady=(8,2))
-
-        # Cameras (row 1, col 0-1)
-        self.cameras = DualCameraPanel(self, app_cfg["cameras"], self.bus)
-        self.cameras.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
-
-        # Serial Monitor (row 2, col 0-1) — wide
-        self.log_panel = LogPanel(self, also_log_to_file=app_cfg["logging"].get("also_log_serial", True))
-        self.log_panel.grid(row=2, column=0, columnspan=2, sticky="nsew", padx=10, pady=(0,10))
+        with prof.step("panel:status"):
+            self.status = StatusBar(self, initial="Ready")
+            self.status.grid(row=0, column=0, columnspan=3, sticky="ew", padx=10, pady=(8,2))
+
+        # Cameras (row 1, col 0-1): built after the first paint, see _build_deferred
+        self.cameras = None
+
+        # Serial Monitor (row 2, col 0-1) — wide, or col 0 with the telemetry plot beside it
+        tel_cfg = app_cfg.get("telemetry", {})
+        with prof.step("panel:log"):
+            self.telemetry = Telemetry(tel_cfg)
+            self.log_panel = LogPanel(self, also_log_to_file=app_cfg["logging"].get("also_log_serial", True),
+                                      cfg=app_cfg.get("monitor", {}))
+        if tel_cfg.get("enabled", False) and self.telemetry.channels:
+            with prof.step("panel:telemetry"):
+                self.telemetry.attach(self.bus)
+                self.log_panel.grid(row=2, column=0, sticky="nsew", padx=(10,5), pady=(0,10))
+                self.tel_panel = TelemetryPanel(self, self.telemetry, tel_cfg)
+                self.tel_panel.grid(row=2, column=1, sticky="nsew", padx=(5,10), pady=(0,10))
+        else:
+            self.log_panel.grid(row=2, column=0, columnspan=2, sticky="nsew", padx=10, pady=(0,10))
 
         # Right actions column (row 1-2, col 2)
         self.actions = ctk.CTkFrame(self)
@@ -48,11 +70,18 @@ class MainWindow(ctk.CTk):
         self.actions.grid_rowconfigure(99, weight=1)
 
         # Arduino & ADU mini-panels (stacked)
-        self.arduino = ArduinoPanel(self.actions, self.serial, self.bus)
-        self.arduino.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
+        with prof.step("panel:arduino"):
+            self.arduino = ArduinoPanel(self.actions, self.serial, self.bus, commands=self.cfg_all.commands)
+            self.arduino.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
+
+        with prof.step("panel:adu"):
+            self.adu = ADUPanel(self.actions, self.bus, commands=self.cfg_all.commands, client=self.adu_client)
+            self.adu.grid(row=1, column=0, sticky="ew", padx=10, pady=10)
 
-        self.adu = ADUPanel(self.actions, self.bus)  # actual impl later
-        self.adu.grid(row=1, column=0, sticky="ew", padx=10, pady=10)
+        with prof.step("panel:macro"):
+            tiles = lambda cam: getattr(getattr(self.cameras, cam, None), "worker", None)
+            self.macro = MacroPanel(self.actions, self.engine, self.bus, config=self.cfg_all, cameras=tiles)
+            self.macro.grid(row=2, column=0, sticky="ew", padx=10, pady=10)
 
         # Action buttons
         self.scan_btn = ctk.CTkButton(self.actions, text="Scan", command=self.on_scan)
@@ -70,14 +99,79 @@ class MainWindow(ctk.CTk):
         self.exit_btn = ctk.CTkButton(self.actions, text="Exit", fg_color="#444", command=self.destroy)
         self.exit_btn.grid(row=99, column=0, sticky="ew", padx=10, pady=(40,0))
 
-        # Subscribe to events → push into monitor + status
-        self.bus.subscribe("log:line", lambda payload: self.log_panel.append(payload))
-        self.bus.subscribe("conn:state", self._on_conn_state)
-        self.bus.subscribe("scan:result", self._on_scan_result)
+        # Subscribe to events → push into monitor + status (Tk handlers run on the main loop)
+        self.bus.subscribe("log:line", self.log_panel.append_many, target="ui")
+        if self.log_panel.also_log_to_file:
+            self.bus.subscribe("log:line", self.log_panel.log_to_file, target="worker")
+        self.bus.subscribe("conn:state", self._on_conn_state, target="ui")
+        self.bus.subscribe("scan:result", self._on_scan_result, target="ui")
+        self.bus.subscribe("syscheck:progress", self._on_syscheck_progress, target="ui")
+        self.bus.subscribe("syscheck:confirm", self._on_syscheck_confirm, target="ui")
+        self.bus.attach_tk(self, interval_ms=16, budget_ms=8)
         self.after(250, self.status.tick)  # uptime timer
-
+        if METRICS.enabled: self._start_metrics()
+
+        if app_cfg.get("control", {}).get("enabled"):
+            tiles = lambda cam: getattr(getattr(self.cameras, cam, None), "worker", None)
+            self.engine.start_control(cameras=tiles)
+
+        # first paint happens once the main loop runs; heavy panels come after it
+        prof.mark("window_built")
+        self.after(10, self._build_deferred)
+
+    def _build_deferred(self):
+        prof.mark("first_paint")
+        with prof.step("panel:cameras"):
+            from ui.panels.camera_panel import DualCameraPanel, prewarm
+            self.cameras = DualCameraPanel(self, self.app_cfg["cameras"], self.bus)
+            self.cameras.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+        # OpenCV/PIL load in the background so the first camera toggle is instant;
+        # the startup profile is written once that step has been timed too
+        prewarm(prof, done=lambda: prof.write(self.app_cfg["logging"].get("folder", "logs"), self.version))
         # Start cameras per config
         self.after(200, self.cameras.apply_startup)
+        prof.mark("ready")
+
+    def destroy(self):
+        if self.macro.runner is not None: self.macro.runner.cancel()
+        if self.syscheck is not None: self.syscheck.cancel.set()
+        METRICS.stop()
+        self.engine.close()     # ports, hub, ADU, control server, session, engine cameras
+        super().destroy()
+
+    # Runtime metrics (app.yaml `metrics:`)
+    def _start_metrics(self):
+        tiles = lambda: {n: getattr(self.cameras, n).stats() for n in ("cam_a", "cam_b")} if self.cameras else {}
+        METRICS.source("tiles", tiles)
+        self._metrics_cursor = METRICS.cursor()
+        self._metrics_ms = int(self.app_cfg.get("metrics", {}).get("status_ms", 1000))
+        self.after(100, self._lag_probe, time.perf_counter() + 0.1)
+        self.after(self._metrics_ms, self._metrics_tick)
+
+    def _lag_probe(self, due):
+        # how late the Tk loop services a 100 ms timer: long callbacks show up here
+        now = time.perf_counter()
+        METRICS.observe("tk:lag", (now - due) * 1000)
+        self.after(100, self._lag_probe, now + 0.1)
+
+    def _metrics_tick(self):
+        snap = self._metrics_cursor.snapshot()
+        self.status.show_metrics(self._metrics_summary(snap), describe(snap))
+        self.after(self._metrics_ms, self._metrics_tick)
+
+    @staticmethod
+    def _metrics_summary(snap):
+        src, hist, cnt = snap["sources"], snap["hist"], snap["counters"]
+        parts = []
+        for name, st in (src.get("tiles") or {}).items():
+            if st.get("capture_fps"):
+                parts.append(f"{name} {st['capture_fps']:.0f}/{st['display_fps']:.0f} fps d{st['display_dropped']}")
+        bus = [c for c in (src.get("bus") or {}).values() if isinstance(c, dict)]
+        if bus:
+            parts.append(f"bus q{max(c['depth'] for c in bus)} p99 {max(c['lat_p99_ms'] for c in bus):.0f} ms")
+        if "log:lines" in cnt: parts.append(f"log {cnt['log:lines']['per_s']:.0f} l/s")
+        if "tk:lag" in hist: parts.append(f"tk lag p99 {hist['tk:lag']['p99_ms']:.0f} ms")
+        return " · ".join(parts)
 
     # Actions
     def on_scan(self):
@@ -88,16 +182,66 @@ class MainWindow(ctk.CTk):
         port = self.scanner.best_port or self.serial.port  # from scan
         ok = self.serial.open(port)
         self.status.set(f"Connected {port}" if ok else "Connect failed", color="green" if ok else "red")
+        if self.engine.hub.devices:
+            res = self.engine.connect_devices()
+            self.log_panel.append("[HUB] " + ", ".join(f"{n} {'up' if up else 'retrying'}" for n, up in res.items()))
 
     def on_disconnect(self):
         self.serial.close()
+        self.engine.disconnect_devices()
         self.status.set("Disconnected", color="gray")
 
     def on_syscheck(self):
-        logging.info("System Check clicked (stub for now)")
+        if self.syscheck is not None:
+            self.syscheck.cancel.set()
+            self.status.set("System Check cancelling…", color="yellow")
+            return
+        tiles = {"cam_a": self.cameras.cam_a, "cam_b": self.cameras.cam_b} if self.cameras else {}
+        try:
+            # re-read so edits between runs apply; unchanged files come from the cache
+            cfg = load_config(**self.cfg_all.paths).syscheck
+            self.syscheck = self.engine.syscheck(
+                cfg, confirm=self._confirm, cameras=lambda cam: getattr(tiles.get(cam), "worker", None))
+        except Exception as e:
+            self.status.set(f"System Check config error: {e}", color="red")
+            return
+        self.syscheck_btn.configure(text="Cancel Check")
         self.status.set("System Check running…", color="yellow")
+        self.syscheck.run_async()
+
+    def _confirm(self, prompt, timeout=None):
+        # called from a check thread: ask on the Tk loop via the bus and wait,
+        # at most the step's timeout (None = unanswered)
+        done, answer = threading.Event(), [False]
+        self.bus.publish("syscheck:confirm", (prompt, done, answer))
+        if not done.wait(timeout): return None
+        return answer[0]
 
     # Event handlers
+    def _on_syscheck_confirm(self, payload):
+        # the dialog runs its own modal loop: start it from a plain after() callback,
+        # not inside the bus tick that delivered this
+        self.after(0, self._ask_confirm, payload)
+
+    def _ask_confirm(self, payload):
+        prompt, done, answer = payload
+        try:
+            answer[0] = messagebox.askyesno("System Check", prompt, parent=self)
+        finally:
+            done.set()
+
+    def _on_syscheck_progress(self, p):
+        if p["state"] == "finished":
+            self.syscheck = None
+            self.syscheck_btn.configure(text="System Check")
+            msg = f"System Check {'PASSED' if p['ok'] else 'FAILED'} in {p['total_ms'] / 1000:.1f} s"
+            self.status.set(msg, color="green" if p["ok"] else "red")
+            self.log_panel.append(f"[CHECK] {msg} → {p.get('report')}")
+        elif p["step"]:
+            extra = f" ({p['ms']:.0f} ms)" if "ms" in p else ""
+            detail = f": {p['detail']}" if p.get("detail") and p["state"] != "passed" else ""
+            self.log_panel.append(f"[CHECK] {p['step']} {p['state']}{extra}{detail}")
+
     def _on_conn_state(self, payload):
         txt = "Connected" if payload.get("connected") else "Disconnected"
         self.status.set(txt, color="green" if payload.get("connected") else "gray")
@@ -105,5 +249,7 @@ class MainWindow(ctk.CTk):
     def _on_scan_result(self, payload):
         best = payload.get("best")
         msg = f"Scan complete. Best: {best or 'None'}"
+        if "elapsed_ms" in payload:
+            msg += f" ({payload['elapsed_ms']:.0f} ms, {payload.get('ports', 0)} ports)"
         self.status.set(msg, color="blue")
         self.log_panel.append(f"[SCAN] {msg}")
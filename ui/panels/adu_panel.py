@@ -1,20 +1,38 @@
 # ADU control panel
 import customtkinter as ctk
-import yaml
+from core.config import load_config
 
 class ADUPanel(ctk.CTkFrame):
-    def __init__(self, master, bus):
+    def __init__(self, master, bus, commands=None, client=None):
         super().__init__(master)
         self.bus = bus
+        self.client = client     # core.adu_client.ADUClient
         ctk.CTkLabel(self, text="ADU Control").pack(pady=(8,4))
-        with open("config/commands.yaml", "r", encoding="utf-8") as f:
-            cfg = yaml.safe_load(f)
+        cfg = commands if commands is not None else load_config().commands
         row = ctk.CTkFrame(self); row.pack(padx=8, pady=4)
         for i, b in enumerate(cfg.get("adu_buttons", [])):
             ctk.CTkButton(row, text=b["label"],
                           command=lambda act=b["action"]: self._do(act)
                           ).grid(row=i//1, column=0, padx=4, pady=4, sticky="ew")
+        self.state_lbl = ctk.CTkLabel(self, text="", anchor="w")
+        self.state_lbl.pack(fill="x", padx=10, pady=(0,6))
+        self.bus.subscribe("adu:state", self._on_state, target="ui")
+        if client is not None: self._on_state(client.relay_state())
 
     def _do(self, action: str):
-        # TODO: call real ADU client; for now just log
-        self.bus.publish("log:line", f"[ADU] {action} (stub)")
+        if self.client is None:
+            self.bus.publish("log:line", f"[ADU] {action}: no ADU client")
+            return
+        # queued on the ADU worker; the result comes back on its thread
+        self.client.submit(action).add_done_callback(lambda f, act=action: self._on_done(act, f))
+
+    def _on_done(self, action, fut):
+        try:
+            ok = fut.result()
+            self.bus.publish("log:line", f"[ADU] {action} {'ok' if ok else 'FAILED'}")
+        except Exception as e:
+            self.bus.publish("log:line", f"[ADU] {action}: {e}")
+
+    def _on_state(self, relays):
+        self.state_lbl.configure(text="  ".join(
+            f"{name} {'●' if on else '○' if on is not None else '?'}" for name, on in relays.items()))
@@ -1,15 +1,14 @@
 # Arduino command panel
 import customtkinter as ctk
-import yaml
+from core.config import load_config
 
 class ArduinoPanel(ctk.CTkFrame):
-    def __init__(self, master, serial_manager, bus):
+    def __init__(self, master, serial_manager, bus, commands=None):
         super().__init__(master)
         self.serial = serial_manager
         self.bus = bus
         ctk.CTkLabel(self, text="Arduino Control").pack(pady=(8,4))
-        with open("config/commands.yaml", "r", encoding="utf-8") as f:
-            cfg = yaml.safe_load(f)
+        cfg = commands if commands is not None else load_config().commands
         btns = cfg.get("arduino_buttons", [])
         grid = ctk.CTkFrame(self); grid.pack(padx=8, pady=4)
         # buttons in 2 columns
@@ -29,8 +28,20 @@ class ArduinoPanel(ctk.CTkFrame):
         if txt: self.send(txt)
 
     def send(self, cmd: str):
-        ok = self.serial.write_line(cmd)
-        if ok:
-            self.bus.publish("log:line", f"→ {cmd}")
-        else:
-            self.bus.publish("log:line", f"[ERR] write failed (not connected)")
+        if not self.serial.router.has_spec(cmd):
+            ok = self.serial.write_line(cmd)
+            if ok:
+                self.bus.publish("log:line", f"→ {cmd}")
+            else:
+                self.bus.publish("log:line", f"[ERR] write failed (not connected)")
+            return
+        # commands with a reply matcher: report round-trip time or timeout
+        self.bus.publish("log:line", f"→ {cmd}")
+        self.serial.request(cmd).add_done_callback(lambda f, cmd=cmd: self._on_reply(cmd, f))
+
+    def _on_reply(self, cmd, fut):
+        try:
+            r = fut.result()
+            self.bus.publish("log:line", f"[CMD] {cmd} ok in {r.rtt_ms:.1f} ms ({len(r.lines)} lines)")
+        except Exception as e:
+            self.bus.publish("log:line", f"[ERR] {cmd}: {e}")
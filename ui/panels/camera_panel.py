@@ -1,14 +1,38 @@
 # Dual camera panel
 import customtkinter as ctk
 from core.camera_worker import CameraWorker
-from PIL import ImageTk, Image
-import cv2
-import os, time
+from core.camera_worker import RateMeter
+from core.recorder import Recorder
+from core.metrics import METRICS
+import time, threading
+
+VIEW_SIZE = (640, 480)
+
+# OpenCV / PIL / NumPy load on first use (or on prewarm()), not at import time
+cv2 = np = Image = ImageTk = None
+
+def _imaging():
+    global cv2, np, Image, ImageTk
+    if ImageTk is None:
+        import cv2 as _cv2, numpy as _np
+        from PIL import Image as _Image, ImageTk as _ImageTk
+        cv2, np, Image = _cv2, _np, _Image
+        ImageTk = _ImageTk
+
+def prewarm(profile=None, done=None):
+    """Import the imaging stack on a background thread; `done()` runs there after."""
+    def run():
+        if profile is None: _imaging()
+        else:
+            with profile.step("import:imaging (bg)"): _imaging()
+        if done is not None: done()
+    threading.Thread(target=run, name="prewarm-imaging", daemon=True).start()
 
 class CamTile(ctk.CTkFrame):
-    def __init__(self, master, name, cfg, bus):
+    def __init__(self, master, name, cfg, bus, rec_cfg=None, pre_cfg=None):
         super().__init__(master)
         self.name, self.cfg, self.bus = name, cfg, bus
+        self.rec_cfg, self.pre_cfg = rec_cfg or {}, pre_cfg or {}
         self.lbl = ctk.CTkLabel(self, text=f"{name} (OFF)", width=640, height=480)
         self.lbl.pack(padx=6, pady=6)
         row = ctk.CTkFrame(self); row.pack(pady=(0,6))
@@ -18,9 +42,24 @@ class CamTile(ctk.CTkFrame):
         self.snap_btn.pack(side="left", padx=6)
         self.rec_btn = ctk.CTkSwitch(row, text="Record", command=self._rec_toggle)
         self.rec_btn.pack(side="left", padx=6)
+        if self.pre_cfg.get("enabled", False):
+            self.clip_btn = ctk.CTkButton(row, text="Save Clip", width=90, command=self.save_clip)
+            self.clip_btn.pack(side="left", padx=6)
+        self.fps_lbl = ctk.CTkLabel(row, text="", width=150, anchor="w")
+        self.fps_lbl.pack(side="left", padx=6)
         self.worker = None
-        self.recording = False
-        self.out = None
+        self.recorder = Recorder(name, rec_cfg, bus)
+        # display pipeline: pulled on the Tk loop from worker.mailbox, or in place
+        # from the shared ring (process mode)
+        self.display_interval = max(1, int(1000 / float(cfg.get("display_fps", 15))))
+        self.display_rate = RateMeter()
+        self._disp_job = None
+        self._shm = None       # display consumer of the shared ring (process mode)
+        self._shown_seq = 0
+        self._small = None     # reused resize buffer (BGR)
+        self._rgb = None       # reused colour-converted buffer
+        self._photo = None     # reused Tk photo, updated with paste()
+        self._stats_t = 0.0
 
     def apply_startup(self):
         if self.cfg.get("enabled_on_start", False):
@@ -28,14 +67,28 @@ class CamTile(ctk.CTkFrame):
 
     def _toggle(self):
         if self.toggle.get():
+            _imaging()
+            proc = self.cfg.get("capture", "thread") == "process"
             self.worker = CameraWorker(
                 index=self.cfg["index"],
                 width=self.cfg["width"],
                 height=self.cfg["height"],
                 target_fps=self.cfg["target_fps"],
-                on_frame=self._on_frame,
+                on_frame=None if proc else self._on_frame,    # process mode: recorder.follow()
+                mode=self.cfg.get("capture", "thread"),
+                shm_slots=self.cfg.get("shm_slots", 8),
+                sensor_fps=self.cfg.get("sensor_fps"),
+                pacing=self.cfg.get("pacing"),
+                demand=lambda: self.recorder.recording,
             )
+            if self.pre_cfg.get("enabled", False):
+                self.worker.enable_pretrigger(seconds=self.pre_cfg.get("seconds", 10),
+                                              max_mb=self.pre_cfg.get("max_mb", 200),
+                                              jpeg_quality=self.pre_cfg.get("jpeg_quality", 0))
             self.worker.start()
+            if proc and self.worker.cap is not None:
+                self._shm = self.worker.consumer("display")
+                self.recorder.follow(self.worker.consumer("recorder"))
 
             # Verify open shortly after starting (non-blocking)
             def verify_open():
@@ -50,61 +103,125 @@ class CamTile(ctk.CTkFrame):
 
             self.after(300, verify_open)
             self.lbl.configure(text="")  # clear placeholder
+            self._shown_seq = 0
+            if self._disp_job is None:
+                self._disp_job = self.after(self.display_interval, self._display_tick)
 
         else:
             # OFF: stop worker and writer cleanly
+            if self._disp_job is not None:
+                self.after_cancel(self._disp_job)
+                self._disp_job = None
+            self.recorder.follow(None)     # before the ring goes away
+            self._shm = None
             if self.worker:
                 try:
                     self.worker.stop()
                 finally:
                     self.worker = None
 
-            if self.out:
-                try:
-                    self.out.release()
-                finally:
-                    self.out = None
-
+            self.recorder.stop()
             self.rec_btn.deselect()
-            self.recording = False
+            self._photo = None
             self.lbl.configure(text=f"{self.name} (OFF)", image=None)
+            self.fps_lbl.configure(text="")
 
 
     def _rec_toggle(self):
-        self.recording = bool(self.rec_btn.get())
-        if self.recording and self.worker and self.worker.last_frame is not None:
-            os.makedirs("captures", exist_ok=True)
-            ts = time.strftime("%Y%m%d-%H%M%S")
-            codec = cv2.VideoWriter_fourcc(*"mp4v")
-            w,h = self.worker.size
-            self.out = cv2.VideoWriter(os.path.join("captures", f"{self.name}_{ts}.mp4"), codec, 20, (w,h))
+        if self.rec_btn.get() and self.worker and self.worker.last_frame is not None:
+            h, w = self.worker.last_frame.shape[:2]
+            # write at the rate the camera really delivers, not the configured hint
+            fps = self.worker.effective_fps or float(self.cfg["target_fps"])
+            self.recorder.start((w, h), fps)
         else:
-            if self.out: self.out.release(); self.out=None
+            self.rec_btn.deselect()
+            self.recorder.stop()
 
     def snapshot(self):
         if self.worker and self.worker.last_frame is not None:
-            os.makedirs("captures", exist_ok=True)
-            ts = time.strftime("%Y%m%d-%H%M%S")
-            path = os.path.join("captures", f"{self.name}_{ts}.png")
-            cv2.imwrite(path, self.worker.last_frame_bgr)
-            self.bus.publish("log:line", f"[{self.name}] Snapshot saved: {path}")
-
-    def _on_frame(self, frame_bgr):
-        # display
-        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(rgb)
-        img = img.resize((640, 480))
-        imgtk = ImageTk.PhotoImage(img)
-        self.lbl.configure(image=imgtk); self.lbl.image = imgtk
-        # record
-        if self.recording and self.out is not None:
-            self.out.write(frame_bgr)
+            self.recorder.snapshot(self.worker.last_frame_bgr)
+
+    def save_clip(self):
+        if not self.worker or self.worker.ring is None:
+            self.bus.publish("log:line", f"[{self.name}] No pre-trigger frames buffered")
+            return
+        post = float(self.pre_cfg.get("post_seconds", 5))
+        self.worker.dump_clip(self.name, post, self.rec_cfg, self.bus)
+        self.bus.publish("log:line", f"[{self.name}] Saving clip: last {self.worker.ring.duration():.1f} s + next {post:.0f} s")
+
+    def _on_frame(self, frame_bgr, ts):
+        # capture thread: hand off to the encoder queue, display is pulled by _display_tick
+        self.recorder.push(frame_bgr, ts)
+
+    def _display_tick(self):
+        self._disp_job = None
+        if not self.worker: return
+        # hidden / minimised tiles do no conversion work at all
+        if self.winfo_viewable():
+            item = self._shm.latest() if self._shm is not None else self.worker.mailbox.get(self._shown_seq)
+            if item is not None:
+                self._shown_seq, ts = item[0], item[1]
+                t = time.perf_counter()
+                self._show(item[2], item[0])
+                item = None     # don't hold the ring slot (or frame) until the next tick
+                if METRICS.enabled:
+                    METRICS.observe(f"tk:display:{self.name}", (time.perf_counter() - t) * 1000)
+                    METRICS.observe(f"cam:{self.name}:to_display", (time.monotonic() - ts) * 1000)
+                self.display_rate.tick()
+        now = time.monotonic()
+        if now - self._stats_t >= 1.0:
+            self._stats_t = now
+            self.fps_lbl.configure(text=self.stats_text())
+        self._disp_job = self.after(self.display_interval, self._display_tick)
+
+    def _show(self, frame_bgr, seq=None):
+        # downscale first, then colour-convert the small image; both into reused buffers
+        w, h = VIEW_SIZE
+        if frame_bgr.shape[1] != w or frame_bgr.shape[0] != h:
+            if self._small is None: self._small = np.empty((h, w, 3), np.uint8)
+            small = cv2.resize(frame_bgr, VIEW_SIZE, dst=self._small, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame_bgr
+        if self._rgb is None: self._rgb = np.empty((h, w, 3), np.uint8)
+        cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        small = frame_bgr = None
+        # a ring slot the capture process overwrote meanwhile: skip this one
+        if self._shm is not None and not self._shm.still_valid(seq): return
+        img = Image.frombuffer("RGB", VIEW_SIZE, self._rgb, "raw", "RGB", 0, 1)
+        if self._photo is None:
+            self._photo = ImageTk.PhotoImage(img)
+            self.lbl.configure(image=self._photo); self.lbl.image = self._photo
+        else:
+            self._photo.paste(img)
+
+    def stats(self):
+        w = self.worker
+        return {
+            "capture_fps": round(w.capture_rate.rate, 1) if w else 0.0,
+            "display_fps": round(self.display_rate.rate, 1) if w else 0.0,
+            "display_dropped": (self._shm.dropped if self._shm is not None else w.mailbox.dropped) if w else 0,
+            "recorder": self.recorder.stats(),
+            "pacing": w.stats() if w else {},
+            **({"shm": w.consumer_stats()} if w and w.mode == "process" else {}),
+        }
+
+    def stats_text(self):
+        st = self.stats()
+        txt = f"cap {st['capture_fps']:.0f} / disp {st['display_fps']:.0f} fps"
+        if st["pacing"].get("level"):
+            txt += f" · L{st['pacing']['level']}"
+        rec = st["recorder"]
+        if rec["recording"]:
+            txt += f" · rec q{rec['queue_depth']} d{rec['dropped']}"
+        return txt
 
 class DualCameraPanel(ctk.CTkFrame):
     def __init__(self, master, cameras_cfg, bus):
         super().__init__(master)
-        self.cam_a = CamTile(self, "CamA", cameras_cfg["cam_a"], bus)
-        self.cam_b = CamTile(self, "CamB", cameras_cfg["cam_b"], bus)
+        rec_cfg = cameras_cfg.get("recording", {})
+        pre_cfg = cameras_cfg.get("pretrigger", {})
+        self.cam_a = CamTile(self, "CamA", cameras_cfg["cam_a"], bus, rec_cfg, pre_cfg)
+        self.cam_b = CamTile(self, "CamB", cameras_cfg["cam_b"], bus, rec_cfg, pre_cfg)
         self.cam_a.grid(row=0, column=0, padx=6, pady=6, sticky="n")
         self.cam_b.grid(row=0, column=1, padx=6, pady=6, sticky="n")
         self.grid_columnconfigure(0, weight=1)
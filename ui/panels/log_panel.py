@@ -1,13 +1,29 @@
 # Serial monitor panel
 import customtkinter as ctk
-import time, logging
+import time, logging, re
+from core.line_store import LineStore, line_tag, split_lines
+from core.metrics import METRICS
 
 class LogPanel(ctk.CTkFrame):
-    def __init__(self, master, also_log_to_file=True):
+    def __init__(self, master, also_log_to_file=True, cfg=None):
         super().__init__(master)
+        cfg = cfg or {}
+        self.store = LineStore(max_lines=cfg.get("max_lines", 1_000_000))
+        self.widget_lines = int(cfg.get("widget_lines", 5000))
+        self.flush_ms = int(cfg.get("flush_ms", 100))
+        self.flush_lines = int(cfg.get("flush_lines", 20000))
+        self.result_limit = int(cfg.get("search_limit", 2000))
+
         top = ctk.CTkFrame(self); top.pack(fill="x", padx=6, pady=(6,0))
         self.search = ctk.CTkEntry(top, placeholder_text="search…")
         self.search.pack(side="left", padx=6, pady=6)
+        self.search.bind("<KeyRelease>", lambda e: self._schedule_filter())
+        self.regex = ctk.CTkCheckBox(top, text="regex", width=60, command=self._schedule_filter)
+        self.regex.pack(side="left", padx=4)
+        self.tag = ctk.CTkOptionMenu(top, values=["All"], width=90, command=lambda _: self._schedule_filter())
+        self.tag.pack(side="left", padx=4)
+        self.info = ctk.CTkLabel(top, text="", anchor="w")
+        self.info.pack(side="left", padx=6)
         ctk.CTkButton(top, text="Clear", command=self.clear).pack(side="right", padx=6)
         ctk.CTkButton(top, text="Save Log Copy", command=self.save_copy).pack(side="right", padx=6)
 
@@ -15,20 +31,122 @@ class LogPanel(ctk.CTkFrame):
         self.txt.pack(expand=True, fill="both", padx=6, pady=6)
         self.also_log_to_file = also_log_to_file
 
+        self._pending = []
+        self.max_pending = 10 * self.flush_lines
+        self.dropped = 0           # lines shed because the monitor fell max_pending behind
+        self._shown = 0            # lines currently in the widget
+        self._filter = None        # (compiled matcher, tag) while a search is active
+        self._filter_job = None
+        self._ts_sec, self._ts = 0, ""
+        self._tags_seen = 0
+        self.after(self.flush_ms, self._flush)
+
+    def _stamp(self):
+        now = int(time.time())
+        if now != self._ts_sec:
+            self._ts_sec, self._ts = now, time.strftime("%H:%M:%S", time.localtime(now))
+        return self._ts
+
     def append(self, line: str):
-        ts = time.strftime("%H:%M:%S")
-        self.txt.insert("end", f"{ts}  {line}\n")
-        self.txt.see("end")
-        if self.also_log_to_file:
-            logging.info("[SERIAL] %s", line)
+        self.append_many([line])
+        if self.also_log_to_file: self.log_to_file([line])
+
+    def append_many(self, lines):
+        ts = self._stamp()
+        self._pending.extend(f"{ts}  {l}" for l in split_lines(lines))
+        over = len(self._pending) - self.max_pending
+        if over > 0:
+            del self._pending[:over]
+            self.dropped += over
+
+    @staticmethod
+    def log_to_file(lines):
+        """File copy of bus lines; subscribed with target="worker" so it stays off the Tk thread."""
+        for l in lines: logging.info("[SERIAL] %s", l)
+
+    def _flush(self):
+        t = time.perf_counter()
+        try:
+            if self._pending:
+                # at most flush_lines per tick; a burst is worked off over the next ticks
+                n = self.flush_lines
+                lines = self._pending[:n]
+                del self._pending[:n]
+                if self.dropped:
+                    lines.insert(0, f"{self._stamp()}  [MON] {self.dropped} lines dropped (monitor behind)")
+                    self.dropped = 0
+                if METRICS.enabled: METRICS.count("log:lines", len(lines))
+                self.store.extend(lines)
+                if self._filter is not None:
+                    pat, tag = self._filter
+                    lines = [l for l in lines if self._matches(l, pat, tag)]
+                self._show(lines)
+            if len(self.store.tags) != self._tags_seen:
+                self._tags_seen = len(self.store.tags)
+                self.tag.configure(values=["All"] + sorted(self.store.tags))
+            if METRICS.enabled: METRICS.observe("tk:log_flush", (time.perf_counter() - t) * 1000)
+        finally:
+            self.after(self.flush_ms, self._flush)
+
+    def _show(self, lines, replace=False):
+        if not lines and not replace: return
+        # follow the tail only if the user has not scrolled up
+        at_bottom = self.txt.yview()[1] >= 0.999
+        if replace:
+            self.txt.delete("1.0", "end"); self._shown = 0
+        lines = lines[-self.widget_lines:]
+        if lines:
+            self.txt.insert("end", "\n".join(lines) + "\n")
+            self._shown += len(lines)
+        excess = self._shown - self.widget_lines
+        if excess > 0:
+            self.txt.delete("1.0", f"{excess + 1}.0")
+            self._shown -= excess
+        if at_bottom or replace:
+            self.txt.see("end")
+
+    @staticmethod
+    def _matches(line, pat, tag):
+        if tag is not None and line_tag(line.split("  ", 1)[-1]) != tag: return False
+        return pat is None or LineStore._match_line(pat, line)
+
+    def _schedule_filter(self):
+        if self._filter_job is not None: self.after_cancel(self._filter_job)
+        self._filter_job = self.after(200, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
+        q = self.search.get().strip()
+        tag = self.tag.get()
+        tag = None if tag == "All" else tag
+        regex = bool(self.regex.get())
+        if not q and tag is None:
+            self._filter = None
+            self.info.configure(text="")
+            self._show(self.store.tail(self.widget_lines), replace=True)
+            return
+        t0 = time.perf_counter()
+        try:
+            pat = LineStore.compile(q, regex=regex)
+        except re.error as e:
+            self.info.configure(text=f"bad regex: {e}")
+            return
+        hits = self.store.search(q, regex=regex, tag=tag, limit=self.result_limit)
+        self._filter = (pat, tag)
+        ms = (time.perf_counter() - t0) * 1000
+        self.info.configure(text=f"{len(hits)}{'+' if len(hits) >= self.result_limit else ''} hits / {len(self.store)} lines · {ms:.0f} ms")
+        self._show([l for _, l in hits], replace=True)
 
     def clear(self):
+        self.store.clear()
         self.txt.delete("1.0", "end")
+        self._shown = 0
 
     def save_copy(self):
-        # quick copy into logs/ with timestamp
+        # quick copy into logs/ with timestamp (full history, not just the visible tail)
         import os, time
         os.makedirs("logs", exist_ok=True)
         path = os.path.join("logs", f"user_saved_{time.strftime('%Y%m%d-%H%M%S')}.txt")
         with open(path, "w", encoding="utf-8") as f:
-            f.write(self.txt.get("1.0","end").strip())
+            for _, l in self.store.iter_lines(self.store.first_seq):
+                f.write(l + "\n")
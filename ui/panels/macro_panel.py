@@ -0,0 +1,71 @@
+# Macro panel: pick a macros.yaml sequence, run / pause / stop it
+import customtkinter as ctk
+from core.config import load_config
+
+class MacroPanel(ctk.CTkFrame):
+    """The macro runs on its own thread (core.macro.MacroRunner); this panel
+    only starts it, flips pause/cancel and shows the throttled macro:progress."""
+
+    def __init__(self, master, engine, bus, config=None, cameras=None):
+        super().__init__(master)
+        self.engine, self.bus = engine, bus
+        self.cfg_all = config        # core.config.Config, re-read on each run
+        self.cameras = cameras       # cam name -> live CameraWorker (tiles) or None
+        self.runner = None
+        ctk.CTkLabel(self, text="Macros").pack(pady=(8,4))
+        names = list(((config.macros if config else load_config().macros).get("macros") or {}))
+        self.choice = ctk.CTkOptionMenu(self, values=names or ["(none)"])
+        self.choice.pack(fill="x", padx=8, pady=4)
+        row = ctk.CTkFrame(self); row.pack(padx=8, pady=4)
+        self.run_btn = ctk.CTkButton(row, text="Run", width=60, command=self.on_run)
+        self.run_btn.grid(row=0, column=0, padx=2)
+        self.pause_btn = ctk.CTkButton(row, text="Pause", width=60, command=self.on_pause, state="disabled")
+        self.pause_btn.grid(row=0, column=1, padx=2)
+        self.stop_btn = ctk.CTkButton(row, text="Stop", width=60, command=self.on_stop, state="disabled")
+        self.stop_btn.grid(row=0, column=2, padx=2)
+        self.state_lbl = ctk.CTkLabel(self, text="", anchor="w", justify="left")
+        self.state_lbl.pack(fill="x", padx=10, pady=(0,6))
+        self.bus.subscribe("macro:progress", self._on_progress, target="ui")
+
+    def on_run(self):
+        if self.runner is not None: return
+        name = self.choice.get()
+        try:
+            # re-read so edits between runs apply; unchanged files come from the cache
+            cfg = load_config(**self.cfg_all.paths).macros if self.cfg_all else None
+            self.runner = self.engine.macro(name, cfg, cameras=self.cameras)
+        except Exception as e:
+            self.state_lbl.configure(text=f"{name}: {e}")
+            self.bus.publish("log:line", f"[MACRO] {name}: {e}")
+            return
+        self.run_btn.configure(state="disabled")
+        self.pause_btn.configure(state="normal", text="Pause")
+        self.stop_btn.configure(state="normal")
+        self.bus.publish("log:line", f"[MACRO] {name} started")
+        self.runner.start()
+
+    def on_pause(self):
+        if self.runner is None: return
+        if self.runner.paused:
+            self.runner.resume(); self.pause_btn.configure(text="Pause")
+        else:
+            self.runner.pause(); self.pause_btn.configure(text="Resume")
+
+    def on_stop(self):
+        if self.runner is not None: self.runner.cancel()
+
+    def _on_progress(self, p):
+        txt = f"{p['macro']} {p['state']} · cycle {p['cycle']} · {p['steps']} steps"
+        if p["failed"]: txt += f" · {p['failed']} failed"
+        txt += f"\nlate max {p['late_max_ms']:.2f} ms"
+        self.state_lbl.configure(text=txt)
+        if p["state"] in ("finished", "failed", "cancelled"):
+            rep = self.runner.report if self.runner is not None else None
+            if rep is not None:
+                self.bus.publish("log:line", f"[MACRO] {p['macro']} {p['state']}: {rep['cycles']} cycles, "
+                                 f"late p99 {rep['late_p99_ms']:.2f} ms → {rep.get('path')}"
+                                 + (f" ({rep['error']})" if rep.get("error") else ""))
+            self.runner = None
+            self.run_btn.configure(state="normal")
+            self.pause_btn.configure(state="disabled", text="Pause")
+            self.stop_btn.configure(state="disabled")
@@ -10,6 +10,9 @@ class StatusBar(ctk.CTkFrame):
         self.label.pack(side="left", padx=8, pady=4)
         self.uptime = ctk.CTkLabel(self, text="00:00:00", anchor="e")
         self.uptime.pack(side="right", padx=8, pady=4)
+        self.metrics = None        # summary label, created on the first show_metrics()
+        self.overlay = None        # expanded metrics window while open
+        self._detail = ""
 
     def set(self, text, color=None):
         self.label.configure(text=f"Status: {text}")
@@ -23,3 +26,35 @@ class StatusBar(ctk.CTkFrame):
         h,m,s = secs//3600, (secs%3600)//60, secs%60
         self.uptime.configure(text=f"{h:02d}:{m:02d}:{s:02d}")
         self.after(1000, self.tick)
+
+    # ---- runtime metrics ----
+    def show_metrics(self, summary, detail=""):
+        """Compact summary next to the uptime; click it for the full snapshot."""
+        if self.metrics is None:
+            self.metrics = ctk.CTkLabel(self, text="", anchor="e", cursor="hand2")
+            self.metrics.pack(side="right", padx=8, pady=4)
+            self.metrics.bind("<Button-1>", lambda e: self.toggle_overlay())
+        self.metrics.configure(text=summary)
+        self._detail = detail
+        if self.overlay is not None:
+            self._fill_overlay()
+
+    def toggle_overlay(self):
+        if self.overlay is not None:
+            self.overlay.destroy(); self.overlay = None
+            return
+        self.overlay = ctk.CTkToplevel(self)
+        self.overlay.title("Runtime metrics")
+        self.overlay.geometry("760x520")
+        self.overlay.attributes("-topmost", True)
+        self.overlay.protocol("WM_DELETE_WINDOW", self.toggle_overlay)
+        self.overlay.text = ctk.CTkTextbox(self.overlay, font=("Consolas", 12), wrap="none")
+        self.overlay.text.pack(expand=True, fill="both", padx=6, pady=6)
+        self._fill_overlay()
+
+    def _fill_overlay(self):
+        txt = self.overlay.text
+        top = txt.yview()[0]
+        txt.delete("1.0", "end")
+        txt.insert("end", self._detail)
+        txt.yview_moveto(top)
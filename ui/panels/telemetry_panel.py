@@ -0,0 +1,73 @@
+# Live telemetry plot panel
+import customtkinter as ctk
+import tkinter as tk
+import numpy as np
+from core.telemetry import minmax, lttb
+
+COLORS = ["#4fc3f7", "#ffb74d", "#81c784", "#e57373", "#ba68c8", "#fff176"]
+WINDOWS = {"10 s": 10, "1 min": 60, "10 min": 600, "1 h": 3600, "All": None}
+
+class TelemetryPanel(ctk.CTkFrame):
+    def __init__(self, master, telemetry, cfg=None):
+        super().__init__(master)
+        cfg = cfg or {}
+        self.tel = telemetry
+        self.interval = max(50, int(1000 / float(cfg.get("plot_fps", 5))))
+        self.method = cfg.get("downsample", "minmax")
+
+        top = ctk.CTkFrame(self); top.pack(fill="x", padx=6, pady=(6,0))
+        names = list(self.tel.channels) or ["(none)"]
+        self.channel = ctk.CTkOptionMenu(top, values=names, width=110)
+        self.channel.pack(side="left", padx=6, pady=6)
+        self.window = ctk.CTkOptionMenu(top, values=list(WINDOWS), width=80)
+        self.window.set("1 min")
+        self.window.pack(side="left", padx=6)
+        self.info = ctk.CTkLabel(top, text="", anchor="w")
+        self.info.pack(side="left", padx=6)
+
+        self.canvas = tk.Canvas(self, height=240, bg="#1d1e1e", highlightthickness=0)
+        self.canvas.pack(expand=True, fill="both", padx=6, pady=6)
+        self._lines = {}
+        self._shown = None
+        self.after(self.interval, self._redraw)
+
+    def _redraw(self):
+        try:
+            if self.winfo_viewable():
+                self._draw()
+        finally:
+            self.after(self.interval, self._redraw)
+
+    def _draw(self):
+        ch = self.tel.channels.get(self.channel.get())
+        if ch is None: return
+        if ch.name != self._shown:
+            self.canvas.delete("all"); self._lines = {}; self._shown = ch.name
+        c = self.canvas
+        w, h = max(c.winfo_width(), 10), max(c.winfo_height(), 10)
+        t, vals = ch.window(WINDOWS[self.window.get()], points=w)
+        if len(t) < 2:
+            for item in self._lines.values(): c.coords(item, 0, 0, 0, 0)
+            self.info.configure(text=f"{ch.total:,} rows")
+            return
+        t0, t1 = t[0], t[-1]
+        sx = (w - 10) / max(t1 - t0, 1e-9)
+        legend = []
+        for i, field in enumerate(ch.fields):
+            y = vals[:, i]
+            ok = ~np.isnan(y)
+            tt, yy = (t, y) if ok.all() else (t[ok], y[ok])
+            if len(yy) < 2: continue
+            # one point pair per pixel column is all the canvas can show
+            tt, yy = (lttb(tt, yy, w) if self.method == "lttb" else minmax(tt, yy, w // 2))
+            lo, hi = float(yy.min()), float(yy.max())
+            sy = (h - 20) / (hi - lo) if hi > lo else 0.0
+            xy = np.empty(2 * len(yy))
+            xy[0::2] = 5 + (tt - t0) * sx
+            xy[1::2] = h - 10 - (yy - lo) * sy
+            item = self._lines.get(field)
+            if item is None:
+                item = self._lines[field] = c.create_line(0, 0, 0, 0, fill=COLORS[i % len(COLORS)], width=1)
+            c.coords(item, *xy.tolist())
+            legend.append(f"{field} {yy[-1]:g} [{lo:g}…{hi:g}]")
+        self.info.configure(text=f"{len(t):,} pts · " + "  ".join(legend))